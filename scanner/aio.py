@@ -0,0 +1,695 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#
+# Uniden Scanner Python API
+# Copyright (C) 2014-2015 Anton Komarov
+#
+# This program is free software; you can redistribute it and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with this program;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+# Non-blocking scanner access from single thread event loop.
+# Coroutines are generators yielding Future (or other coroutine) and getting its
+# result back, coroutine result is returned by raising Return(value):
+#
+#	def poll(s):
+#		status=yield s.get_reception_status()
+#		raise Return(status)
+#
+#	loop=EventLoop()
+#	scanners=[AsyncUnidenScanner(port,loop=loop) for port in ports]
+#	print loop.run_until_complete(gather(loop,*[poll(s) for s in scanners]))
+#
+# Scanners expose fileno(), so the loop can be driven by other select() based
+# frameworks too: call on_readable() when readable and run_once() of the loop.
+
+import time
+import heapq
+import types
+import select
+import serial
+import logging
+import collections
+from uniden import *
+
+# create logger
+module_logger = logging.getLogger('uniden_api.aio')
+
+class Return(Exception):
+
+	"""Raised by coroutine to return value."""
+
+	def __init__(self, value=None):
+
+		Exception.__init__(self)
+		self.value=value
+
+class Future:
+
+	"""Result of operation not finished yet."""
+
+	def __init__(self, loop):
+
+		self.loop=loop
+		self.finished=False
+		self.value=None
+		self.exception=None
+		self.callbacks=[]
+
+	def done(self):
+
+		return self.finished
+
+	def result(self):
+
+		"""Returns result, raises exception of failed operation."""
+
+		if not self.finished: raise UnidenScannerError('result(): future not done')
+		if self.exception is not None: raise self.exception
+
+		return self.value
+
+	def add_done_callback(self, callback):
+
+		"""Calls callback(future) from event loop once future is done."""
+
+		if self.finished: self.loop.call_soon(callback,self)
+		else: self.callbacks.append(callback)
+
+	def set_result(self, value):
+
+		self.value=value
+		self.finish()
+
+	def set_exception(self, exception):
+
+		self.exception=exception
+		self.finish()
+
+	def finish(self):
+
+		self.finished=True
+		for callback in self.callbacks: self.loop.call_soon(callback,self)
+		self.callbacks=[]
+
+class Task(Future):
+
+	"""Future driving coroutine until it returns."""
+
+	def __init__(self, loop, coro):
+
+		Future.__init__(self,loop)
+		self.coro=coro
+		loop.call_soon(self.step,None,None)
+
+	def step(self, value, exception):
+
+		try:
+			if exception is not None: f=self.coro.throw(exception)
+			else: f=self.coro.send(value)
+
+		except StopIteration:
+			self.set_result(None)
+
+		except Return, r:
+			self.set_result(r.value)
+
+		except Exception, e:
+			self.set_exception(e)
+
+		else:
+			if isinstance(f,types.GeneratorType): f=Task(self.loop,f)
+			f.add_done_callback(self.wakeup)
+
+	def wakeup(self, future):
+
+		try:
+			value=future.result()
+
+		except Exception, e:
+			self.step(None,e)
+
+		else:
+			self.step(value,None)
+
+class EventLoop:
+
+	"""Single thread select() based event loop: reader callbacks, timers and
+	callbacks scheduled to run soon."""
+
+	def __init__(self):
+
+		self.logger = logging.getLogger('uniden_api.EventLoop')
+
+		self.readers={}
+		self.timers=[]
+		self.ready=collections.deque()
+		self.seq=0
+
+	def call_soon(self, callback, *args):
+
+		self.ready.append((callback,args))
+
+	def call_later(self, delay, callback, *args):
+
+		"""Calls callback after delay seconds. Returns timer, cancel it with cancel_timer()."""
+
+		self.seq+=1
+		timer=[time.time()+delay,self.seq,callback,args]
+		heapq.heappush(self.timers,timer)
+
+		return timer
+
+	def cancel_timer(self, timer):
+
+		timer[2]=None
+
+	def add_reader(self, fd, callback):
+
+		self.readers[fd]=callback
+
+	def remove_reader(self, fd):
+
+		self.readers.pop(fd,None)
+
+	def create_task(self, coro):
+
+		"""Starts coroutine, returns its Task."""
+
+		return Task(self,coro)
+
+	def run_once(self, timeout=None):
+
+		"""Runs ready callbacks, waits for readers up to next timer or timeout,
+		runs callbacks of readable descriptors and expired timers."""
+
+		if self.ready: timeout=0
+		elif self.timers:
+			delay=max(0,self.timers[0][0]-time.time())
+			if timeout is None or delay < timeout: timeout=delay
+
+		if self.readers:
+			(r,w,x)=select.select(self.readers.keys(),[],[],timeout)
+			for fd in r:
+				callback=self.readers.get(fd)
+				if callback is not None: callback()
+		elif timeout: time.sleep(timeout)
+
+		now=time.time()
+		while self.timers and self.timers[0][0] <= now:
+			(when,seq,callback,args)=heapq.heappop(self.timers)
+			if callback is not None: self.ready.append((callback,args))
+
+		for i in range(0,len(self.ready)):
+			(callback,args)=self.ready.popleft()
+			callback(*args)
+
+	def run_until_complete(self, future):
+
+		"""Runs loop until future or coroutine is done, returns its result."""
+
+		if isinstance(future,types.GeneratorType): future=Task(self,future)
+
+		while not future.done(): self.run_once()
+
+		return future.result()
+
+def sleep(loop, delay):
+
+	"""Returns future done after delay seconds."""
+
+	f=Future(loop)
+	loop.call_later(delay,f.set_result,None)
+
+	return f
+
+def gather(loop, *futures):
+
+	"""Returns future of list of results of all futures or coroutines,
+	first failure fails the gathered future."""
+
+	futures=[isinstance(f,types.GeneratorType) and Task(loop,f) or f for f in futures]
+	result=Future(loop)
+	pending=[len(futures)]
+
+	def done(f):
+		if result.done(): return
+		if f.exception is not None:
+			result.set_exception(f.exception)
+			return
+		pending[0]-=1
+		if not pending[0]: result.set_result([g.value for g in futures])
+
+	if not futures: result.set_result([])
+	for f in futures: f.add_done_callback(done)
+
+	return result
+
+class AsyncUnidenScanner:
+
+	"""Non-blocking scanner access from EventLoop.
+	raw() queues command and returns future of response. Up to window commands
+	are in flight, commands changing scanner mode or memory layout are sent alone
+	like in UnidenScanner.raw_batch(). Other methods are coroutines.
+	Objects read by readback coroutines are not attached to any scanner."""
+
+	def __init__(self, port, speed="115200", loop=None, timeout=1.0, window=1):
+
+		self.logger = logging.getLogger('uniden_api.AsyncUnidenScanner')
+
+		if loop is None: loop=EventLoop()
+
+		self.loop=loop
+		self.timeout=timeout
+		self.pipeline_window=window
+		self.rx_buffer=''
+		self.queue=collections.deque()
+		self.inflight=collections.deque()
+		self.deadline=None
+		self.quiet=None
+		self.metrics=None
+		self.model=None
+		self.version=None
+		self.isProgramMode=False
+		self.system_index_head=None
+		self.system_index_tail=None
+		self.quick_lockout=()
+		self.systems={}
+
+		self.serial=serial.Serial(port,speed,timeout=0)
+		loop.add_reader(self.fileno(),self.on_readable)
+
+	def fileno(self):
+
+		return self.serial.fileno()
+
+	def close(self):
+
+		"""Closes port, pending commands fail."""
+
+		self.loop.remove_reader(self.fileno())
+		if self.serial.isOpen(): self.serial.close()
+
+		for (cmd,f,timeout) in list(self.inflight)+list(self.queue):
+			f.set_exception(CommandError('%s: port closed' % cmd))
+		self.inflight.clear()
+		self.queue.clear()
+
+		if self.quiet is not None:
+			self.loop.cancel_timer(self.quiet)
+			self.quiet=None
+
+	def attach_metrics(self, collector=None):
+
+		"""Attaches metrics collector, see UnidenScanner.attach_metrics()."""
+
+		if collector is None: collector=CommandMetrics()
+		self.metrics=collector
+
+		return collector
+
+	def raw(self, cmd, timeout=None):
+
+		"""Queues command, returns future of response.
+		Future fails with CommandError on error response or timeout."""
+
+		f=Future(self.loop)
+		self.queue.append((cmd,f,timeout))
+		self.send()
+
+		return f
+
+	def send(self):
+
+		"""Writes queued commands while pipeline window allows."""
+
+		window=max(1,self.pipeline_window)
+
+		# resyncing after timeout, see on_timeout()
+		if self.quiet is not None: return
+
+		while self.queue and len(self.inflight) < window:
+
+			(cmd,f,timeout)=self.queue[0]
+
+			if self.inflight:
+				if cmd.split(',',1)[0] in UnidenScanner.order_sensitive: break
+				if self.inflight[-1][0].split(',',1)[0] in UnidenScanner.order_sensitive: break
+
+			self.queue.popleft()
+			self.logger.debug('send(): cmd %s' % cmd)
+			self.serial.write("".join([cmd,'\r']))
+			self.inflight.append((cmd,f,timeout,time.time()))
+
+		self.arm()
+
+	def arm(self):
+
+		"""Starts response deadline of the oldest command in flight."""
+
+		if self.deadline is not None or not self.inflight: return
+
+		timeout=self.inflight[0][2]
+		if timeout is None: timeout=self.timeout
+
+		self.deadline=self.loop.call_later(timeout,self.on_timeout)
+
+	def on_readable(self):
+
+		"""Reads available bytes, completes commands of all complete responses.
+		Input arriving with no command in flight or while resyncing is discarded."""
+
+		data=self.serial.read(self.serial.inWaiting() or 1)
+
+		if self.quiet is not None:
+			self.loop.cancel_timer(self.quiet)
+			self.quiet=self.loop.call_later(self.timeout,self.on_quiet)
+			return
+
+		if not self.inflight:
+			self.logger.warning('on_readable(): discarding stray input %r' % data)
+			self.rx_buffer=''
+			return
+
+		self.rx_buffer+=data
+
+		while '\r' in self.rx_buffer and self.inflight:
+			(res,sep,self.rx_buffer)=self.rx_buffer.partition('\r')
+			self.complete(res)
+
+		if not self.inflight: self.rx_buffer=''
+
+		self.send()
+
+	def on_timeout(self):
+
+		"""Fails the oldest command with CommandError. Responses of commands still
+		in flight can not be told apart from its late reply, they fail too and
+		input is discarded until nothing arrives for timeout, like
+		UnidenScanner.raw_batch()."""
+
+		self.deadline=None
+		self.rx_buffer=''
+
+		(cmd,f,timeout,start)=self.inflight[0]
+		if timeout is None: timeout=self.timeout
+
+		while self.inflight:
+			(cmd,f,t,start)=self.inflight.popleft()
+			if self.metrics is not None:
+				self.metrics.record(cmd.split(',',1)[0],time.time()-start,len(cmd)+1,1,True)
+			f.set_exception(CommandError('%s: timeout' % cmd))
+
+		self.quiet=self.loop.call_later(timeout,self.on_quiet)
+
+	def on_quiet(self):
+
+		"""Ends resync after timeout, sends queued commands."""
+
+		self.quiet=None
+		self.rx_buffer=''
+		self.send()
+
+	def complete(self, res):
+
+		"""Completes the oldest command with response. Responses not echoing its
+		mnemonic (late replies) are discarded."""
+
+		(cmd,f,timeout,start)=self.inflight[0]
+
+		name=cmd.split(',',1)[0]
+		if res and res not in UnidenScanner.err_list and res.split(',',1)[0] <> name:
+			self.logger.warning('complete(): cmd %s discarding res %s' % (cmd,res))
+			return
+
+		self.inflight.popleft()
+
+		if self.deadline is not None:
+			self.loop.cancel_timer(self.deadline)
+			self.deadline=None
+
+		self.logger.debug('complete(): cmd %s res %s' % (cmd,res))
+
+		f2=res
+		if res.count(',') == 1: f2=res.split(',')[1]
+		error=f2 in UnidenScanner.err_list
+
+		if self.metrics is not None:
+			self.metrics.record(cmd.split(',',1)[0],time.time()-start,len(cmd)+1,len(res)+1,error)
+
+		if error: f.set_exception(CommandError(cmd))
+		else: f.set_result(res)
+
+	def raw_batch(self, cmds, timeout=None):
+
+		"""Returns future of list of responses of commands sent in order."""
+
+		return gather(self.loop,*[self.raw(cmd,timeout) for cmd in cmds])
+
+	def get_model(self):
+
+		"""Gets Model Information."""
+
+		try:
+			res = yield self.raw('MDL')
+
+		except CommandError:
+			self.logger.error('get_model()')
+			raise Return(0)
+
+		(cmd,self.model)=res.split(",")
+
+		raise Return(self.model)
+
+	def get_version(self):
+
+		"""Gets Firmware Version."""
+
+		try:
+			res = yield self.raw('VER')
+
+		except CommandError:
+			self.logger.error('get_version()')
+			raise Return(0)
+
+		(cmd,self.version)=res.split(",")
+
+		raise Return(self.version)
+
+	def get_rssi_power(self):
+
+		"""Returns current RSSI level and its frequency, see UnidenScanner.get_rssi_power()."""
+
+		try:
+			res = yield self.raw('PWR')
+
+		except CommandError:
+			self.logger.error('get_rssi_power()')
+			raise Return(0)
+
+		raise Return(parse_rssi_power(res))
+
+	def get_reception_status(self):
+
+		"""Returns reception status, see UnidenScanner.get_reception_status()."""
+
+		try:
+			res = yield self.raw('GLG')
+
+		except CommandError:
+			self.logger.error('get_reception_status()')
+			raise Return(0)
+
+		raise Return(parse_reception_status(res))
+
+	def get_current_status(self):
+
+		"""Returns current scanner status, see UnidenScanner.get_current_status()."""
+
+		try:
+			res = yield self.raw('STS')
+
+		except CommandError:
+			self.logger.error('get_current_status()')
+			raise Return(0)
+
+		raise Return(parse_current_status(res))
+
+	def enter_program_mode(self):
+
+		try:
+			res = yield self.raw('PRG')
+
+		except CommandError:
+			self.logger.error('enter_program_mode()')
+			raise Return(0)
+
+		self.isProgramMode=True
+
+		raise Return(1)
+
+	def exit_program_mode(self):
+
+		try:
+			res = yield self.raw('EPG')
+
+		except CommandError:
+			self.logger.error('exit_program_mode()')
+			raise Return(0)
+
+		self.isProgramMode=False
+
+		raise Return(1)
+
+	def get_scan_settings(self):
+
+		"""Enters program mode and gets scan settings data recursively,
+		see UnidenScanner.get_scan_settings()."""
+
+		if not self.isProgramMode: yield self.enter_program_mode()
+
+		try:
+			sih = yield self.raw('SIH')
+			sit = yield self.raw('SIT')
+
+		except CommandError:
+			self.logger.error('get_scan_settings(): failed to get head/tail.')
+			raise Return(0)
+
+		(sih,self.system_index_head) = sih.split(',')
+		(sit,self.system_index_tail) = sit.split(',')
+
+		sys_index = self.system_index_head
+
+		while int(sys_index) <> -1:
+			s = yield self.get_system(sys_index)
+			if s is None: raise Return(0)
+			self.systems[sys_index]=s
+			sys_index=s.fwd_index
+
+		try:
+			res = yield self.raw('QSL')
+
+		except CommandError:
+			self.logger.error('get_scan_settings(): failed to get quick system lockout list.')
+			raise Return(0)
+
+		l=[tuple(p) for p in res.split(',')[1:]]
+		self.quick_lockout=tuple(map(zero_to_head,l))
+
+		res = yield self.exit_program_mode()
+
+		raise Return(res)
+
+	def get_system(self, sys_index):
+
+		"""Returns System read with its groups, sites, quick lockout and locked out
+		TGIDs, None on error. Scanner must be in program mode."""
+
+		s=System(None,sys_index)
+
+		try:
+			res = yield self.raw(','.join(['SIN',sys_index]))
+			s.parse_data(res)
+
+			if s.sys_type <> 'CNV':
+				res = yield self.raw(','.join(['TRN',sys_index]))
+				s.parse_trn(res)
+
+			s.mark_synced()
+
+			grp_index = s.chn_grp_head
+
+			while int(grp_index) <> -1:
+				if s.sys_type == 'CNV':
+					g = yield self.get_group(grp_index,s.sys_type)
+					s.groups[grp_index]=g
+					grp_index=g.fwd_index
+				else:
+					t = yield self.get_site(grp_index)
+					s.sites[grp_index]=t
+					grp_index=t.fwd_index
+
+			if s.sys_type <> 'CNV':
+				grp_index = s.tgid_grp_head
+				while int(grp_index) <> -1:
+					g = yield self.get_group(grp_index,s.sys_type)
+					s.groups[grp_index]=g
+					grp_index=g.fwd_index
+
+			res = yield self.raw(','.join(['QGL',sys_index]))
+			s.quick_lockout=zero_to_head(tuple(res.split(',')[1]))
+			s.synced=s.synced+(s.qgl_cmd(),)
+
+			for (cmd,attr) in (('GLI','lout_tgids'),('SLI','srch_lout_tgids')):
+				tgid=0
+				l=[]
+				while int(tgid) <> -1:
+					res = yield self.raw(','.join([cmd,sys_index]))
+					tgid=res.split(',')[1]
+					l.append(tgid)
+				setattr(s,attr,tuple(l))
+
+		except CommandError, e:
+			self.logger.error('get_system(): %s' % str(e))
+			raise Return(None)
+
+		raise Return(s)
+
+	def get_group(self, grp_index, sys_type):
+
+		"""Returns Group read with its channels or TGIDs.
+		Raises CommandError on error, scanner must be in program mode."""
+
+		g=Group(None,grp_index,sys_type)
+
+		res = yield self.raw(','.join(['GIN',grp_index]))
+		g.parse_data(res)
+
+		chn_index=g.chn_head
+
+		while int(chn_index) <> -1:
+			if sys_type == 'CNV':
+				c=Channel(None,chn_index)
+				res = yield self.raw(','.join(['CIN',chn_index]))
+				c.parse_data(res)
+				g.channels[chn_index]=c
+			else:
+				c=TalkGroupID(None,chn_index)
+				res = yield self.raw(','.join(['TIN',chn_index]))
+				c.parse_data(res)
+				g.tgids[chn_index]=c
+			chn_index=c.fwd_index
+
+		raise Return(g)
+
+	def get_site(self, sit_index):
+
+		"""Returns Site read with its trunk frequencies and band plans.
+		Raises CommandError on error, scanner must be in program mode."""
+
+		t=Site(None,sit_index)
+
+		res = yield self.raw(','.join(['SIF',sit_index]))
+		t.parse_data(res)
+
+		chn_index=t.chn_head
+
+		while int(chn_index) <> -1:
+			f=TrunkFrequency(None,chn_index)
+			res = yield self.raw(','.join(['TFQ',chn_index]))
+			f.parse_data(res)
+			t.trunk_frqs[chn_index]=f
+			chn_index=f.fwd_index
+
+		(mcp,abp) = yield self.raw_batch([','.join(['MCP',sit_index]),','.join(['ABP',sit_index])])
+		t.parse_mcp(mcp)
+		t.parse_abp(abp)
+
+		raise Return(t)
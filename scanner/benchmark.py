@@ -0,0 +1,323 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#
+# Uniden Scanner Python API
+# Copyright (C) 2014-2015 Anton Komarov
+#
+# This program is free software; you can redistribute it and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with this program;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os
+import sys
+import json
+import time
+import yaml
+import shutil
+import tempfile
+import logging
+import argparse
+from uniden import *
+from emulator import ScannerEmulator
+import formats
+
+# create logger
+module_logger = logging.getLogger('uniden_api.benchmark')
+
+# object type of each command, used for per object type report
+object_types={'SIN':'system', 'TRN':'system', 'QGL':'system', 'GLI':'system', 'SLI':'system',
+	'GIN':'group', 'SIF':'site', 'MCP':'site', 'ABP':'site', 'CIN':'channel',
+	'TIN':'tgid', 'TFQ':'trunk_frq', 'SCO':'search', 'SHK':'search', 'CLC':'search',
+	'CSG':'search', 'BSP':'search', 'BBS':'search', 'CBP':'search', 'CSP':'search',
+	'SSP':'search', 'GLF':'search', 'BLT':'settings', 'BSV':'settings', 'COM':'settings',
+	'KBP':'settings', 'OMS':'settings', 'PRI':'settings', 'AGV':'settings',
+	'SCT':'settings', 'CNT':'settings', 'SCN':'settings'}
+
+# set_scan_settings writes back every record, as before dirty tracking, so runs stay
+# comparable, set_scan_settings_dirty sends only records changed since readback
+phase_names=('get_scan_settings','set_scan_settings','set_scan_settings_dirty','search_get_data',
+	'settings_get_data')
+
+def fill(emulator, systems=500, sites=1000, channels=25000, group_size=50, trunk_frqs=4, tgid_share=0.2):
+
+	"""Fills emulator memory directly, without serial traffic.
+	One of five systems is trunked (P25 standard) and holds the sites with trunk_frqs
+	trunk frequencies each, the rest of channel blocks is split between conventional
+	channels and TGIDs (tgid_share). Returns dictionary of created record counts."""
+
+	if systems < 1: return {'systems':0, 'sites':0, 'channels':0, 'tgids':0, 'trunk_frqs':0}
+
+	trunked=0
+	if sites or tgid_share: trunked=max(1,systems/5)
+	conventional=systems-trunked
+
+	n_tfq=min(sites*trunk_frqs,channels)
+	rest=channels-n_tfq
+	n_tgid=0
+	if trunked: n_tgid=int(rest*tgid_share)
+	if not conventional: n_tgid=rest
+	n_chn=rest-n_tgid
+
+	conv_systems=[]
+	trunk_systems=[]
+
+	for i in range(0,systems):
+		if i < conventional:
+			s=emulator.create_system('CNV',name='CNV SYS %d' % i,number_tag=str(i%1000))
+			conv_systems.append(s['index'])
+		else:
+			s=emulator.create_system('P25S',name='P25 SYS %d' % i,number_tag=str(i%1000))
+			trunk_systems.append(s['index'])
+
+	n_sites=0
+	n_frqs=0
+	if trunk_systems:
+		for i in range(0,sites):
+			site=emulator.create_site(trunk_systems[i%len(trunk_systems)],name='SITE %d' % i)
+			if site is None: break
+			n_sites+=1
+			for j in range(0,trunk_frqs):
+				if n_frqs >= n_tfq: break
+				emulator.create_channel(site['index'],frq='%08d' % (4500000+n_frqs*125))
+				n_frqs+=1
+
+	def fill_groups(sys_indexes, grp_type, n, create):
+
+		g=None
+		for i in range(0,n):
+			if i%group_size == 0:
+				s=sys_indexes[(i/group_size)%len(sys_indexes)]
+				g=emulator.create_group(s,grp_type,name='GRP %d' % (i/group_size))
+			create(g['index'],i)
+
+	if conv_systems:
+		fill_groups(conv_systems,'C',n_chn,lambda g,i: emulator.create_channel(g,
+			name='CHN %d' % i,frq='%08d' % (1500000+(i%40000)*125),mod='NFM',
+			number_tag=str(i%1000)))
+	if trunk_systems:
+		fill_groups(trunk_systems,'T',n_tgid,lambda g,i: emulator.create_tgid(g,
+			name='TGID %d' % i,tgid=str(i+1),number_tag=str(i%1000)))
+
+	return {'systems':systems, 'sites':n_sites, 'channels':emulator.count('channel')-n_frqs-n_tgid,
+		'tgids':n_tgid, 'trunk_frqs':n_frqs}
+
+def measure(emulator, name, func, metrics=None):
+
+	"""Runs func and returns phase report built from emulator counters.
+	With metrics collector attached to scanner its per command data is reported too."""
+
+	emulator.reset_stats()
+	if metrics is not None: metrics.reset()
+
+	start=time.time()
+	res=func()
+	wall=time.time()-start
+
+	objects={}
+	for (cmd,n) in emulator.commands.items():
+		o=objects.setdefault(object_types.get(cmd,'other'),{'commands':0, 'wall_time':0.0})
+		o['commands']+=n
+		o['wall_time']+=emulator.wall[cmd]
+
+	n=sum(emulator.commands.values())
+
+	module_logger.info('%s: %d commands in %.3fs' % (name,n,wall))
+
+	d={'result':res, 'wall_time':wall, 'commands':n,
+		'commands_per_sec':n/wall if wall else 0.0, 'bytes_sent':emulator.bytes_in,
+		'bytes_received':emulator.bytes_out, 'bytes_on_wire':emulator.bytes_in+emulator.bytes_out,
+		'objects':objects}
+
+	if metrics is not None: d['client']=metrics.to_dict()
+
+	return d
+
+def legacy_class(cls):
+
+	"""Returns dictionary based equivalent of slotted record class: instance __dict__,
+	logger looked up per instance and no interned fields, as records were before slots."""
+
+	d=dict([(k,v) for (k,v) in cls.__dict__.items() if k not in cls.__slots__
+		and k not in ('__slots__','logger')])
+	init=cls.__dict__['__init__']
+
+	def __init__(self, *args):
+		self.logger=logging.getLogger('uniden_api.%s' % cls.__name__)
+		init(self,*args)
+
+	d.update({'__init__':__init__, 'interned':()})
+
+	return type('Legacy%s' % cls.__name__,(SyncedRecord,),d)
+
+def deep_size(objs):
+
+	"""Returns bytes held by objects, their __dict__ and attribute values, every object
+	counted once. Scanner and logger are shared by all records and not counted."""
+
+	seen=set()
+	total=0
+
+	def add(o):
+		if id(o) in seen: return 0
+		seen.add(id(o))
+		return sys.getsizeof(o)
+
+	for o in objs:
+		total+=add(o)
+		values=[getattr(o,n) for n in slot_names(o.__class__) if hasattr(o,n)]
+		if hasattr(o,'__dict__'):
+			total+=add(o.__dict__)
+			values.extend([v for (k,v) in o.__dict__.items() if k not in ('scanner','logger')])
+		for v in values:
+			if v is None: continue
+			total+=add(v)
+			if isinstance(v,tuple):
+				for i in v: total+=add(i)
+
+	return total
+
+def memory(channels=25000):
+
+	"""Parses channels CIN, TIN and TFQ responses into slotted leaf records and into
+	their legacy equivalents, returns bytes held and parse time of each."""
+
+	responses={
+		Channel:['CIN,CHN %d,%08d,NFM,0,0,0,0,0,0,0,%d,%d,%d,%d,,0,,%d,OFF,0,0' % (i,1500000+i*125,
+			i-1,i+1,i/5000,i/50,i%1000) for i in range(0,channels)],
+		TalkGroupID:['TIN,TGID %d,%d,0,0,0,0,%d,%d,%d,%d,,0,%d,OFF,0,0' % (i,i+1,i-1,i+1,
+			i/5000,i/50,i%1000) for i in range(0,channels)],
+		TrunkFrequency:['TFQ,%08d,0,0,%d,%d,%d,%d,,NONE,0,' % (8510000+i*125,i-1,i+1,i/5000,
+			i/4) for i in range(0,channels)]}
+
+	report={}
+
+	for (cls,res) in responses.items():
+		r={'objects':channels}
+		for (name,c) in (('legacy',legacy_class(cls)),('slotted',cls)):
+			start=time.time()
+			objs=[]
+			for i in range(0,channels):
+				o=c(None,str(i))
+				o.parse_data(res[i])
+				objs.append(o)
+			r[name+'_time']=time.time()-start
+			r[name+'_bytes']=deep_size(objs)
+			r[name+'_per_object']=r[name+'_bytes']/channels
+			del objs
+		r['saved']=1.0-float(r['slotted_bytes'])/r['legacy_bytes']
+		report[cls.__name__]=r
+
+	return report
+
+def serialization(systems=500, sites=1000, channels=25000):
+
+	"""Reads scan settings of filled emulated scanner and times dump and load of them
+	in every format, pure Python YAML as baseline. Returns times and file sizes."""
+
+	e=ScannerEmulator()
+	port=e.start()
+
+	try:
+		fill(e,systems,sites,channels)
+		s=UnidenScanner(port)
+		s.get_scan_settings()
+		data=[s.systems[i].dump() for i in s.systems]
+		s.close()
+
+	finally:
+		e.stop()
+
+	codecs=[('yaml_pure','.yml',lambda o: yaml.dump(o,Dumper=yaml.Dumper),
+		lambda d: yaml.load(d,Loader=yaml.Loader))]
+	for (fmt,ext) in (('yaml','.yml'),('json','.json'),('msgpack','.msgpack')):
+		codecs.append((fmt,ext,formats.formats[fmt][0],formats.formats[fmt][1]))
+
+	report={'config':{'systems':systems, 'sites':sites, 'channels':channels,
+		'libyaml':formats.Dumper is not yaml.Dumper, 'msgpack':formats.msgpack is not None}}
+	path=tempfile.mkdtemp()
+
+	try:
+		for (fmt,ext,dumps,loads) in codecs:
+			fname=os.path.join(path,'scan'+ext)
+			start=time.time()
+			f=open(fname,'wb')
+			f.write(dumps(data))
+			f.close()
+			dump_time=time.time()-start
+			start=time.time()
+			f=open(fname,'rb')
+			loaded=loads(f.read())
+			f.close()
+			report[fmt]={'dump_time':dump_time, 'load_time':time.time()-start,
+				'bytes':os.path.getsize(fname), 'identical':loaded == data}
+
+	finally:
+		shutil.rmtree(path)
+
+	return report
+
+def run(systems=500, sites=1000, channels=25000, speed=None, latency=0.0, window=1,
+		phases=phase_names):
+
+	"""Fills emulated scanner and times phases. Returns report dictionary."""
+
+	e=ScannerEmulator(speed,latency)
+	port=e.start()
+
+	report={'config':{'systems':systems, 'sites':sites, 'channels':channels, 'speed':speed,
+		'latency':latency, 'window':window}, 'phases':{}}
+
+	try:
+		start=time.time()
+		report['memory']=fill(e,systems,sites,channels)
+		report['fill_time']=time.time()-start
+
+		s=UnidenScanner(port,window=window)
+		m=s.attach_metrics()
+
+		funcs={'get_scan_settings':s.get_scan_settings,
+			'set_scan_settings':lambda: s.set_scan_settings(force=True),
+			'set_scan_settings_dirty':s.set_scan_settings,
+			'search_get_data':s.get_search_settings, 'settings_get_data':s.get_system_settings}
+
+		for name in phases:
+			report['phases'][name]=measure(e,name,funcs[name],m)
+
+		s.close()
+
+	finally:
+		e.stop()
+
+	return report
+
+if __name__ == "__main__":
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--systems', type=int, default=500)
+	parser.add_argument('--sites', type=int, default=1000)
+	parser.add_argument('--channels', type=int, default=25000)
+	parser.add_argument('--speed', type=int, default=None, help='simulated baud rate')
+	parser.add_argument('--latency', type=float, default=0.0, help='scanner latency per command, s')
+	parser.add_argument('--window', type=int, default=1, help='pipeline window')
+	parser.add_argument('--phases', type=str, default=','.join(phase_names))
+	parser.add_argument('--output', type=str, default='-')
+	parser.add_argument('--memory', action='store_true', help='compare leaf record memory use')
+	parser.add_argument('--formats', action='store_true', help='compare scan settings file formats')
+	args=parser.parse_args()
+
+	if args.memory: r=memory(args.channels)
+	elif args.formats: r=serialization(args.systems,args.sites,args.channels)
+	else: r=run(args.systems,args.sites,args.channels,args.speed,args.latency,args.window,
+		args.phases.split(','))
+
+	if args.output == '-': out=sys.stdout
+	else: out=open(args.output,'w')
+
+	json.dump(r,out,indent=1,sort_keys=True)
+	out.write('\n')
@@ -0,0 +1,285 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#
+# Uniden Scanner Python API
+# Copyright (C) 2014-2015 Anton Komarov
+#
+# This program is free software; you can redistribute it and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with this program;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os
+import re
+import time
+import logging
+import argparse
+import cPickle as pickle
+from uniden import *
+
+# create logger
+module_logger = logging.getLogger('uniden_api.cache')
+
+default_path=os.path.join(os.path.expanduser('~'),'.cache','pyuniden')
+
+# cache file format version, bump when object model changes
+cache_version=1
+
+def attach(obj, scanner):
+
+	"""Sets scanner of unpickled object and all its children.
+	Lazily read objects not fetched yet have no children."""
+
+	obj.scanner=scanner
+
+	if getattr(obj,'unfetched',False): return
+
+	for name in ('groups','sites','channels','tgids','trunk_frqs'):
+		for child in getattr(obj,name,{}).values(): attach(child,scanner)
+
+def chain(scanner):
+
+	"""Returns system indexes of scanner objects in scanner list order."""
+
+	l=[]
+	sys_index=scanner.system_index_head
+
+	while sys_index in scanner.systems and len(l) < len(scanner.systems):
+		l.append(sys_index)
+		sys_index=scanner.systems[sys_index].fwd_index
+
+	return l
+
+class ScanCache:
+
+	"""On-disk cache of scanner memory: systems tree, settings and search settings.
+	One file per scanner model and firmware version. Cache is valid while
+	fingerprint matches: MEM counts, SIH/SIT and SIN header of every system.
+	Changes not visible in those responses (e.g. channel edited from keypad
+	without changing memory usage) are not detected, use refresh() then."""
+
+	def __init__(self, path=default_path):
+
+		self.logger = logging.getLogger('uniden_api.ScanCache')
+
+		self.path=path
+		self.status=None
+		self.refreshed=()
+		self.load_time=0.0
+
+	def fname(self, scanner):
+
+		"""Returns cache file name for scanner model and firmware version."""
+
+		key=re.sub(r'[^A-Za-z0-9.]+','_','%s_%s' % (scanner.model,scanner.version))
+
+		return os.path.join(self.path,'%s.pickle' % key)
+
+	def fingerprint(self, scanner, hint=()):
+
+		"""Returns fingerprint of scanner memory, scanner must be in program mode.
+		Dictionary of MEM, SIH and SIT responses and list of (index, SIN response).
+		hint is list of expected system indexes, their SIN are read as one pipelined
+		batch and system list is walked one by one only if they do not chain up."""
+
+		mem=scanner.raw('MEM')
+		sih=scanner.raw('SIH')
+		sit=scanner.raw('SIT')
+
+		sys_index=sih.split(',')[1]
+
+		if hint:
+			try:
+				res=scanner.raw_batch([','.join(['SIN',i]) for i in hint])
+
+			except CommandError:
+				res=()
+
+			systems=zip(hint,res)
+			l=[sys_index]+[r.split(',')[13] for r in res]
+			if res and l == list(hint)+['-1']:
+				return {'mem':mem, 'sih':sih, 'sit':sit, 'systems':systems}
+
+		systems=[]
+
+		while int(sys_index) <> -1:
+			res=scanner.raw(','.join(['SIN',sys_index]))
+			systems.append((sys_index,res))
+			sys_index=res.split(',')[13]
+
+		return {'mem':mem, 'sih':sih, 'sit':sit, 'systems':systems}
+
+	def read(self, scanner):
+
+		"""Returns cache file content or None if missing or not usable."""
+
+		try:
+			f=open(self.fname(scanner),'rb')
+			try: d=pickle.load(f)
+			finally: f.close()
+
+		except (IOError, EOFError, AttributeError, ImportError, pickle.UnpicklingError), e:
+			self.logger.info('read(): %s' % str(e))
+			return None
+
+		if d.get('version') <> cache_version: return None
+		if (d['model'],d['firmware']) <> (scanner.model,scanner.version): return None
+
+		return d
+
+	def save(self, scanner, fingerprint):
+
+		"""Saves scanner memory and its fingerprint to cache file."""
+
+		d={'version':cache_version, 'model':scanner.model, 'firmware':scanner.version,
+			'fingerprint':fingerprint, 'system_index_head':scanner.system_index_head,
+			'system_index_tail':scanner.system_index_tail, 'quick_lockout':scanner.quick_lockout,
+			'synced':scanner.synced, 'systems':scanner.systems, 'settings':scanner.settings,
+			'searches':scanner.searches}
+
+		if not os.path.isdir(self.path): os.makedirs(self.path)
+
+		# write aside and rename, so interrupted save never leaves broken cache
+		fname=self.fname(scanner)
+		f=open(fname+'.tmp','wb')
+		try: pickle.dump(d,f,pickle.HIGHEST_PROTOCOL)
+		finally: f.close()
+		os.rename(fname+'.tmp',fname)
+
+		return 1
+
+	def restore(self, scanner, d):
+
+		"""Sets scanner memory objects from cache file content."""
+
+		scanner.system_index_head=d['system_index_head']
+		scanner.system_index_tail=d['system_index_tail']
+		scanner.quick_lockout=d['quick_lockout']
+		scanner.synced=d['synced']
+		scanner.systems=d['systems']
+		scanner.settings=d['settings']
+		scanner.searches=d['searches']
+
+		for s in scanner.systems.values(): attach(s,scanner)
+		attach(scanner.settings,scanner)
+		attach(scanner.searches,scanner)
+
+	def load(self, scanner):
+
+		"""Loads scanner memory from cache, reading from scanner only what changed.
+		Fingerprint match loads everything from disk. Otherwise systems with changed
+		SIN header are read again, all of them if only MEM counts differ.
+		Missing cache reads whole memory. Cache is saved after any read.
+		Sets status to hit, partial or miss and refreshed to re-read system indexes."""
+
+		start=time.time()
+
+		if not scanner.isProgramMode: scanner.enter_program_mode()
+
+		try:
+			if not scanner.model: scanner.get_model()
+			if not scanner.version: scanner.get_version()
+			d=self.read(scanner)
+			hint=()
+			if d is not None: hint=[i for (i,res) in d['fingerprint']['systems']]
+			fp=self.fingerprint(scanner,hint)
+
+		except CommandError, e:
+			self.logger.error('load(): %s' % str(e))
+			scanner.exit_program_mode()
+			return 0
+
+		if d is None:
+			self.status='miss'
+			self.refreshed=tuple([i for (i,res) in fp['systems']])
+			scanner.systems={}
+			if not scanner.get_scan_settings(): return 0
+			scanner.get_system_settings()
+			scanner.get_search_settings()
+			self.save(scanner,fp)
+			self.load_time=time.time()-start
+			return 1
+
+		self.restore(scanner,d)
+
+		if d['fingerprint'] == fp:
+			self.status='hit'
+			self.refreshed=()
+			scanner.exit_program_mode()
+			self.load_time=time.time()-start
+			return 1
+
+		cached=dict(d['fingerprint']['systems'])
+		changed=[i for (i,res) in fp['systems'] if cached.get(i) <> res]
+		if not changed and d['fingerprint']['mem'] <> fp['mem']:
+			changed=[i for (i,res) in fp['systems']]
+
+		self.status='partial'
+		self.refreshed=tuple(changed)
+
+		if not self.refresh(scanner,changed,fp): return 0
+
+		self.load_time=time.time()-start
+
+		return 1
+
+	def refresh(self, scanner, sys_indexes=None, fp=None):
+
+		"""Re-reads given systems (all by default), drops deleted ones and saves cache."""
+
+		if not scanner.isProgramMode: scanner.enter_program_mode()
+
+		try:
+			if fp is None: fp=self.fingerprint(scanner,chain(scanner))
+
+		except CommandError, e:
+			self.logger.error('refresh(): %s' % str(e))
+			scanner.exit_program_mode()
+			return 0
+
+		if sys_indexes is None: sys_indexes=[i for (i,res) in fp['systems']]
+		sys_indexes=set(sys_indexes)
+
+		systems={}
+		for (i,res) in fp['systems']:
+			if i in sys_indexes or i not in scanner.systems:
+				s=System(scanner,i)
+				if not s.get_data():
+					scanner.exit_program_mode()
+					return 0
+				systems[i]=s
+			else:
+				systems[i]=scanner.systems[i]
+
+		scanner.systems=systems
+		(sih,scanner.system_index_head)=fp['sih'].split(',')
+		(sit,scanner.system_index_tail)=fp['sit'].split(',')
+
+		if not scanner.get_quick_lockout(): return 0
+
+		if not scanner.exit_program_mode(): return 0
+
+		self.save(scanner,fp)
+
+		return 1
+
+if __name__ == "__main__":
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--dev', type=str, default='/dev/ttyUSB0')
+	parser.add_argument('--speed', type=str, default='115200')
+	parser.add_argument('--path', type=str, default=default_path)
+	args=parser.parse_args()
+
+	s=UnidenScanner(args.dev,args.speed)
+	c=ScanCache(args.path)
+	if not c.load(s): print "load() returned 0"
+
+	print ('Cache:\t\t\t%s') % c.status
+	print ('Refreshed systems:\t%d') % len(c.refreshed)
+	print ('Load time:\t\t%.3f s') % c.load_time
@@ -0,0 +1,474 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#
+# Uniden Scanner Python API
+# Copyright (C) 2014-2015 Anton Komarov
+#
+# This program is free software; you can redistribute it and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with this program;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import formats
+import logging
+import argparse
+from uniden import *
+
+# create logger
+module_logger = logging.getLogger('uniden_api.diff')
+
+# commands creating memory record, response holds index of new record
+create_cmds=('CSY','AGC','AGT','AST','ACC','ACT')
+
+class Step:
+
+	"""Plan step: action (create, update, delete or move), object kind, name and commands.
+	Commands may refer to index of object created by earlier step as @N placeholder,
+	creating command of the step binds step ref to index of the new record."""
+
+	def __init__(self, action, kind, name, cmds, ref=None):
+
+		self.action=action
+		self.kind=kind
+		self.name=name
+		self.cmds=cmds
+		self.ref=ref
+
+class Plan:
+
+	"""Ordered list of steps turning scanner memory into desired one."""
+
+	def __init__(self):
+
+		self.logger = logging.getLogger('uniden_api.Plan')
+
+		self.steps=[]
+		self.refs=0
+
+	def new_ref(self):
+
+		"""Returns new placeholder for index of record created by plan."""
+
+		self.refs+=1
+
+		return '@%d' % self.refs
+
+	def add(self, action, kind, name, cmds, ref=None):
+
+		"""Adds step to plan, steps without commands are dropped."""
+
+		if cmds: self.steps.append(Step(action,kind,name,cmds,ref))
+
+	def commands(self):
+
+		"""Returns list of all plan commands, placeholders not resolved."""
+
+		l=[]
+		for step in self.steps: l.extend(step.cmds)
+
+		return l
+
+	def summary(self, speed=115200, latency=0.0):
+
+		"""Returns dictionary of step and command counts, bytes on wire and estimated
+		wire time at speed baud (10 bits per byte) plus latency seconds per command.
+		Responses are estimated as command name and OK or new record index."""
+
+		steps={}
+		for step in self.steps: steps[step.action]=steps.get(step.action,0)+1
+
+		commands={}
+		sent=0
+		received=0
+
+		for cmd in self.commands():
+			mnemonic=cmd.split(',',1)[0]
+			commands[mnemonic]=commands.get(mnemonic,0)+1
+			sent+=len(cmd)+1
+			if mnemonic in create_cmds: received+=len(mnemonic)+7
+			else: received+=len(mnemonic)+4
+
+		n=sum(commands.values())
+
+		return {'steps':steps, 'commands':commands, 'total_commands':n, 'bytes_sent':sent,
+			'bytes_received':received, 'wire_time':(sent+received)*10.0/speed+n*latency}
+
+	def show(self):
+
+		"""Shows plan steps."""
+
+		print ('--------PLAN-------')
+		for step in self.steps:
+			print ('%s\t%s\t%s\t%d commands') % (step.action,step.kind,step.name,len(step.cmds))
+
+	def apply(self, scanner, refresh=False):
+
+		"""Enters program mode and sends plan to scanner.
+		Commands between record creations are sent as pipelined batches.
+		Scanner objects are not updated, use refresh to re-read scan settings."""
+
+		refs={}
+		pending=[]
+
+		def resolve(cmd):
+
+			l=cmd.split(',',2)
+			if len(l) > 1 and l[1].startswith('@'): l[1]=refs[l[1]]
+
+			return ','.join(l)
+
+		if not scanner.isProgramMode: scanner.enter_program_mode()
+
+		try:
+			for step in self.steps:
+				for cmd in step.cmds:
+					cmd=resolve(cmd)
+					if cmd.split(',',1)[0] not in create_cmds:
+						pending.append(cmd)
+						continue
+					scanner.raw_batch(pending)
+					pending=[]
+					(c,index)=scanner.raw(cmd).split(',')
+					if int(index) == -1: raise CommandError('%s: memory full' % cmd)
+					refs[step.ref]=index
+
+			scanner.raw_batch(pending)
+
+		except CommandError, e:
+			self.logger.error('apply(): %s' % str(e))
+			scanner.exit_program_mode()
+			return 0
+
+		if not scanner.exit_program_mode(): return 0
+
+		if refresh:
+			scanner.systems={}
+			return scanner.get_scan_settings()
+
+		return 1
+
+def in_order(d):
+
+	"""Returns objects of dictionary keyed by index in scanner list order.
+	Follows reverse/forward indexes when known, otherwise sorts by index."""
+
+	fwd={}
+	for (i,o) in d.items(): fwd[o.rev_index]=(i,o)
+
+	l=[]
+	if None not in fwd:
+		n=fwd.get('-1')
+		while n is not None and len(l) < len(d):
+			l.append(n[1])
+			n=fwd.get(n[0])
+
+	if len(l) <> len(d): l=[d[i] for i in sorted(d,key=int)]
+
+	return l
+
+def build_tree(systems):
+
+	"""Builds list of systems from load_scan_settings() style list of dictionaries.
+	Objects are not attached to scanner and have no memory indexes."""
+
+	l=[]
+
+	for d in systems:
+
+		d=dict(d)
+		groups=d.pop('groups',[])
+		sites=d.pop('sites',[])
+
+		s=System(None,None)
+		if not s.load(**d): continue
+
+		for (i,gd) in enumerate(groups):
+			gd=dict(gd)
+			channels=gd.pop('channels',[])
+			tgids=gd.pop('tgids',[])
+			g=Group(None,None,s.sys_type)
+			g.load(**gd)
+			for (j,cd) in enumerate(channels):
+				g.channels[str(j)]=Channel(None,None)
+				g.channels[str(j)].load(**cd)
+			for (j,td) in enumerate(tgids):
+				g.tgids[str(j)]=TalkGroupID(None,None)
+				g.tgids[str(j)].load(**td)
+			s.groups[str(i)]=g
+
+		for (i,sd) in enumerate(sites):
+			sd=dict(sd)
+			trunk_frqs=sd.pop('trunk_frqs',[])
+			t=Site(None,None)
+			t.load(**sd)
+			for (j,fd) in enumerate(trunk_frqs):
+				t.trunk_frqs[str(j)]=TrunkFrequency(None,None)
+				t.trunk_frqs[str(j)].load(**fd)
+			s.sites[str(i)]=t
+
+		l.append(s)
+
+	return l
+
+def match(current, desired, key):
+
+	"""Pairs desired objects with current ones by key, duplicates are paired in order.
+	Returns list of (current or None, desired) pairs and list of unmatched current objects."""
+
+	pool={}
+	for o in current: pool.setdefault(key(o),[]).append(o)
+
+	pairs=[]
+	for o in desired:
+		l=pool.get(key(o))
+		if l: pairs.append((l.pop(0),o))
+		else: pairs.append((None,o))
+
+	paired=set([id(c) for (c,d) in pairs if c is not None])
+
+	return (pairs,[o for o in current if id(o) not in paired])
+
+def changed(current, desired):
+
+	"""Returns desired set commands whose data differ from current ones.
+	Command name and index are not compared."""
+
+	return [d for (c,d) in zip(current,desired) if c.split(',',2)[2:] <> d.split(',',2)[2:]]
+
+def channel_key(o):
+
+	if isinstance(o,Channel): return ('C',o.name,int(o.frq or 0))
+
+	return ('T',o.name,o.tgid)
+
+def value_key(o):
+
+	"""Returns frequency or TGID key of channel or TGID, name not included."""
+
+	if isinstance(o,Channel): return ('C',int(o.frq or 0))
+
+	return ('T',o.tgid)
+
+def members(g):
+
+	"""Returns channels or TGIDs of group in list order."""
+
+	return in_order(g.channels)+in_order(g.tgids)
+
+def match_channels(groups, cur_groups):
+
+	"""Pairs desired channels and TGIDs of (current, desired) groups with current ones.
+	Same name and frequency (TGID) are matched in the whole system first, so channels
+	found in other group are moved. Left ones are matched within their current group
+	by frequency (TGID), then by position, and are updated in place.
+	Returns dictionary of id of desired object to (current object, its group) and
+	list of unmatched (current object, group) pairs."""
+
+	pool={}
+	for g in cur_groups:
+		for o in members(g): pool.setdefault(channel_key(o),[]).append((o,g))
+
+	paired={}
+	for (cg,dg) in groups:
+		for d in members(dg):
+			l=pool.get(channel_key(d))
+			if l: paired[id(d)]=l.pop(0)
+
+	used=set([id(c) for (c,g) in paired.values()])
+
+	for (cg,dg) in groups:
+		if cg is None: continue
+
+		left=[o for o in members(cg) if id(o) not in used]
+		wanted=[d for d in members(dg) if id(d) not in paired]
+
+		by_value={}
+		for o in left: by_value.setdefault(value_key(o),[]).append(o)
+		for d in wanted:
+			l=by_value.get(value_key(d))
+			if l:
+				o=l.pop(0)
+				paired[id(d)]=(o,cg)
+				used.add(id(o))
+
+		left=[o for o in left if id(o) not in used]
+		wanted=[d for d in wanted if id(d) not in paired]
+		for (o,d) in zip(left,wanted):
+			paired[id(d)]=(o,cg)
+			used.add(id(o))
+
+	unmatched=[(o,g) for g in cur_groups for o in members(g) if id(o) not in used]
+
+	return (paired,unmatched)
+
+def plan_group(plan, cg, dg, paired, ordered):
+
+	"""Adds steps for channels or TGIDs of desired group dg, current group cg is None for
+	new group. paired is result of match_channels(), channel paired with one in other
+	group is moved. With ordered, channels out of desired order are moved to the group tail."""
+
+	grp_index=dg.grp_index
+	if dg.grp_type == 'T': (desired,create)=(in_order(dg.tgids),'ACT')
+	else: (desired,create)=(in_order(dg.channels),'ACC')
+
+	pairs=[(paired.get(id(d),(None,None)),d) for d in desired]
+
+	# longest desired prefix already in place, the rest is appended to tail
+	keep=len(pairs)
+	if ordered and cg is not None:
+		position=dict([(id(o),i) for (i,o) in enumerate(members(cg))])
+		last=-1
+		for (i,((c,owner),d)) in enumerate(pairs):
+			if owner is not cg or position[id(c)] < last:
+				keep=i
+				break
+			last=position[id(c)]
+
+	for (i,((c,owner),d)) in enumerate(pairs):
+
+		if c is None:
+			d.chn_index=plan.new_ref()
+			plan.add('create',d.__class__.__name__,d.name,
+				[','.join([create,grp_index]),d.set_cmd()],d.chn_index)
+
+		elif owner is cg and i < keep:
+			d.chn_index=c.chn_index
+			plan.add('update',d.__class__.__name__,d.name,changed(c.set_cmds(),d.set_cmds()))
+
+		else:
+			d.chn_index=plan.new_ref()
+			plan.add('move',d.__class__.__name__,d.name,[','.join(['DCH',c.chn_index]),
+				','.join([create,grp_index]),d.set_cmd()],d.chn_index)
+
+def plan_site(plan, cs, ds):
+
+	"""Adds steps for trunk frequencies of desired site ds, current site cs is None for
+	new site. Trunk frequencies are matched by frequency."""
+
+	current=[]
+	if cs is not None: current=in_order(cs.trunk_frqs)
+
+	(pairs,deleted)=match(current,in_order(ds.trunk_frqs),lambda o: int(o.frq or 0))
+
+	for t in deleted:
+		plan.add('delete','TrunkFrequency',t.frq,[','.join(['DCH',t.chn_index])])
+
+	for (c,d) in pairs:
+		if c is None:
+			d.chn_index=plan.new_ref()
+			plan.add('create','TrunkFrequency',d.frq,[','.join(['ACC',ds.sit_index]),d.set_cmd()],
+				d.chn_index)
+		else:
+			d.chn_index=c.chn_index
+			plan.add('update','TrunkFrequency',d.frq,changed(c.set_cmds(),d.set_cmds()))
+
+def plan_system(plan, cs, ds, ordered):
+
+	"""Adds steps turning current system cs (None for new system) into desired ds."""
+
+	if cs is None:
+		ds.sys_index=plan.new_ref()
+		protect=getattr(ds,'protected','0')
+		plan.add('create','System',ds.name,[','.join(['CSY',ds.sys_type,protect])]+
+			list(ds.set_cmds()[:-1]),ds.sys_index)
+		(cur_groups,cur_sites)=([],[])
+	else:
+		ds.sys_index=cs.sys_index
+		plan.add('update','System',ds.name,changed(cs.set_cmds()[:-1],ds.set_cmds()[:-1]))
+		(cur_groups,cur_sites)=(in_order(cs.groups),in_order(cs.sites))
+
+	(groups,deleted_groups)=match(cur_groups,in_order(ds.groups),lambda o: (o.grp_type,o.name))
+
+	(paired,unmatched)=match_channels(groups,cur_groups)
+
+	# free memory first, channels of deleted groups go with their group
+	deleted=set([id(g) for g in deleted_groups])
+	for (o,g) in unmatched:
+		if id(g) in deleted: continue
+		plan.add('delete',o.__class__.__name__,o.name,[','.join(['DCH',o.chn_index])])
+
+	for (c,d) in groups:
+		if c is None:
+			d.grp_index=plan.new_ref()
+			create='AGC'
+			if d.grp_type == 'T': create='AGT'
+			plan.add('create','Group',d.name,[','.join([create,ds.sys_index]),d.set_cmd()],d.grp_index)
+		else:
+			d.grp_index=c.grp_index
+			plan.add('update','Group',d.name,changed(c.set_cmds(),d.set_cmds()))
+		plan_group(plan,c,d,paired,ordered)
+
+	for g in deleted_groups:
+		plan.add('delete','Group',g.name,[','.join(['DGR',g.grp_index])])
+
+	(sites,deleted_sites)=match(cur_sites,in_order(ds.sites),lambda o: o.name)
+
+	for s in deleted_sites:
+		plan.add('delete','Site',s.name,[','.join(['DGR',s.sit_index])])
+
+	for (c,d) in sites:
+		if c is None:
+			d.sit_index=plan.new_ref()
+			plan.add('create','Site',d.name,[','.join(['AST',ds.sys_index,'']),d.set_cmd()],d.sit_index)
+		else:
+			d.sit_index=c.sit_index
+			plan.add('update','Site',d.name,changed(c.set_cmds(),d.set_cmds()))
+		plan_site(plan,c,d)
+
+	# group quick lockout last, quick keys belong to groups
+	if cs is None: plan.add('update','System',ds.name,[ds.qgl_cmd()])
+	else: plan.add('update','System',ds.name,changed([cs.qgl_cmd()],[ds.qgl_cmd()]))
+
+def make_plan(scanner, desired, ordered=False):
+
+	"""Returns Plan turning scan settings read by get_scan_settings() into desired ones.
+	desired is list of systems as accepted by load_scan_settings() or built by build_tree().
+	Systems are matched by type and name, groups by type and name, sites by name,
+	trunk frequencies by frequency. Channels (TGIDs) are matched by name and frequency
+	(TGID) in the system, then by frequency (TGID) and by position in their group, see
+	match_channels(). Unmatched records are deleted, new ones created, changed ones
+	updated, channels found in other group of the system are moved. Channel order is
+	kept only with ordered."""
+
+	if desired and isinstance(desired[0],dict): desired=build_tree(desired)
+
+	plan=Plan()
+
+	(systems,deleted)=match(in_order(scanner.systems),desired,lambda o: (o.sys_type,o.name))
+
+	for s in deleted:
+		plan.add('delete','System',s.name,[','.join(['DSY',s.sys_index])])
+
+	for (c,d) in systems: plan_system(plan,c,d,ordered)
+
+	return plan
+
+if __name__ == "__main__":
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--dev', type=str, default='/dev/ttyUSB0')
+	parser.add_argument('--speed', type=str, default='115200')
+	parser.add_argument('--config', type=str, required=True, help='desired scan settings YAML')
+	parser.add_argument('--ordered', action='store_true', help='keep channel order')
+	parser.add_argument('--latency', type=float, default=0.0, help='scanner latency per command, s')
+	parser.add_argument('--apply', action='store_true', help='send plan to scanner')
+	args=parser.parse_args()
+
+	s=UnidenScanner(args.dev,args.speed)
+	if not s.get_scan_settings(): print "get_scan_settings() returned 0"
+
+	p=make_plan(s,formats.load(args.config),args.ordered)
+	p.show()
+
+	summary=p.summary(int(args.speed),args.latency)
+	print ('Commands:\t\t\t%d') % summary['total_commands']
+	for mnemonic in sorted(summary['commands']):
+		print ('\t%s\t\t\t%d') % (mnemonic,summary['commands'][mnemonic])
+	print ('Estimated wire time:\t\t%.3f s') % summary['wire_time']
+
+	if args.apply and not p.apply(s): print "apply() returned 0"
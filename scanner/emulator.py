@@ -0,0 +1,796 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#
+# Uniden Scanner Python API
+# Copyright (C) 2014-2015 Anton Komarov
+#
+# This program is free software; you can redistribute it and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with this program;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os
+import pty
+import tty
+import time
+import select
+import logging
+import argparse
+import threading
+import collections
+from protocol import schema
+
+# create logger
+module_logger = logging.getLogger('uniden_api.emulator')
+
+# Record layouts from protocol schema, field names as in uniden.py.
+record_kinds={'SIN':'system', 'TRN':'system', 'GIN':'group', 'SIF':'site',
+	'CIN':'channel', 'TIN':'tgid', 'TFQ':'trunk_frq'}
+
+record_layouts=dict([(cmd,(kind,schema[cmd].get,schema[cmd].set))
+	for (cmd,kind) in record_kinds.items()])
+
+# Record defaults of freshly created memory blocks
+
+system_defaults={'name':'NONAME', 'quick_key':'.', 'hld':'0', 'lout':'0', 'dly':'2',
+	'start_key':'.', 'number_tag':'NONE', 'agc_analog':'0', 'agc_digital':'0',
+	'p25waiting':'200', 'protect':'0', 'id_search':'0', 's_bit':'0', 'end_code':'0',
+	'afs':'0', 'emg':'0', 'emgl':'0', 'fmap':'0', 'ctm_fmap':'', 'mot_id':'0',
+	'emg_color':'OFF', 'emg_pattern':'0', 'p25nac':'SRCH', 'pri_id_scan':'0',
+	'id_lout_grp_head':'-1', 'id_lout_grp_tail':'-1', 'qgl':'0000000000'}
+
+group_defaults={'name':'NONAME', 'quick_key':'.', 'lout':'0', 'latitude':'00000000N',
+	'longitude':'000000000W', 'grp_range':'1', 'gps_enable':'0'}
+
+site_defaults={'name':'NONAME', 'quick_key':'.', 'hld':'0', 'lout':'0', 'mod':'AUTO',
+	'att':'0', 'c_ch':'1', 'start_key':'.', 'latitude':'00000000N', 'longitude':'000000000W',
+	'sit_range':'1', 'gps_enable':'0', 'mot_type':'STD', 'edacs_type':'WIDE',
+	'p25waiting':'200'}
+
+channel_defaults={'name':'NONAME', 'frq':'00000000', 'mod':'AUTO', 'dcs':'0', 'tlock':'0',
+	'lout':'0', 'pri':'0', 'att':'0', 'alt':'0', 'altl':'0', 'audio_type':'0',
+	'p25nac':'SRCH', 'number_tag':'NONE', 'alt_color':'OFF', 'alt_pattern':'0',
+	'vol_offset':'0'}
+
+tgid_defaults={'name':'NONAME', 'tgid':'0', 'lout':'0', 'pri':'0', 'alt':'0', 'altl':'0',
+	'audio_type':'0', 'number_tag':'NONE', 'alt_color':'OFF', 'alt_pattern':'0',
+	'vol_offset':'0'}
+
+trunk_frq_defaults={'frq':'00000000', 'lcn':'0', 'lout':'0', 'number_tag':'NONE',
+	'vol_offset':'0'}
+
+# Settings and search commands with one record, get and set shapes are the same
+
+single_defaults={'BLT':['IF','BLUE','3'], 'BSV':['0','4'], 'COM':['115200',''],
+	'KBP':['0','0','0'], 'OMS':['','','',''], 'PRI':['0','10','2'],
+	'AGV':['','','0','0','0','0','0'], 'CNT':['8'],
+	'SCN':['1','','0','0','','0','0']+['']*14, 'SCO':['','AUTO','0','2','','0',
+	'0000000000000000','0','','','256','','0','0','200'],
+	'SHK':['','','','','',''], 'CLC':['0','0','','0','0','3','1111111','0','0','.',
+	'NONE','OFF','0'], 'CSG':['0000000000'], 'BSP':['01460000','500','10M','0'],
+	'VOL':['8'], 'SQL':['3'], 'P25':['','','0']}
+
+# Settings and search commands indexed by first parameter, index is not echoed back
+# except for SSP
+
+indexed_defaults={'BBS':['00000000','00000000'], 'CBP':['STD']+['']*24,
+	'CSP':['NONAME','00250000','05120000','500','AUTO','0','2','','0','0','0','','',
+	'.','.','','NONE','0','0','200']}
+
+service_indexes=(1,2,3,4,5,6,7,8,9,11,12,15)
+
+ssp_defaults=['2','0','0','0','.','.','','NONE','0','0','200']
+
+# Default band coverage, (step, modulation) of bands 1-31
+band_coverage=(('500','AM'),('500','AM'),('500','AM'),('500','NFM'),('500','NFM'),
+	('500','NFM'),('500','NFM'),('500','NFM'),('5000','WFM'),('833','AM'),('500','AM'),
+	('500','NFM'),('500','NFM'),('500','NFM'),('500','NFM'),('500','NFM'),('500','NFM'),
+	('500','NFM'),('625','NFM'),('625','NFM'),('1250','NFM'),('1250','NFM'),('625','NFM'),
+	('1250','NFM'),('1250','NFM'),('1250','NFM'),('1250','NFM'),('1250','NFM'),('1250','NFM'),
+	('1250','NFM'),('1250','NFM'))
+
+# Commands accepted only in program mode
+program_mode_cmds=('SIH','SIT','SIN','TRN','GIN','SIF','CIN','TIN','TFQ','MCP','ABP',
+	'QSL','QGL','GLI','SLI','LOI','ULI','CSY','DSY','AGC','AGT','AST','ACC','ACT','DGR',
+	'DCH','BLT','BSV','COM','KBP','OMS','PRI','AGV','SCT','CNT','SCN','SCO',
+	'SHK','CLC','CSG','BSP','BBS','CBP','CSP','SSP','GLF','LOF','ULF')
+
+memory_limits={'system':500, 'site':1000, 'channel':25000}
+
+class ScannerEmulator:
+
+	"""Emulated scanner speaking the remote protocol on a pseudo-terminal.
+
+	Memory is kept as linked lists of records addressed by memory block index,
+	the same way the scanner exposes it. Port name of the emulator is passed
+	to UnidenScanner as is. speed is simulated link baud rate (None means no
+	transfer delay), latency is scanner processing time per command in seconds."""
+
+	logger = logging.getLogger('uniden_api.ScannerEmulator')
+
+	def __init__(self, speed=None, latency=0.0, model='BCD396XT', version='Version 1.00.00'):
+
+		self.speed=speed
+		self.latency=latency
+		self.model=model
+		self.version=version
+
+		self.port=None
+		self.master=None
+		self.slave=None
+		self.thread=None
+		self.running=False
+		self.lock=threading.RLock()
+
+		self.program_mode=False
+		self.records={}
+		self.counts=collections.Counter()
+		self.next_index=100
+		self.root={'chn_grp_head':'-1', 'chn_grp_tail':'-1'}
+		self.quick_lockout=['0000000000']*10
+		self.global_lout_frqs=[]
+		self.iterators={}
+		self.singles=dict([(k,list(v)) for (k,v) in single_defaults.items()])
+		self.indexed={}
+		for cmd in indexed_defaults:
+			for i in range(0,10): self.indexed[(cmd,str(i))]=list(indexed_defaults[cmd])
+			if cmd == 'CSP':
+				for i in range(0,10): self.indexed[(cmd,str(i))][0]='CUSTOM %d' % i
+		for i in service_indexes:
+			self.indexed[('SSP',str(i))]=[str(i)]+ssp_defaults
+
+		self.reception=['']*12
+		self.frq='01460000'
+		self.carriers={}
+		self.carrier_width=125
+		self.noise_floor=100
+		self.squelch_level=200
+
+		self.reset_stats()
+
+	def reset_stats(self):
+
+		"""Resets command, byte and wall time counters.
+		Wall time of a command is time from previous response to its response."""
+
+		self.commands=collections.Counter()
+		self.wall=collections.Counter()
+		self.bytes_in=0
+		self.bytes_out=0
+		self.last_reply=time.time()
+
+	def start(self):
+
+		"""Opens pseudo-terminal and starts serving it. Returns port name."""
+
+		(self.master,self.slave)=pty.openpty()
+		tty.setraw(self.slave)
+		self.port=os.ttyname(self.slave)
+
+		self.running=True
+		self.thread=threading.Thread(target=self.serve)
+		self.thread.daemon=True
+		self.thread.start()
+
+		self.logger.info('serving on %s' % self.port)
+
+		return self.port
+
+	def stop(self):
+
+		"""Stops serving and closes pseudo-terminal."""
+
+		self.running=False
+		if self.thread: self.thread.join()
+		self.thread=None
+
+		for fd in (self.master,self.slave):
+			if fd is not None: os.close(fd)
+
+		self.master=None
+		self.slave=None
+
+	def serve(self):
+
+		"""Reads commands from pseudo-terminal and writes responses."""
+
+		buf=''
+
+		while self.running:
+
+			(r,w,x)=select.select([self.master],[],[],0.1)
+			if not r: continue
+
+			try:
+				buf=''.join([buf,os.read(self.master,4096)])
+
+			except OSError:
+				continue
+
+			while '\r' in buf:
+
+				(cmd,sep,buf)=buf.partition('\r')
+
+				if self.speed: time.sleep(10.0*(len(cmd)+1)/self.speed)
+				if self.latency: time.sleep(self.latency)
+
+				res=''.join([self.handle(cmd),'\r'])
+
+				if self.speed: time.sleep(10.0*len(res)/self.speed)
+
+				os.write(self.master,res)
+
+				now=time.time()
+				self.wall[cmd.split(',',1)[0]]+=now-self.last_reply
+				self.last_reply=now
+
+	def handle(self, line):
+
+		"""Handles one command line, returns response without terminator."""
+
+		args=line.split(',')
+		cmd=args.pop(0)
+
+		with self.lock:
+
+			self.commands[cmd]+=1
+			self.bytes_in+=len(line)+1
+
+			if cmd in program_mode_cmds and not self.program_mode:
+				res=','.join([cmd,'NG'])
+			else:
+				handler=getattr(self,'cmd_%s' % cmd.lower(),None)
+				if handler is None and cmd in self.singles: handler=self.cmd_single
+				if handler is None: handler=self.cmd_unknown
+
+				try:
+					res=handler(cmd,args)
+
+				except (KeyError,IndexError,ValueError), e:
+					self.logger.debug('handle(): %s %s' % (line,str(e)))
+					res=','.join([cmd,'NG'])
+
+			self.bytes_out+=len(res)+1
+
+		self.logger.debug('handle(): %s -> %s' % (line,res))
+
+		return res
+
+	# Memory model
+
+	def allocate(self, kind, defaults, **fields):
+
+		"""Allocates memory block, returns record."""
+
+		if kind in memory_limits and self.count(kind) >= memory_limits[kind]:
+			return None
+
+		index=str(self.next_index)
+		self.next_index+=1
+		self.counts[kind]+=1
+
+		r=dict(defaults)
+		r.update(fields)
+		r.update({'kind':kind, 'index':index, 'rev_index':'-1', 'fwd_index':'-1'})
+		self.records[index]=r
+
+		return r
+
+	def count(self, kind):
+
+		"""Returns number of memory blocks of given kind."""
+
+		if kind == 'channel': kinds=('channel','tgid','trunk_frq')
+		else: kinds=(kind,)
+
+		return sum([self.counts[k] for k in kinds])
+
+	def link(self, owner, head, tail, r):
+
+		"""Appends record to linked list of owner."""
+
+		t=owner[tail]
+		if t == '-1':
+			owner[head]=r['index']
+			r['seq_no']='1'
+		else:
+			self.records[t]['fwd_index']=r['index']
+			r['rev_index']=t
+			r['seq_no']=str(int(self.records[t]['seq_no'])+1)
+		owner[tail]=r['index']
+
+	def unlink(self, owner, head, tail, r):
+
+		"""Removes record from linked list of owner."""
+
+		(rev,fwd)=(r['rev_index'],r['fwd_index'])
+
+		if rev == '-1': owner[head]=fwd
+		else: self.records[rev]['fwd_index']=fwd
+		if fwd == '-1': owner[tail]=rev
+		else: self.records[fwd]['rev_index']=rev
+
+	def walk(self, owner, head):
+
+		"""Returns records of linked list of owner."""
+
+		l=[]
+		i=owner[head]
+		while i != '-1':
+			l.append(self.records[i])
+			i=self.records[i]['fwd_index']
+
+		return l
+
+	def create_system(self, sys_type='CNV', protect='0', **fields):
+
+		"""Creates system record, returns it or None when memory is full."""
+
+		with self.lock:
+			r=self.allocate('system',system_defaults,sys_type=sys_type,protect=str(protect),
+				chn_grp_head='-1',chn_grp_tail='-1',tgid_grp_head='-1',tgid_grp_tail='-1',
+				lout_tgids=[],srch_lout_tgids=[],**fields)
+			if r is None: return None
+			self.link(self.root,'chn_grp_head','chn_grp_tail',r)
+
+		return r
+
+	def create_group(self, sys_index, grp_type='C', **fields):
+
+		"""Creates channel (C) or TGID (T) group record in system."""
+
+		with self.lock:
+			s=self.records[sys_index]
+			if (s['sys_type'] == 'CNV') != (grp_type == 'C'): return None
+			r=self.allocate('group',group_defaults,grp_type=grp_type,sys_index=sys_index,
+				chn_head='-1',chn_tail='-1',**fields)
+			if r is None: return None
+			if grp_type == 'C': self.link(s,'chn_grp_head','chn_grp_tail',r)
+			else: self.link(s,'tgid_grp_head','tgid_grp_tail',r)
+
+		return r
+
+	def create_site(self, sys_index, **fields):
+
+		"""Creates site record in trunked system."""
+
+		with self.lock:
+			s=self.records[sys_index]
+			if s['sys_type'] == 'CNV': return None
+			r=self.allocate('site',site_defaults,sys_index=sys_index,chn_head='-1',
+				chn_tail='-1',mcp=['']*24,abp=['']*32,**fields)
+			if r is None: return None
+			self.link(s,'chn_grp_head','chn_grp_tail',r)
+
+		return r
+
+	def create_channel(self, grp_index, **fields):
+
+		"""Creates channel record in channel group or trunk frequency record in site."""
+
+		with self.lock:
+			g=self.records[grp_index]
+			if g['kind'] == 'site':
+				r=self.allocate('trunk_frq',trunk_frq_defaults,sys_index=g['sys_index'],
+					grp_index=grp_index,**fields)
+			elif g['grp_type'] == 'C':
+				r=self.allocate('channel',channel_defaults,sys_index=g['sys_index'],
+					grp_index=grp_index,**fields)
+			else:
+				return None
+			if r is None: return None
+			self.link(g,'chn_head','chn_tail',r)
+
+		return r
+
+	def create_tgid(self, grp_index, **fields):
+
+		"""Creates TGID record in TGID group."""
+
+		with self.lock:
+			g=self.records[grp_index]
+			if g['kind'] != 'group' or g['grp_type'] != 'T': return None
+			r=self.allocate('tgid',tgid_defaults,sys_index=g['sys_index'],
+				grp_index=grp_index,**fields)
+			if r is None: return None
+			self.link(g,'chn_head','chn_tail',r)
+
+		return r
+
+	def delete(self, index):
+
+		"""Deletes record and everything linked under it."""
+
+		with self.lock:
+			r=self.records[index]
+			kind=r['kind']
+
+			if kind == 'system':
+				for c in self.walk(r,'chn_grp_head')+self.walk(r,'tgid_grp_head'):
+					self.delete(c['index'])
+				self.unlink(self.root,'chn_grp_head','chn_grp_tail',r)
+			elif kind in ('group','site'):
+				for c in self.walk(r,'chn_head'): self.delete(c['index'])
+				s=self.records[r['sys_index']]
+				if kind == 'group' and r['grp_type'] == 'T':
+					self.unlink(s,'tgid_grp_head','tgid_grp_tail',r)
+				else:
+					self.unlink(s,'chn_grp_head','chn_grp_tail',r)
+			else:
+				self.unlink(self.records[r['grp_index']],'chn_head','chn_tail',r)
+
+			del self.records[index]
+			self.counts[kind]-=1
+
+	def systems(self):
+
+		"""Returns list of system records in scan order."""
+
+		return self.walk(self.root,'chn_grp_head')
+
+	# Reception model
+
+	def receive(self, chn_index=None, sql='1', **fields):
+
+		"""Sets reception status returned by GLG.
+		With chn_index the status is taken from channel or TGID record,
+		with no arguments reception is cleared (GLG,,,,,,,,,,,,)."""
+
+		with self.lock:
+
+			if chn_index is None and not fields:
+				self.reception=['']*12
+				return
+
+			d={'frq_tgid':'', 'mod':'', 'att':'0', 'ctcss_dcs':'0', 'name1':'', 'name2':'',
+				'name3':'', 'sql':sql, 'mut':'0', 'sys_tag':'NONE', 'chan_tag':'NONE',
+				'p25nac':'NONE'}
+
+			if chn_index is not None:
+				c=self.records[chn_index]
+				g=self.records[c['grp_index']]
+				s=self.records[c['sys_index']]
+				d.update({'name1':s['name'], 'name2':g['name'], 'name3':c.get('name',''),
+					'sys_tag':s['number_tag'], 'chan_tag':c['number_tag']})
+				if c['kind'] == 'tgid':
+					d.update({'frq_tgid':c['tgid'], 'mod':'NFM'})
+				else:
+					d.update({'frq_tgid':c['frq'], 'mod':c.get('mod','NFM'),
+						'att':c.get('att','0'), 'ctcss_dcs':c.get('dcs','0')})
+					self.frq=c['frq']
+
+			d.update(fields)
+
+			self.reception=[d[k] for k in ('frq_tgid','mod','att','ctcss_dcs','name1','name2',
+				'name3','sql','mut','sys_tag','chan_tag','p25nac')]
+
+	def rssi(self, frq):
+
+		"""Returns RSSI A/D value at frequency (100Hz units) from carriers."""
+
+		f=int(frq)
+		level=self.noise_floor+(f*7919)%23
+
+		for (c,l) in self.carriers.items():
+			d=abs(f-c)
+			if d < self.carrier_width:
+				level=max(level,int(l*(1.0-float(d)/self.carrier_width)))
+
+		return min(level,1023)
+
+	# Command handlers, each returns response without terminator
+
+	def cmd_unknown(self, cmd, args):
+
+		return 'ERR'
+
+	def cmd_mdl(self, cmd, args):
+
+		return ','.join([cmd,self.model])
+
+	def cmd_ver(self, cmd, args):
+
+		return ','.join([cmd,self.version])
+
+	def cmd_prg(self, cmd, args):
+
+		self.program_mode=True
+
+		return ','.join([cmd,'OK'])
+
+	def cmd_epg(self, cmd, args):
+
+		self.program_mode=False
+
+		return ','.join([cmd,'OK'])
+
+	def cmd_sih(self, cmd, args):
+
+		return ','.join([cmd,self.root['chn_grp_head']])
+
+	def cmd_sit(self, cmd, args):
+
+		return ','.join([cmd,self.root['chn_grp_tail']])
+
+	def cmd_record(self, cmd, args):
+
+		"""Get or set of layout described record."""
+
+		(kind,get_fields,set_fields)=record_layouts[cmd]
+		r=self.records[args[0]]
+		if r['kind'] != kind: raise KeyError(args[0])
+		if kind == 'system' and cmd == 'TRN' and r['sys_type'] == 'CNV': raise KeyError(args[0])
+
+		if len(args) == 1:
+			return ','.join([cmd]+[r.get(k,'') if k else '' for k in get_fields])
+
+		for (k,v) in zip(set_fields,args[1:]):
+			if k and v != '': r[k]=v
+
+		return ','.join([cmd,'OK'])
+
+	cmd_sin=cmd_record
+	cmd_trn=cmd_record
+	cmd_gin=cmd_record
+	cmd_sif=cmd_record
+	cmd_cin=cmd_record
+	cmd_tin=cmd_record
+	cmd_tfq=cmd_record
+
+	def cmd_mcp(self, cmd, args):
+
+		r=self.records[args[0]]
+		key=cmd.lower()
+
+		if len(args) > 1:
+			for (i,v) in enumerate(args[1:len(r[key])+1]):
+				if v != '': r[key][i]=v
+			return ','.join([cmd,'OK'])
+
+		return ','.join([cmd]+r[key])
+
+	cmd_abp=cmd_mcp
+
+	def cmd_qsl(self, cmd, args):
+
+		if args:
+			for (i,p) in enumerate(args[:10]):
+				if p != '': self.quick_lockout[i]=p
+			return ','.join([cmd,'OK'])
+
+		return ','.join([cmd]+self.quick_lockout)
+
+	def cmd_qgl(self, cmd, args):
+
+		r=self.records[args[0]]
+
+		if len(args) > 1:
+			if args[1] != '': r['qgl']=args[1]
+			return ','.join([cmd,'OK'])
+
+		return ','.join([cmd,r['qgl']])
+
+	def next_item(self, key, items):
+
+		"""Returns next item of list iterated by repeated commands, -1 at the end."""
+
+		i=self.iterators.get(key,0)
+		if i < len(items):
+			self.iterators[key]=i+1
+			return items[i]
+
+		self.iterators[key]=0
+
+		return '-1'
+
+	def cmd_gli(self, cmd, args):
+
+		r=self.records[args[0]]
+		key={'GLI':'lout_tgids', 'SLI':'srch_lout_tgids'}[cmd]
+
+		return ','.join([cmd,self.next_item((cmd,args[0]),r[key])])
+
+	cmd_sli=cmd_gli
+
+	def cmd_loi(self, cmd, args):
+
+		r=self.records[args[0]]
+		if args[1] not in r['lout_tgids']: r['lout_tgids'].append(args[1])
+
+		return ','.join([cmd,'OK'])
+
+	def cmd_uli(self, cmd, args):
+
+		r=self.records[args[0]]
+		for key in ('lout_tgids','srch_lout_tgids'):
+			if args[1] in r[key]: r[key].remove(args[1])
+
+		return ','.join([cmd,'OK'])
+
+	def cmd_csy(self, cmd, args):
+
+		r=self.create_system(args[0],args[1] if len(args) > 1 else '0')
+
+		if r is None: return ','.join([cmd,'-1'])
+
+		return ','.join([cmd,r['index']])
+
+	def cmd_agc(self, cmd, args):
+
+		r=self.create_group(args[0],{'AGC':'C', 'AGT':'T'}[cmd])
+
+		if r is None: return ','.join([cmd,'-1'])
+
+		return ','.join([cmd,r['index']])
+
+	cmd_agt=cmd_agc
+
+	def cmd_ast(self, cmd, args):
+
+		r=self.create_site(args[0])
+
+		if r is None: return ','.join([cmd,'-1'])
+
+		return ','.join([cmd,r['index']])
+
+	def cmd_acc(self, cmd, args):
+
+		if cmd == 'ACT': r=self.create_tgid(args[0])
+		else: r=self.create_channel(args[0])
+
+		if r is None: return ','.join([cmd,'-1'])
+
+		return ','.join([cmd,r['index']])
+
+	cmd_act=cmd_acc
+
+	def cmd_dsy(self, cmd, args):
+
+		kinds={'DSY':('system',), 'DGR':('group','site'), 'DCH':('channel','tgid','trunk_frq')}
+
+		if self.records[args[0]]['kind'] not in kinds[cmd]: raise KeyError(args[0])
+		self.delete(args[0])
+
+		return ','.join([cmd,'OK'])
+
+	cmd_dgr=cmd_dsy
+	cmd_dch=cmd_dsy
+
+	def cmd_mem(self, cmd, args):
+
+		(sys,site,chn)=(self.count('system'),self.count('site'),self.count('channel'))
+		used=100*(sys+site+chn)/(sum(memory_limits.values()))
+
+		return ','.join([cmd,str(used),str(sys),str(site),str(chn),'0'])
+
+	def cmd_rmb(self, cmd, args):
+
+		return ','.join([cmd,str(sum(memory_limits.values())-len(self.records))])
+
+	def cmd_sct(self, cmd, args):
+
+		return ','.join([cmd,str(self.count('system'))])
+
+	def cmd_single(self, cmd, args):
+
+		"""Get or set of one record settings command."""
+
+		fields=self.singles[cmd]
+
+		if args:
+			for (i,v) in enumerate(args[:len(fields)]):
+				if v != '': fields[i]=v
+			return ','.join([cmd,'OK'])
+
+		return ','.join([cmd]+fields)
+
+	def cmd_indexed(self, cmd, args):
+
+		"""Get or set of indexed settings command."""
+
+		fields=self.indexed[(cmd,args[0])]
+
+		if len(args) == 1: return ','.join([cmd]+fields)
+
+		# SSP echoes index as first field, others do not
+		if cmd == 'SSP': values=args
+		else: values=args[1:]
+
+		for (i,v) in enumerate(values[:len(fields)]):
+			if v != '': fields[i]=v
+
+		return ','.join([cmd,'OK'])
+
+	cmd_bbs=cmd_indexed
+	cmd_cbp=cmd_indexed
+	cmd_csp=cmd_indexed
+	cmd_ssp=cmd_indexed
+
+	def cmd_glf(self, cmd, args):
+
+		return ','.join([cmd,self.next_item(cmd,self.global_lout_frqs)])
+
+	def cmd_lof(self, cmd, args):
+
+		if args[0] not in self.global_lout_frqs: self.global_lout_frqs.append(args[0])
+
+		return ','.join([cmd,'OK'])
+
+	def cmd_ulf(self, cmd, args):
+
+		if args[0] in self.global_lout_frqs: self.global_lout_frqs.remove(args[0])
+
+		return ','.join([cmd,'OK'])
+
+	def cmd_dbc(self, cmd, args):
+
+		return ','.join([cmd]+list(band_coverage[int(args[0])-1]))
+
+	def cmd_glg(self, cmd, args):
+
+		return ','.join([cmd]+self.reception)
+
+	def cmd_sts(self, cmd, args):
+
+		(sql,mut)=(self.reception[7] or '0',self.reception[8] or '0')
+		lines=[self.reception[4],self.reception[5],self.reception[6],self.reception[0]]
+		cm=[]
+		for l in lines: cm.extend([l.ljust(16)[:16],' '*16])
+
+		return ','.join([cmd,'0000']+cm+[sql,mut,'0','0','','','0','BLUE','3'])
+
+	def cmd_pwr(self, cmd, args):
+
+		return ','.join([cmd,str(self.rssi(self.frq)),self.frq])
+
+	def cmd_qsh(self, cmd, args):
+
+		self.frq=args[0].rjust(8,'0')
+
+		return ','.join([cmd,'OK'])
+
+	def cmd_qsc(self, cmd, args):
+
+		self.frq=args[0].rjust(8,'0')
+		rssi=self.rssi(self.frq)
+		sql='1' if rssi >= self.squelch_level else '0'
+
+		return ','.join([cmd,str(rssi),self.frq,sql])
+
+	def cmd_key(self, cmd, args):
+
+		return ','.join([cmd,'OK'])
+
+	cmd_jnt=cmd_key
+
+	def cmd_bav(self, cmd, args):
+
+		return ','.join([cmd,'560'])
+
+	def cmd_win(self, cmd, args):
+
+		return ','.join([cmd,'100',self.frq])
+
+if __name__ == "__main__":
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--speed', type=int, default=None)
+	parser.add_argument('--latency', type=float, default=0.0)
+	parser.add_argument('--debug', action='store_true')
+	args=parser.parse_args()
+
+	if args.debug: logging.basicConfig(level=logging.DEBUG)
+
+	e=ScannerEmulator(args.speed,args.latency)
+	print e.start()
+
+	try:
+		while True: time.sleep(1)
+
+	except KeyboardInterrupt:
+		e.stop()
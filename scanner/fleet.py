@@ -0,0 +1,227 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#
+# Uniden Scanner Python API
+# Copyright (C) 2014-2015 Anton Komarov
+#
+# This program is free software; you can redistribute it and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with this program;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import sys
+import time
+import formats
+import Queue
+import logging
+import argparse
+import threading
+from uniden import *
+from diff import make_plan
+
+# create logger
+module_logger = logging.getLogger('uniden_api.fleet')
+
+class Fleet:
+
+	"""Runs same job on many scanners, one UnidenScanner per port, on a pool of worker
+	threads. Serial I/O releases the interpreter lock, so scanners work in parallel.
+	A failing device does not stop the others, its status holds the error."""
+
+	def __init__(self, ports, speed="115200", workers=None, window=1, timeout=1.0, progress=None):
+
+		self.logger = logging.getLogger('uniden_api.Fleet')
+
+		self.ports=list(ports)
+		self.speed=speed
+		self.workers=workers or len(self.ports)
+		self.window=window
+		self.timeout=timeout
+		self.progress=progress
+		self.lock=threading.Lock()
+		self.status={}
+		self.wall_time=0.0
+
+	def update(self, port, **kwargs):
+
+		"""Updates device status and reports it to progress callback."""
+
+		with self.lock:
+			self.status[port].update(kwargs)
+			status=dict(self.status[port])
+
+		if self.progress is not None: self.progress(port,status)
+
+	def run(self, func, *args):
+
+		"""Calls func(scanner, *args) for every device, returns status dictionary keyed
+		by port: state (queued, running, done or failed), result, error, start and end
+		times and commands sent. Job result 0 or None counts as failure."""
+
+		jobs=Queue.Queue()
+
+		for port in self.ports:
+			self.status[port]={'state':'queued', 'result':None, 'error':None, 'start':None,
+				'end':None, 'commands':0, 'bytes':0}
+			jobs.put(port)
+
+		def worker():
+			while True:
+				try: port=jobs.get_nowait()
+				except Queue.Empty: return
+				self.run_device(port,func,args)
+
+		start=time.time()
+
+		threads=[threading.Thread(target=worker) for i in range(0,min(self.workers,len(self.ports)))]
+		for t in threads:
+			t.daemon=True
+			t.start()
+		for t in threads: t.join()
+
+		self.wall_time=time.time()-start
+
+		return self.status
+
+	def run_device(self, port, func, args):
+
+		"""Runs job on one device, any exception fails only this device."""
+
+		self.update(port,state='running',start=time.time())
+
+		s=None
+		m=None
+		res=None
+		error=None
+
+		try:
+			s=UnidenScanner(port,self.speed,self.timeout,self.window)
+			if s.serial is None: raise UnidenScannerError('cannot open %s' % port)
+			m=s.attach_metrics()
+			res=func(s,*args)
+			if not res: error='%s returned %s' % (getattr(func,'__name__','job'),res)
+
+		except Exception, e:
+			self.logger.error('run_device(): %s: %s' % (port,str(e)))
+			error='%s: %s' % (e.__class__.__name__,str(e))
+
+		finally:
+			if s is not None and s.serial is not None: s.close()
+
+		commands=0
+		sent=0
+		if m is not None:
+			for c in m.to_dict().values():
+				commands+=c['calls']
+				sent+=c['bytes_sent']+c['bytes_received']
+
+		if error: state='failed'
+		else: state='done'
+
+		self.update(port,state=state,result=res,error=error,end=time.time(),commands=commands,bytes=sent)
+
+	def provision(self, fname, minimal=False, replace=True):
+
+		"""Pushes scan settings YAML to all devices.
+		Default is load_scan_settings() and set_scan_settings(), with replace all systems
+		found in scanner are deleted first. With minimal only the difference computed by
+		diff.make_plan() is sent. File is parsed once, all devices load the same systems."""
+
+		systems=formats.load(fname)
+
+		def provision(s):
+
+			if minimal:
+				if not s.get_scan_settings(): return 0
+				return make_plan(s,systems).apply(s)
+
+			if replace:
+				if not s.get_scan_settings(lazy=True): return 0
+				s.enter_program_mode()
+				for sys_index in s.systems.keys():
+					if not s.delete_system(sys_index): return 0
+			else:
+				s.enter_program_mode()
+
+			s.load_systems(systems)
+
+			return s.set_scan_settings()
+
+		return self.run(provision)
+
+	def readback(self):
+
+		"""Reads scan settings of all devices, results are scan settings dumps."""
+
+		def readback(s):
+
+			if not s.get_scan_settings(): return 0
+			return [s.systems[i].dump() for i in s.systems]
+
+		return self.run(readback)
+
+	def report(self):
+
+		"""Returns aggregate report of last run: device counts, wall time, total
+		commands and bytes, aggregate commands per second and speedup over running
+		devices one after another."""
+
+		done=[p for p in self.ports if self.status[p]['state'] == 'done']
+		failed=[p for p in self.ports if self.status[p]['state'] == 'failed']
+
+		device_time=0.0
+		commands=0
+		sent=0
+		for st in self.status.values():
+			if st['start'] is not None and st['end'] is not None: device_time+=st['end']-st['start']
+			commands+=st['commands']
+			sent+=st['bytes']
+
+		wall=self.wall_time
+
+		return {'devices':len(self.ports), 'done':len(done), 'failed':len(failed),
+			'failed_ports':failed, 'wall_time':wall, 'device_time':device_time,
+			'speedup':device_time/wall if wall else 0.0, 'commands':commands, 'bytes':sent,
+			'commands_per_sec':commands/wall if wall else 0.0}
+
+def show_progress(port, status):
+
+	"""Prints device status line, default progress callback of command line."""
+
+	line='%s\t%s' % (port,status['state'])
+	if status['end'] is not None:
+		line+='\t%.3f s\t%d commands' % (status['end']-status['start'],status['commands'])
+	if status['error']: line+='\t%s' % status['error']
+
+	sys.stdout.write(line+'\n')
+	sys.stdout.flush()
+
+if __name__ == "__main__":
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--ports', type=str, required=True, help='comma separated serial ports')
+	parser.add_argument('--speed', type=str, default='115200')
+	parser.add_argument('--workers', type=int, default=None)
+	parser.add_argument('--window', type=int, default=1, help='pipeline window')
+	parser.add_argument('--config', type=str, help='scan settings YAML to push, readback if missing')
+	parser.add_argument('--minimal', action='store_true', help='send only the difference')
+	parser.add_argument('--keep', action='store_true', help='do not delete systems before load')
+	args=parser.parse_args()
+
+	f=Fleet(args.ports.split(','),args.speed,args.workers,args.window,progress=show_progress)
+
+	if args.config: f.provision(args.config,args.minimal,not args.keep)
+	else: f.readback()
+
+	r=f.report()
+	print ('Devices:\t\t%d done, %d failed') % (r['done'],r['failed'])
+	print ('Wall time:\t\t%.3f s') % r['wall_time']
+	print ('Device time:\t\t%.3f s') % r['device_time']
+	print ('Speedup:\t\t%.2f') % r['speedup']
+	print ('Commands:\t\t%d') % r['commands']
+	print ('Commands/s:\t\t%.1f') % r['commands_per_sec']
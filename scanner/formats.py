@@ -0,0 +1,265 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#
+# Uniden Scanner Python API
+# Copyright (C) 2014-2015 Anton Komarov
+#
+# This program is free software; you can redistribute it and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with this program;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os
+import json
+import yaml
+import struct
+import logging
+
+try:
+	from yaml import CLoader as Loader, CDumper as Dumper
+
+except ImportError:
+	from yaml import Loader, Dumper
+
+try:
+	import msgpack
+
+except ImportError:
+	msgpack=None
+
+# create logger
+module_logger = logging.getLogger('uniden_api.formats')
+
+# file extension to format name, unknown extensions are YAML
+extensions={'.yml':'yaml', '.yaml':'yaml', '.json':'json', '.msgpack':'msgpack', '.mpk':'msgpack'}
+
+def format_of(fname):
+
+	"""Returns format name of file name by its extension."""
+
+	return extensions.get(os.path.splitext(fname)[1].lower(),'yaml')
+
+def to_key(k):
+
+	"""Returns JSON object key as YAML loads it, decimal keys (search indexes) are int."""
+
+	if k.isdigit(): return int(k)
+
+	return k.encode('utf-8')
+
+def to_str(obj):
+
+	"""Returns obj with unicode strings encoded to UTF-8 str, as YAML loads them."""
+
+	if isinstance(obj,unicode): return obj.encode('utf-8')
+	if isinstance(obj,list): return [to_str(v) for v in obj]
+	if isinstance(obj,dict): return dict([(to_key(k),to_str(v)) for (k,v) in obj.iteritems()])
+
+	return obj
+
+# YAML, libyaml C loader and dumper when available
+
+def yaml_dumps(obj):
+
+	return yaml.dump(obj,Dumper=Dumper)
+
+def yaml_loads(data):
+
+	return yaml.load(data,Loader=Loader)
+
+# JSON, compact
+
+def json_dumps(obj):
+
+	return json.dumps(obj,separators=(',',':'))
+
+def json_loads(data):
+
+	return to_str(json.loads(data))
+
+# MessagePack, pure Python fallback packs and unpacks the types of dump() output:
+# None, bool, int, float, str, unicode (as UTF-8 str), list, tuple and dict
+
+def pack(obj, out):
+
+	if obj is None: out.append('\xc0')
+	elif obj is True: out.append('\xc3')
+	elif obj is False: out.append('\xc2')
+
+	elif isinstance(obj,(int,long)):
+		if 0 <= obj < 0x80: out.append(chr(obj))
+		elif -32 <= obj < 0: out.append(struct.pack('b',obj))
+		elif 0 <= obj < 0x100000000: out.append(struct.pack('>BI',0xce,obj))
+		elif -0x80000000 <= obj < 0: out.append(struct.pack('>Bi',0xd2,obj))
+		elif obj > 0: out.append(struct.pack('>BQ',0xcf,obj))
+		else: out.append(struct.pack('>Bq',0xd3,obj))
+
+	elif isinstance(obj,float): out.append(struct.pack('>Bd',0xcb,obj))
+
+	elif isinstance(obj,basestring):
+		if isinstance(obj,unicode): obj=obj.encode('utf-8')
+		n=len(obj)
+		if n < 32: out.append(chr(0xa0|n))
+		elif n < 0x100: out.append(struct.pack('>BB',0xd9,n))
+		elif n < 0x10000: out.append(struct.pack('>BH',0xda,n))
+		else: out.append(struct.pack('>BI',0xdb,n))
+		out.append(obj)
+
+	elif isinstance(obj,(list,tuple)):
+		n=len(obj)
+		if n < 16: out.append(chr(0x90|n))
+		elif n < 0x10000: out.append(struct.pack('>BH',0xdc,n))
+		else: out.append(struct.pack('>BI',0xdd,n))
+		for v in obj: pack(v,out)
+
+	elif isinstance(obj,dict):
+		n=len(obj)
+		if n < 16: out.append(chr(0x80|n))
+		elif n < 0x10000: out.append(struct.pack('>BH',0xde,n))
+		else: out.append(struct.pack('>BI',0xdf,n))
+		for (k,v) in obj.iteritems():
+			pack(k,out)
+			pack(v,out)
+
+	else:
+		raise TypeError('pack(): cannot pack %s' % type(obj).__name__)
+
+# fixed size values: type byte to (struct format, size)
+fixed={0xca:('>f',4), 0xcb:('>d',8), 0xcc:('>B',1), 0xcd:('>H',2), 0xce:('>I',4),
+	0xcf:('>Q',8), 0xd0:('>b',1), 0xd1:('>h',2), 0xd2:('>i',4), 0xd3:('>q',8)}
+
+# length prefixed values: type byte to (kind, struct format, size)
+sized={0xc4:('str','>B',1), 0xc5:('str','>H',2), 0xc6:('str','>I',4),
+	0xd9:('str','>B',1), 0xda:('str','>H',2), 0xdb:('str','>I',4),
+	0xdc:('list','>H',2), 0xdd:('list','>I',4), 0xde:('dict','>H',2), 0xdf:('dict','>I',4)}
+
+def unpack(data, i):
+
+	"""Returns (object, next offset) of value at offset i."""
+
+	t=ord(data[i])
+	i+=1
+
+	if t < 0x80: return (t,i)
+	if t >= 0xe0: return (t-0x100,i)
+	if t >= 0xa0 and t < 0xc0: return (data[i:i+(t&0x1f)],i+(t&0x1f))
+	if t == 0xc0: return (None,i)
+	if t == 0xc2: return (False,i)
+	if t == 0xc3: return (True,i)
+
+	if t in fixed:
+		(fmt,size)=fixed[t]
+		return (struct.unpack_from(fmt,data,i)[0],i+size)
+
+	if t < 0x90:
+		(kind,n)=('dict',t&0x0f)
+	elif t < 0xa0:
+		(kind,n)=('list',t&0x0f)
+	elif t in sized:
+		(kind,fmt,size)=sized[t]
+		n=struct.unpack_from(fmt,data,i)[0]
+		i+=size
+	else:
+		raise ValueError('unpack(): unsupported type 0x%02x at %d' % (t,i-1))
+
+	if kind == 'str': return (data[i:i+n],i+n)
+
+	if kind == 'list':
+		l=[]
+		for k in xrange(0,n):
+			(v,i)=unpack(data,i)
+			l.append(v)
+		return (l,i)
+
+	d={}
+	for k in xrange(0,n):
+		(key,i)=unpack(data,i)
+		(d[key],i)=unpack(data,i)
+
+	return (d,i)
+
+def msgpack_dumps(obj):
+
+	if msgpack is not None: return msgpack.packb(obj)
+
+	out=[]
+	pack(obj,out)
+
+	return ''.join(out)
+
+def msgpack_loads(data):
+
+	if msgpack is not None:
+		try: return msgpack.unpackb(data,raw=True)
+		except TypeError: return msgpack.unpackb(data)
+
+	return unpack(data,0)[0]
+
+# format name to (dumps, loads, binary)
+formats={'yaml':(yaml_dumps,yaml_loads,False), 'json':(json_dumps,json_loads,False),
+	'msgpack':(msgpack_dumps,msgpack_loads,True)}
+
+def dumps(obj, fmt='yaml'):
+
+	"""Returns obj serialized in format."""
+
+	return formats[fmt][0](obj)
+
+def loads(data, fmt='yaml'):
+
+	"""Returns object deserialized from data in format."""
+
+	return formats[fmt][1](data)
+
+# Record streams, YAML documents or JSON Lines, written and read one record at a time
+
+def record_writer(f, fmt='yaml'):
+
+	"""Returns function writing one record to file object f."""
+
+	if fmt == 'yaml': return lambda obj: yaml.dump(obj,f,Dumper=Dumper,explicit_start=True)
+	if fmt == 'json': return lambda obj: f.write(json_dumps(obj)+'\n')
+
+	raise ValueError('record_writer(): no record stream in %s' % fmt)
+
+def read_records(f, fmt='yaml'):
+
+	"""Yields records read from file object f."""
+
+	if fmt == 'yaml':
+		for obj in yaml.load_all(f,Loader=Loader):
+			if obj is not None: yield obj
+
+	elif fmt == 'json':
+		for line in f:
+			if line.strip(): yield json_loads(line)
+
+	else:
+		raise ValueError('read_records(): no record stream in %s' % fmt)
+
+def dump(obj, fname, fmt=None):
+
+	"""Writes obj to file, format by file extension unless given."""
+
+	if fmt is None: fmt=format_of(fname)
+	(dumps,loads,binary)=formats[fmt]
+
+	f=open(fname,'wb' if binary else 'w')
+	try: f.write(dumps(obj))
+	finally: f.close()
+
+def load(fname, fmt=None):
+
+	"""Returns object read from file, format by file extension unless given."""
+
+	if fmt is None: fmt=format_of(fname)
+	(dumps,loads,binary)=formats[fmt]
+
+	f=open(fname,'rb' if binary else 'r')
+	try: return loads(f.read())
+	finally: f.close()
@@ -0,0 +1,375 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#
+# Uniden Scanner Python API
+# Copyright (C) 2014-2015 Anton Komarov
+#
+# This program is free software; you can redistribute it and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with this program;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os
+import time
+import array
+import struct
+import logging
+import argparse
+from collections import namedtuple
+
+# create logger
+module_logger = logging.getLogger('uniden_api.hitlog')
+
+# hit as returned by queries, start time and duration in seconds,
+# tags, NAC and RSSI are None when scanner reports none
+Hit = namedtuple('Hit', 'time duration frq_tgid mod name1 name2 name3 sys_tag chan_tag p25nac rssi')
+
+# hits.dat record: time, duration, string ids of frq_tgid, mod, name1-3,
+# sys_tag, chan_tag, p25nac, rssi (-1 is none)
+hit_record=struct.Struct('<dfIIIIIhhhh')
+
+# postings.dat record: key (frq_tgid string id), hit number
+posting_record=struct.Struct('<II')
+
+# summary.dat header (hits count) and record: key, hits, rssi max, duration, first, last
+summary_header=struct.Struct('<I')
+summary_record=struct.Struct('<IIhddd')
+
+def to_short(value, base=10):
+
+	"""Returns integer of tag, NAC or RSSI field, -1 for empty or NONE."""
+
+	if value is None or value in ('','NONE'): return -1
+
+	return int(value,base) if isinstance(value,basestring) else int(value)
+
+class HitLog:
+
+	"""Append-only store of receptions (hits), a directory of files:
+
+	strings.txt	interned strings, one per line, line number is string id
+	hits.dat	fixed size hit records in time order, searched by bisection
+	postings.dat	(frequency/TGID, hit number) pairs, per channel index
+	summary.dat	per channel aggregates, rewritten on flush
+
+	Hits are buffered and written in batches of batch hits, call flush() or
+	close() at the end. Hits must be added in time order."""
+
+	def __init__(self, path, batch=256):
+
+		self.logger = logging.getLogger('uniden_api.HitLog')
+
+		self.path=path
+		self.batch=batch
+		self.pending=[]
+		self.pending_strings=[]
+		self.pending_postings=[]
+
+		if not os.path.isdir(path): os.makedirs(path)
+
+		self.open()
+
+	def fname(self, name):
+
+		return os.path.join(self.path,name)
+
+	def open(self):
+
+		"""Loads strings, postings and aggregates, drops partly written records."""
+
+		self.strings=['']
+		self.string_ids={'':0}
+		if os.path.exists(self.fname('strings.txt')):
+			f=open(self.fname('strings.txt'),'rb')
+			try: lines=f.read().split('\n')
+			finally: f.close()
+			# last line is empty or partly written
+			for s in lines[:-1]:
+				self.string_ids.setdefault(s,len(self.strings))
+				self.strings.append(s)
+
+		self.hits_file=open(self.fname('hits.dat'),'a+b')
+		self.hits_file.seek(0,2)
+		size=self.hits_file.tell()
+		self.count=size/hit_record.size
+		if size%hit_record.size:
+			self.logger.warning('open(): dropping partly written hit')
+			self.hits_file.truncate(self.count*hit_record.size)
+
+		self.postings={}
+		if os.path.exists(self.fname('postings.dat')):
+			f=open(self.fname('postings.dat'),'rb')
+			try: data=f.read()
+			finally: f.close()
+			for i in range(0,len(data)/posting_record.size):
+				(key,n)=posting_record.unpack_from(data,i*posting_record.size)
+				if n < self.count: self.postings.setdefault(key,array.array('I')).append(n)
+
+		self.summary={}
+		if not self.read_summary(): self.rebuild_summary()
+
+	def read_summary(self):
+
+		"""Loads aggregates, returns 0 if missing or out of date."""
+
+		try:
+			f=open(self.fname('summary.dat'),'rb')
+			try: data=f.read()
+			finally: f.close()
+
+		except IOError:
+			return 0
+
+		if len(data) < summary_header.size: return 0
+		(count,)=summary_header.unpack_from(data,0)
+		if count <> self.count: return 0
+
+		for i in range(summary_header.size,len(data),summary_record.size):
+			(key,hits,rssi_max,duration,first,last)=summary_record.unpack_from(data,i)
+			self.summary[key]=[hits,duration,first,last,rssi_max]
+
+		return 1
+
+	def rebuild_summary(self):
+
+		"""Computes aggregates reading all hits, needed only after interrupted flush."""
+
+		self.summary={}
+		for n in range(0,self.count): self.aggregate(n,self.read_record(n))
+
+	def aggregate(self, n, r):
+
+		"""Adds hit record to aggregates of its channel."""
+
+		(t,duration,key,mod,name1,name2,name3,sys_tag,chan_tag,p25nac,rssi)=r
+
+		a=self.summary.get(key)
+		if a is None: self.summary[key]=[1,duration,t,t,rssi]
+		else:
+			a[0]+=1
+			a[1]+=duration
+			a[3]=t
+			if rssi > a[4]: a[4]=rssi
+
+	def intern(self, s):
+
+		"""Returns id of string, adding it to strings."""
+
+		s=(s or '').replace('\n',' ')
+
+		i=self.string_ids.get(s)
+		if i is None:
+			i=len(self.strings)
+			self.strings.append(s)
+			self.string_ids[s]=i
+			self.pending_strings.append(s)
+
+		return i
+
+	def add(self, t, duration, status, rssi=None):
+
+		"""Adds hit starting at t (seconds) lasting duration seconds. status is
+		Reception tuple from monitor or dictionary from get_reception_status()."""
+
+		if not isinstance(status,dict): status=status._asdict()
+
+		key=self.intern(status['frq_tgid'])
+		r=(t,duration,key,self.intern(status['mod']),self.intern(status['name1']),
+			self.intern(status['name2']),self.intern(status['name3']),
+			to_short(status['sys_tag']),to_short(status['chan_tag']),
+			to_short(status['p25nac'],16),to_short(rssi))
+
+		n=self.count+len(self.pending)
+		self.pending.append(hit_record.pack(*r))
+		self.pending_postings.append(posting_record.pack(key,n))
+		self.postings.setdefault(key,array.array('I')).append(n)
+		self.aggregate(n,r)
+
+		if len(self.pending) >= self.batch: self.flush()
+
+		return n
+
+	def add_events(self, events):
+
+		"""Adds hits of reception events from ReceptionMonitor: every reception
+		ended by squelch close or by channel change. Returns number of hits added."""
+
+		n=0
+
+		for e in events:
+			if e.previous is not None and e.previous.sql == '1' and e.kind <> 'open':
+				self.add(e.time-e.duration,e.duration,e.previous,e.rssi)
+				n+=1
+
+		return n
+
+	def flush(self):
+
+		"""Writes buffered hits, strings first and postings last, then aggregates."""
+
+		if not self.pending: return
+
+		if self.pending_strings:
+			f=open(self.fname('strings.txt'),'ab')
+			try: f.write(''.join([s+'\n' for s in self.pending_strings]))
+			finally: f.close()
+
+		self.hits_file.seek(0,2)
+		self.hits_file.write(''.join(self.pending))
+		self.hits_file.flush()
+
+		f=open(self.fname('postings.dat'),'ab')
+		try: f.write(''.join(self.pending_postings))
+		finally: f.close()
+
+		self.count+=len(self.pending)
+		self.pending=[]
+		self.pending_strings=[]
+		self.pending_postings=[]
+
+		self.write_summary()
+
+	def write_summary(self):
+
+		l=[summary_header.pack(self.count)]
+		for (key,(hits,duration,first,last,rssi_max)) in self.summary.items():
+			l.append(summary_record.pack(key,hits,rssi_max,duration,first,last))
+
+		fname=self.fname('summary.dat')
+		f=open(fname+'.tmp','wb')
+		try: f.write(''.join(l))
+		finally: f.close()
+		os.rename(fname+'.tmp',fname)
+
+	def close(self):
+
+		self.flush()
+		self.hits_file.close()
+
+	def __len__(self):
+
+		return self.count+len(self.pending)
+
+	def read_record(self, n):
+
+		"""Returns unpacked hit record n, n must be flushed."""
+
+		self.hits_file.seek(n*hit_record.size)
+
+		return hit_record.unpack(self.hits_file.read(hit_record.size))
+
+	def hit(self, r):
+
+		"""Returns Hit of unpacked hit record."""
+
+		(t,duration,key,mod,name1,name2,name3,sys_tag,chan_tag,p25nac,rssi)=r
+		s=self.strings
+
+		return Hit(t,duration,s[key],s[mod],s[name1],s[name2],s[name3],
+			None if sys_tag < 0 else str(sys_tag),None if chan_tag < 0 else str(chan_tag),
+			None if p25nac < 0 else '%X' % p25nac,None if rssi < 0 else rssi)
+
+	def bisect(self, t):
+
+		"""Returns number of first hit at or after t."""
+
+		lo=0
+		hi=self.count
+
+		while lo < hi:
+			mid=(lo+hi)/2
+			self.hits_file.seek(mid*hit_record.size)
+			(mt,)=struct.unpack('<d',self.hits_file.read(8))
+			if mt < t: lo=mid+1
+			else: hi=mid
+
+		return lo
+
+	def range(self, start=None, end=None):
+
+		"""Yields hits with start <= time < end, found by bisection."""
+
+		self.flush()
+
+		if start is None: n=0
+		else: n=self.bisect(start)
+
+		if end is None: last=self.count
+		else: last=self.bisect(end)
+
+		chunk=256
+		while n < last:
+			k=min(chunk,last-n)
+			self.hits_file.seek(n*hit_record.size)
+			data=self.hits_file.read(k*hit_record.size)
+			for i in range(0,k): yield self.hit(hit_record.unpack_from(data,i*hit_record.size))
+			n+=k
+
+	def hits(self, frq_tgid, start=None, end=None):
+
+		"""Yields hits of frequency or TGID (as reported by GLG) read by postings."""
+
+		self.flush()
+
+		key=self.string_ids.get(frq_tgid)
+		if key is None: return
+
+		for n in self.postings.get(key,()):
+			r=self.read_record(n)
+			if start is not None and r[0] < start: continue
+			if end is not None and r[0] >= end: break
+			yield self.hit(r)
+
+	def keys(self):
+
+		"""Returns logged frequencies and TGIDs."""
+
+		return [self.strings[key] for key in self.summary]
+
+	def activity(self, frq_tgid=None):
+
+		"""Returns aggregates of frequency or TGID: hits, total duration, first and
+		last hit time and max RSSI (None if not polled), or dictionary of all of them."""
+
+		def entry(a):
+			(hits,duration,first,last,rssi_max)=a
+			return {'hits':hits, 'duration':duration, 'first':first, 'last':last,
+				'rssi_max':None if rssi_max < 0 else rssi_max}
+
+		if frq_tgid is not None:
+			key=self.string_ids.get(frq_tgid)
+			if key not in self.summary: return None
+			return entry(self.summary[key])
+
+		return dict([(self.strings[key],entry(a)) for (key,a) in self.summary.items()])
+
+if __name__ == "__main__":
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--path', type=str, required=True, help='hit log directory')
+	parser.add_argument('--key', type=str, help='frequency or TGID to list')
+	parser.add_argument('--start', type=float, default=None, help='unix time')
+	parser.add_argument('--end', type=float, default=None, help='unix time')
+	parser.add_argument('--top', type=int, default=0, help='show most active channels')
+	args=parser.parse_args()
+
+	log=HitLog(args.path)
+
+	if args.top:
+		a=log.activity()
+		for k in sorted(a,key=lambda k: -a[k]['duration'])[:args.top]:
+			print '%s\t%d\t%.1f s' % (k,a[k]['hits'],a[k]['duration'])
+
+	else:
+		if args.key: l=log.hits(args.key,args.start,args.end)
+		else: l=log.range(args.start,args.end)
+		for h in l:
+			print '%s\t%.1f\t%s\t%s\t%s\t%s' % (time.strftime('%Y-%m-%d %H:%M:%S',
+				time.localtime(h.time)),h.duration,h.frq_tgid,h.name1,h.name2,h.name3)
+
+	log.close()
@@ -0,0 +1,361 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#
+# Uniden Scanner Python API
+# Copyright (C) 2014-2015 Anton Komarov
+#
+# This program is free software; you can redistribute it and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with this program;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import sys
+import logging
+import argparse
+from uniden import *
+
+# create logger
+module_logger = logging.getLogger('uniden_api.index')
+
+def to_tag(value):
+
+	"""Returns number tag as integer, None for NONE, empty or missing."""
+
+	try: return int(value)
+	except (TypeError, ValueError): return None
+
+def frq_key(frq):
+
+	"""Returns frequency in scanner 100 Hz units of scanner format (01540000)
+	or MHz (154.0000) string, None if it is not a frequency."""
+
+	try:
+		if '.' in frq: return frq_to_units(frq)
+		return int(frq)
+
+	except (TypeError, ValueError):
+		return None
+
+class ScanIndex:
+
+	"""Reverse indexes of scanner objects for resolving receptions (hits):
+
+	frequency -> channels
+	(system index, TGID) -> talkgroup
+	(system index, channel number tag) -> channel or talkgroup
+	system number tag and name -> system index
+
+	Entries are keyed by scanner memory index, so objects read again replace
+	previous ones. Index attaches itself to scanner and is kept up to date
+	by readback, load(), append and delete methods of scanner objects.
+
+	index=ScanIndex(scanner)
+	c=index.resolve_hit(scanner.get_reception_status())"""
+
+	def __init__(self, scanner, attach=True):
+
+		self.logger = logging.getLogger('uniden_api.ScanIndex')
+
+		self.scanner=scanner
+		self.clear()
+
+		if attach:
+			scanner.index=self
+			self.build(scanner.systems)
+
+	def clear(self):
+
+		self.records={}
+		self.frqs={}
+		self.tgids={}
+		self.tgids_any={}
+		self.tags={}
+		self.systems={}
+		self.sys_tags={}
+		self.sys_names={}
+		self.members={}
+
+	def detach(self):
+
+		if getattr(self.scanner,'index',None) is self: self.scanner.index=None
+
+	def __len__(self):
+
+		return len(self.records)
+
+	def build(self, systems):
+
+		"""Adds systems and their channels and TGIDs. Lazily read systems not fetched
+		yet are not fetched, their records are added when they are read."""
+
+		if isinstance(systems,dict): systems=systems.values()
+
+		for s in systems:
+			self.add_system(s)
+			if s.unfetched: continue
+			for g in s.groups.values():
+				for o in g.channels.values(): self.add(o)
+				for o in g.tgids.values(): self.add(o)
+
+		return len(self)
+
+	# maintenance
+
+	def add_system(self, s):
+
+		"""Adds or updates system number tag and name."""
+
+		self.remove_system_keys(s.sys_index)
+
+		tag=to_tag(s.number_tag)
+		self.systems[s.sys_index]=(tag,s.name)
+		if tag is not None: self.sys_tags[tag]=s.sys_index
+		self.sys_names.setdefault(s.name,[]).append(s.sys_index)
+
+	def remove_system_keys(self, sys_index):
+
+		entry=self.systems.pop(sys_index,None)
+		if entry is None: return
+
+		(tag,name)=entry
+		if self.sys_tags.get(tag) == sys_index: del self.sys_tags[tag]
+		l=self.sys_names.get(name,[])
+		if sys_index in l: l.remove(sys_index)
+		if not l: self.sys_names.pop(name,None)
+
+	def add(self, o):
+
+		"""Adds or updates channel or TGID."""
+
+		self.remove(o)
+
+		keys=[]
+		tag=to_tag(o.number_tag)
+		if tag is not None: keys.append((self.tags,(o.sys_index,tag)))
+
+		# frequency or TGID bucket, kept with the entry as objects change in place
+		bucket=None
+		if isinstance(o,TalkGroupID):
+			if o.tgid:
+				keys.append((self.tgids,(o.sys_index,o.tgid)))
+				bucket=(self.tgids_any,o.tgid)
+		else:
+			f=frq_key(o.frq)
+			if f: bucket=(self.frqs,f)
+
+		for (d,k) in keys: d[k]=o
+		if bucket is not None: bucket[0].setdefault(bucket[1],[]).append(o)
+
+		self.records[o.chn_index]=(o,keys,bucket,o.sys_index,o.grp_index)
+		self.members.setdefault(o.sys_index,{}).setdefault(o.grp_index,set()).add(o.chn_index)
+
+	def remove(self, o):
+
+		"""Removes channel or TGID with the same index as o."""
+
+		entry=self.records.pop(o.chn_index,None)
+		if entry is None: return 0
+
+		(old,keys,bucket,sys_index,grp_index)=entry
+		for (d,k) in keys:
+			if d.get(k) is old: del d[k]
+
+		if bucket is not None:
+			(d,k)=bucket
+			l=d.get(k,[])
+			if old in l: l.remove(old)
+			if not l: d.pop(k,None)
+
+		self.members.get(sys_index,{}).get(grp_index,set()).discard(o.chn_index)
+
+		return 1
+
+	def remove_group(self, g):
+
+		"""Removes all channels and TGIDs of group."""
+
+		groups=self.members.get(g.sys_index,{})
+		for chn_index in list(groups.pop(g.grp_index,())):
+			if chn_index in self.records: self.remove(self.records[chn_index][0])
+
+	def remove_system(self, s):
+
+		"""Removes system and all its channels and TGIDs."""
+
+		for chn_index in [i for l in self.members.pop(s.sys_index,{}).values() for i in l]:
+			if chn_index in self.records: self.remove(self.records[chn_index][0])
+
+		self.remove_system_keys(s.sys_index)
+
+	def check(self):
+
+		"""Returns list of (chn_index, problem) of entries not matching current
+		frequency or TGID of their object, empty when index is consistent."""
+
+		problems=[]
+
+		for (chn_index,(o,keys,bucket,sys_index,grp_index)) in self.records.items():
+			if isinstance(o,TalkGroupID): key=o.tgid or None
+			else: key=frq_key(o.frq) or None
+			if (bucket and bucket[1]) <> key: problems.append((chn_index,'stale key %s' % (bucket and bucket[1])))
+
+		for d in (self.frqs,self.tgids_any):
+			for (k,l) in d.items():
+				for o in l:
+					if self.records.get(o.chn_index,(None,))[0] is not o:
+						problems.append((o.chn_index,'not indexed, in bucket %s' % k))
+
+		return problems
+
+	# queries
+
+	def channels(self, frq):
+
+		"""Returns channels programmed to frequency (scanner format or MHz string)."""
+
+		return list(self.frqs.get(frq_key(frq),()))
+
+	def talkgroup(self, sys_index, tgid):
+
+		return self.tgids.get((sys_index,tgid))
+
+	def system_of(self, sys_tag=None, name=None):
+
+		"""Returns system index by number tag or by name if unique, None if unknown."""
+
+		sys_index=self.sys_tags.get(to_tag(sys_tag))
+		if sys_index is not None: return sys_index
+
+		l=self.sys_names.get(name,())
+		if len(l) == 1: return l[0]
+
+		return None
+
+	def resolve_hit(self, status):
+
+		"""Returns Channel or TalkGroupID of reception status, GLG dictionary from
+		get_reception_status() or Reception tuple from monitor, None if not found.
+		Tries system and channel number tags, then frequency or TGID, candidates
+		narrowed by system and channel name."""
+
+		if not isinstance(status,dict): status=status._asdict()
+
+		frq_tgid=status['frq_tgid']
+		if not frq_tgid: return None
+
+		sys_index=self.system_of(status['sys_tag'],status['name1'])
+
+		if sys_index is not None:
+			o=self.tags.get((sys_index,to_tag(status['chan_tag'])))
+			if o is not None: return o
+			o=self.tgids.get((sys_index,frq_tgid))
+			if o is not None: return o
+
+		l=self.frqs.get(frq_key(frq_tgid))
+		if l is None: l=self.tgids_any.get(frq_tgid)
+		if not l: return None
+		if len(l) == 1: return l[0]
+
+		if sys_index is not None:
+			k=[o for o in l if o.sys_index == sys_index]
+			if k: l=k
+
+		k=[o for o in l if o.name == status['name3']]
+		if k: l=k
+
+		return l[0]
+
+def self_test(systems=50, sites=100, channels=2500, step=10):
+
+	"""Checks ScanIndex of filled emulated scanner (see emulator.py) after every
+	step-th channel and TGID is moved to a new frequency or TGID, by load() and
+	by readback of records changed in emulator memory. Returns list of
+	(chn_index, problem), empty when index followed all changes."""
+
+	from emulator import ScannerEmulator
+	from benchmark import fill
+
+	e=ScannerEmulator()
+	port=e.start()
+
+	try:
+		fill(e,systems,sites,channels)
+		s=UnidenScanner(port)
+		s.get_scan_settings()
+		index=ScanIndex(s)
+
+		objs=[o for sy in s.systems.values() for g in sy.groups.values()
+			for o in g.channels.values()+g.tgids.values()]
+
+		s.enter_program_mode()
+		moved=[]
+		for (i,o) in enumerate(objs[::step]):
+			if isinstance(o,TalkGroupID):
+				old=o.tgid
+				if i%2: o.load(name=o.name,tgid=str(900000+i),tag=o.number_tag)
+				else:
+					e.records[o.chn_index]['tgid']=str(900000+i)
+					o.get_data()
+			else:
+				old=frq_key(o.frq)
+				if i%2: o.load(name=o.name,frequency=units_to_frq(4600000+i),modulation=o.mod,tag=o.number_tag)
+				else:
+					e.records[o.chn_index]['frq']='%08d' % (4600000+i)
+					o.get_data()
+			moved.append((o,old))
+
+		s.exit_program_mode()
+		s.close()
+
+	finally:
+		e.stop()
+
+	def found(o, key):
+
+		if isinstance(o,TalkGroupID): return o in index.tgids_any.get(key,())
+		return o in index.channels('%08d' % key)
+
+	problems=index.check()
+
+	for o in objs:
+		key=o.tgid if isinstance(o,TalkGroupID) else frq_key(o.frq)
+		if not found(o,key): problems.append((o.chn_index,'not found by %s' % key))
+		status={'frq_tgid':o.frq if isinstance(o,Channel) else o.tgid,
+			'sys_tag':None, 'name1':None, 'name3':o.name, 'chan_tag':None}
+		if index.resolve_hit(status) is not o: problems.append((o.chn_index,'hit not resolved'))
+
+	for (o,old) in moved:
+		if found(o,old): problems.append((o.chn_index,'still found by old key %s' % old))
+
+	return problems
+
+if __name__ == "__main__":
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--dev', type=str, default='/dev/ttyUSB0')
+	parser.add_argument('--speed', type=str, default='115200')
+	parser.add_argument('--self-test', action='store_true', help='check index on emulated scanner')
+	args=parser.parse_args()
+
+	if args.self_test:
+		problems=self_test()
+		for (chn_index,problem) in problems: print ('%s:\t%s') % (chn_index,problem)
+		print ('Problems:\t%d') % len(problems)
+		sys.exit(1 if problems else 0)
+
+	s=UnidenScanner(args.dev,args.speed)
+	if not s.get_scan_settings(): print "get_scan_settings() returned 0"
+
+	index=ScanIndex(s)
+	print ('Indexed:\t%d channels and TGIDs, %d frequencies') % (len(index),len(index.frqs))
+
+	status=s.get_reception_status()
+	if status: o=index.resolve_hit(status)
+	else: o=None
+	if o is None: print 'No reception or not found'
+	else: print ('Receiving:\t%s (system %s, group %s)') % (o.name,o.sys_index,o.grp_index)
@@ -0,0 +1,115 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#
+# Uniden Scanner Python API
+# Copyright (C) 2014-2015 Anton Komarov
+#
+# This program is free software; you can redistribute it and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with this program;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import bisect
+import threading
+
+# default latency histogram bucket upper bounds, seconds
+latency_buckets=(0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1.0,2.5)
+
+class CommandMetrics:
+
+	"""Per command mnemonic metrics collector.
+	Attach to scanner with UnidenScanner.attach_metrics(). Any object with the
+	same record() method can be attached instead."""
+
+	def __init__(self, buckets=latency_buckets):
+
+		self.buckets=tuple(buckets)
+		self.lock=threading.Lock()
+		self.reset()
+
+	def reset(self):
+
+		"""Drops all collected data."""
+
+		with self.lock:
+			self.commands={}
+
+	def record(self, mnemonic, latency, sent, received, error):
+
+		"""Records one command: latency in seconds, bytes sent and received,
+		error is True when scanner returned an error response."""
+
+		with self.lock:
+
+			m=self.commands.get(mnemonic)
+			if m is None:
+				m={'calls':0, 'errors':0, 'bytes_sent':0, 'bytes_received':0,
+					'latency_sum':0.0, 'latency_max':0.0,
+					'histogram':[0]*(len(self.buckets)+1)}
+				self.commands[mnemonic]=m
+
+			m['calls']+=1
+			if error: m['errors']+=1
+			m['bytes_sent']+=sent
+			m['bytes_received']+=received
+			m['latency_sum']+=latency
+			if latency > m['latency_max']: m['latency_max']=latency
+			m['histogram'][bisect.bisect_left(self.buckets,latency)]+=1
+
+	def to_dict(self):
+
+		"""Returns copy of collected data keyed by command mnemonic.
+		Histogram is list of (upper bound, count) pairs, last bound is 'inf'."""
+
+		d={}
+
+		with self.lock:
+			for (mnemonic,m) in self.commands.items():
+				c=dict(m)
+				c['histogram']=zip(list(self.buckets)+['inf'],m['histogram'])
+				if m['calls']: c['latency_avg']=m['latency_sum']/m['calls']
+				else: c['latency_avg']=0.0
+				d[mnemonic]=c
+
+		return d
+
+	def to_prometheus(self, prefix='uniden'):
+
+		"""Returns collected data in Prometheus text exposition format."""
+
+		counters=(('commands_total','calls','Commands sent to scanner.'),
+			('command_errors_total','errors','Commands answered with an error.'),
+			('command_bytes_sent_total','bytes_sent','Bytes sent to scanner.'),
+			('command_bytes_received_total','bytes_received','Bytes received from scanner.'))
+
+		l=[]
+
+		with self.lock:
+
+			mnemonics=sorted(self.commands)
+
+			for (name,key,help) in counters:
+				l.append('# HELP %s_%s %s' % (prefix,name,help))
+				l.append('# TYPE %s_%s counter' % (prefix,name))
+				for c in mnemonics:
+					l.append('%s_%s{command="%s"} %d' % (prefix,name,c,self.commands[c][key]))
+
+			name='%s_command_latency_seconds' % prefix
+			l.append('# HELP %s Command round trip time.' % name)
+			l.append('# TYPE %s histogram' % name)
+			for c in mnemonics:
+				m=self.commands[c]
+				n=0
+				for (le,count) in zip(self.buckets,m['histogram']):
+					n+=count
+					l.append('%s_bucket{command="%s",le="%s"} %d' % (name,c,repr(le),n))
+				l.append('%s_bucket{command="%s",le="+Inf"} %d' % (name,c,m['calls']))
+				l.append('%s_sum{command="%s"} %s' % (name,c,repr(m['latency_sum'])))
+				l.append('%s_count{command="%s"} %d' % (name,c,m['calls']))
+
+		return '\n'.join(l+[''])
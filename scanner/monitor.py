@@ -0,0 +1,326 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#
+# Uniden Scanner Python API
+# Copyright (C) 2014-2015 Anton Komarov
+#
+# This program is free software; you can redistribute it and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with this program;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import sys
+import time
+import logging
+import argparse
+from collections import namedtuple
+from uniden import *
+
+# create logger
+module_logger = logging.getLogger('uniden_api.monitor')
+
+def monotonic_clock():
+
+	"""Returns monotonic clock function, seconds, not moved by wall clock
+	adjustments: time.monotonic on Python 3, monotonic package when installed,
+	clock_gettime(CLOCK_MONOTONIC) by ctypes on Linux and other POSIX systems.
+	None if there is no monotonic source."""
+
+	try:
+		from time import monotonic
+		return monotonic
+
+	except ImportError:
+		pass
+
+	try:
+		from monotonic import monotonic
+		return monotonic
+
+	except (ImportError, RuntimeError):
+		pass
+
+	try:
+		import ctypes
+		import ctypes.util
+
+		class timespec(ctypes.Structure):
+			_fields_=[('tv_sec',ctypes.c_long), ('tv_nsec',ctypes.c_long)]
+
+		lib=ctypes.CDLL(ctypes.util.find_library('rt') or ctypes.util.find_library('c'),use_errno=True)
+		clock_gettime=lib.clock_gettime
+		clock_gettime.argtypes=[ctypes.c_int,ctypes.POINTER(timespec)]
+
+		# CLOCK_MONOTONIC is 1 on Linux and BSDs, 6 on macOS
+		CLOCK_MONOTONIC=6 if sys.platform == 'darwin' else 1
+		t=timespec()
+		ts=ctypes.pointer(t)
+
+		def monotonic():
+			if clock_gettime(CLOCK_MONOTONIC,ts) <> 0:
+				raise OSError(ctypes.get_errno(),'clock_gettime() failed')
+			return t.tv_sec+t.tv_nsec*1e-9
+
+		monotonic()
+		return monotonic
+
+	except (ImportError, OSError, AttributeError, TypeError):
+		return None
+
+# event times and durations, wall clock (moved by clock adjustments) only
+# if there is no monotonic source
+clock=monotonic_clock()
+if clock is None:
+	module_logger.warning('no monotonic clock, reception timings follow wall clock adjustments')
+	clock=time.time
+
+# GLG response fields, as in protocol schema
+Reception = namedtuple('Reception', codec.fields('GLG'))
+
+# kind is open, close, change (frequency/TGID or tags) or name,
+# duration is how long previous state lasted, rssi is None unless PWR is polled
+ReceptionEvent = namedtuple('ReceptionEvent', 'kind time duration status previous rssi')
+
+def parse_reception(res):
+
+	"""Parses GLG response to Reception tuple, see parse_reception_status()."""
+
+	return Reception(**parse_reception_status(res))
+
+def is_open(status):
+
+	"""Returns True if squelch is open."""
+
+	return status.sql == '1'
+
+class PollScheduler:
+
+	"""Adaptive poll rate: max_rate while squelch is open or reception changes,
+	then decaying to min_rate, halving the distance every half_life seconds of
+	silence. Can drive any polling loop, call observe() after each poll."""
+
+	def __init__(self, min_rate=2.0, max_rate=50.0, half_life=2.0):
+
+		self.min_rate=float(min_rate)
+		self.max_rate=float(max_rate)
+		self.half_life=float(half_life)
+		self.rate=self.min_rate
+		self.last_active=None
+
+	def observe(self, active, changed, now):
+
+		"""Updates rate from poll result, active is open squelch, changed is any event."""
+
+		if active or changed:
+			self.last_active=now
+			self.rate=self.max_rate
+
+		elif self.last_active is None:
+			self.rate=self.min_rate
+
+		else:
+			k=0.5**((now-self.last_active)/self.half_life)
+			self.rate=self.min_rate+(self.max_rate-self.min_rate)*k
+
+		return self.rate
+
+	def interval(self):
+
+		"""Returns delay until next poll, seconds."""
+
+		return 1.0/self.rate
+
+class ReceptionMonitor:
+
+	"""Polls reception status (GLG) at given rate and yields only transitions:
+	squelch open and close, new frequency/TGID and name change while open.
+	With rssi PWR is polled too while squelch is open, events carry the last RSSI.
+
+	With scheduler (PollScheduler) poll rate follows activity and rate is ignored.
+
+	for e in ReceptionMonitor(scanner, rate=20): print e.kind, e.status.name3"""
+
+	def __init__(self, scanner, rate=10.0, rssi=False, clock=clock, scheduler=None):
+
+		self.logger = logging.getLogger('uniden_api.ReceptionMonitor')
+
+		self.scanner=scanner
+		self.rate=float(rate)
+		self.rssi=rssi
+		self.clock=clock
+		self.scheduler=scheduler
+		self.running=False
+		self.reset()
+
+	def reset(self):
+
+		"""Drops reception state and statistics."""
+
+		self.status=None
+		self.since=None
+		self.last_rssi=None
+		self.polls=0
+		self.errors=0
+		self.events_count=0
+		self.started=None
+		self.last_poll=None
+		# squelch open detection latency, running totals as events() runs forever
+		self.latency_count=0
+		self.latency_sum=0.0
+		self.latency_max=0.0
+
+	def __iter__(self):
+
+		return self.events()
+
+	def stop(self):
+
+		"""Stops events() generator after current poll."""
+
+		self.running=False
+
+	def interval(self):
+
+		"""Returns delay until next poll, seconds."""
+
+		if self.scheduler is not None: return self.scheduler.interval()
+
+		return 1.0/self.rate
+
+	def poll(self):
+
+		"""Reads reception status, returns Reception or None on error."""
+
+		try:
+			status=parse_reception(self.scanner.raw('GLG'))
+			if self.rssi and is_open(status):
+				self.last_rssi=int(parse_rssi_power(self.scanner.raw('PWR'))['rssi'])
+
+		except (CommandError, ValueError, TypeError), e:
+			self.logger.error('poll(): %s' % str(e))
+			self.errors+=1
+			return None
+
+		self.polls+=1
+
+		return status
+
+	def transitions(self, status, now):
+
+		"""Returns list of events turning current state into status and sets it."""
+
+		prev=self.status
+		events=[]
+
+		if prev is None:
+			if is_open(status): events.append(ReceptionEvent('open',now,0.0,status,None,self.last_rssi))
+
+		elif is_open(prev) <> is_open(status):
+			if is_open(status): kind='open'
+			else: kind='close'
+			events.append(ReceptionEvent(kind,now,now-self.since,status,prev,self.last_rssi))
+
+		elif not is_open(status):
+			# scanning while squelch is closed, nothing to report
+			pass
+
+		elif (prev.frq_tgid,prev.sys_tag,prev.chan_tag) <> (status.frq_tgid,status.sys_tag,status.chan_tag):
+			events.append(ReceptionEvent('change',now,now-self.since,status,prev,self.last_rssi))
+
+		elif (prev.name1,prev.name2,prev.name3) <> (status.name1,status.name2,status.name3):
+			events.append(ReceptionEvent('name',now,now-self.since,status,prev,self.last_rssi))
+
+		if events or prev is None:
+			self.since=now
+			if not is_open(status): self.last_rssi=None
+
+		self.status=status
+
+		return events
+
+	def events(self, duration=None):
+
+		"""Generator of reception events, runs until stop() or for duration seconds."""
+
+		self.running=True
+		self.started=self.clock()
+		deadline=self.started
+
+		while self.running:
+
+			now=self.clock()
+			if duration is not None and now-self.started >= duration: break
+
+			status=self.poll()
+			if status is not None:
+				events=self.transitions(status,now)
+				if self.scheduler is not None: self.scheduler.observe(is_open(status),events,now)
+				for e in events:
+					# squelch opened somewhere since previous poll
+					if e.kind == 'open' and self.last_poll is not None:
+						latency=now-self.last_poll
+						self.latency_count+=1
+						self.latency_sum+=latency
+						self.latency_max=max(self.latency_max,latency)
+					self.events_count+=1
+					yield e
+				self.last_poll=now
+
+			deadline=max(deadline+self.interval(),self.clock())
+			delay=deadline-self.clock()
+			if delay > 0: time.sleep(delay)
+
+		self.running=False
+
+	def stats(self):
+
+		"""Returns polls, errors, events, achieved poll rate and squelch open detection
+		latency. Latency is upper bound, time between poll seeing squelch open and
+		previous poll, average real latency is about half of it."""
+
+		if self.started is None: elapsed=0.0
+		else: elapsed=self.clock()-self.started
+
+		if self.latency_count: latency_avg=self.latency_sum/self.latency_count
+		else: latency_avg=0.0
+
+		return {'polls':self.polls, 'errors':self.errors, 'events':self.events_count,
+			'elapsed':elapsed, 'rate':self.polls/elapsed if elapsed else 0.0,
+			'latency_avg':latency_avg, 'latency_max':self.latency_max}
+
+if __name__ == "__main__":
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--dev', type=str, default='/dev/ttyUSB0')
+	parser.add_argument('--speed', type=str, default='115200')
+	parser.add_argument('--rate', type=float, default=10.0, help='polls per second')
+	parser.add_argument('--adaptive', action='store_true', help='poll rate follows activity')
+	parser.add_argument('--min-rate', type=float, default=2.0, help='adaptive idle polls per second')
+	parser.add_argument('--max-rate', type=float, default=50.0, help='adaptive active polls per second')
+	parser.add_argument('--half-life', type=float, default=2.0, help='adaptive rate decay, seconds')
+	parser.add_argument('--rssi', action='store_true', help='poll PWR while squelch is open')
+	parser.add_argument('--duration', type=float, default=None, help='seconds, forever by default')
+	args=parser.parse_args()
+
+	s=UnidenScanner(args.dev,args.speed)
+	scheduler=None
+	if args.adaptive: scheduler=PollScheduler(args.min_rate,args.max_rate,args.half_life)
+	m=ReceptionMonitor(s,args.rate,args.rssi,scheduler=scheduler)
+
+	try:
+		for e in m.events(args.duration):
+			print '%.3f\t%-6s\t%.3f\t%s\t%s\t%s\t%s\t%s' % (e.time,e.kind,e.duration,
+				e.status.frq_tgid,e.status.name1,e.status.name2,e.status.name3,e.rssi)
+
+	except KeyboardInterrupt:
+		pass
+
+	st=m.stats()
+	print ('Polls:\t\t%d (%.1f/s)') % (st['polls'],st['rate'])
+	print ('Events:\t\t%d') % st['events']
+	print ('Open latency:\t%.3f s avg, %.3f s max') % (st['latency_avg'],st['latency_max'])
@@ -0,0 +1,302 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#
+# Uniden Scanner Python API
+# Copyright (C) 2014-2015 Anton Komarov
+#
+# This program is free software; you can redistribute it and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with this program;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import logging
+from collections import namedtuple
+
+# create logger
+module_logger = logging.getLogger('uniden_api.protocol')
+
+# Command layout. get is the Radio -> Controller response shape without command
+# name, set is the Controller -> Radio shape without command name and index,
+# index is name of the index field of set command. None is a reserved field,
+# or a field not kept by the API.
+Command = namedtuple('Command', 'name get set index')
+
+def command(name, get, set=None, index=None):
+
+	return Command(name,tuple(get),set and tuple(set),index)
+
+def setting(name, fields, index=None):
+
+	"""Returns command whose set command carries the same fields as response."""
+
+	return command(name,fields,fields,index)
+
+def layout(s):
+
+	"""Returns field tuple of space separated names, - is None."""
+
+	return tuple([None if f == '-' else f for f in s.split()])
+
+# Memory records
+
+commands=[
+	command('SIN',
+		layout('sys_type name quick_key hld lout dly - - - - - rev_index fwd_index '
+			'chn_grp_head chn_grp_tail seq_no start_key - - - - - number_tag agc_analog '
+			'agc_digital p25waiting protect -'),
+		layout('name quick_key hld lout dly - - - - - start_key - - - - - - number_tag '
+			'agc_analog agc_digital p25waiting'),'sys_index'),
+	command('TRN',
+		layout('id_search s_bit end_code afs - - emg emgl fmap ctm_fmap - - - - - - - - - - '
+			'tgid_grp_head tgid_grp_tail id_lout_grp_head id_lout_grp_tail mot_id emg_color '
+			'emg_pattern p25nac pri_id_scan'),
+		layout('id_search s_bit end_code afs - - emg emgl fmap ctm_fmap - - - - - - - - - - '
+			'mot_id emg_color emg_pattern p25nac pri_id_scan'),'sys_index'),
+	command('GIN',
+		layout('grp_type name quick_key lout rev_index fwd_index sys_index chn_head chn_tail '
+			'seq_no latitude longitude grp_range gps_enable'),
+		layout('name quick_key lout latitude longitude grp_range gps_enable'),'grp_index'),
+	command('SIF',
+		layout('- name quick_key hld lout mod att c_ch - - rev_index fwd_index sys_index '
+			'chn_head chn_tail seq_no start_key latitude longitude sit_range gps_enable - '
+			'mot_type edacs_type p25waiting -'),
+		layout('name quick_key hld lout mod att c_ch - - start_key latitude longitude '
+			'sit_range gps_enable - mot_type edacs_type p25waiting -'),'sit_index'),
+	command('CIN',
+		layout('name frq mod dcs tlock lout pri att alt altl rev_index fwd_index sys_index '
+			'grp_index - audio_type p25nac number_tag alt_color alt_pattern vol_offset'),
+		layout('name frq mod dcs tlock lout pri att alt altl - audio_type p25nac number_tag '
+			'alt_color alt_pattern vol_offset'),'chn_index'),
+	command('TIN',
+		layout('name tgid lout pri alt altl rev_index fwd_index sys_index grp_index - '
+			'audio_type number_tag alt_color alt_pattern vol_offset'),
+		layout('name tgid lout pri alt altl - audio_type number_tag alt_color alt_pattern '
+			'vol_offset'),'chn_index'),
+	command('TFQ',
+		layout('frq lcn lout rev_index fwd_index sys_index grp_index - number_tag vol_offset -'),
+		layout('frq lcn lout - number_tag vol_offset -'),'chn_index'),
+	command('MCP',
+		layout(' '.join(['lower%d upper%d step%d offset%d' % (i,i,i,i) for i in range(1,7)]))),
+	command('ABP',
+		layout(' '.join(['bf_%X sf_%X' % (i,i) for i in range(0,16)]))),
+
+# Settings
+
+	setting('BLT',layout('event color dimmer')),
+	setting('BSV',layout('bat_save charge_time')),
+	setting('COM',layout('baudrate -')),
+	setting('KBP',layout('level lock safe')),
+	setting('OMS',layout('l1_char l2_char l3_char l4_char')),
+	setting('PRI',layout('pri_mode max_chan interval')),
+	setting('AGV',layout('- - a_res a_ref a_gain d_res d_gain')),
+	command('SCT',layout('n')),
+	setting('CNT',layout('contrast')),
+	setting('SCN',layout('disp_mode - ch_log g_att - p25_lpf disp_uid'+' -'*14)),
+
+# Search and close call
+
+	setting('SCO',layout('- modulation attenuate delay - code_srch bscreen repeater - - '
+		'max_store - agc_analog agc_digital p25waiting')),
+	setting('SHK',layout('srch_key_1 srch_key_2 srch_key_3 - - -')),
+	setting('CLC',layout('mode override - beep level pause band lockout hold quick_key '
+		'number_tag color pattern')),
+	setting('CSG',layout('n')),
+	setting('BSP',layout('frequency step span max_hold')),
+	setting('BBS',layout('limit_l limit_h'),'srch_index'),
+	setting('CBP',layout('mot_type '+' '.join(['lower%d upper%d step%d offset%d' % (i,i,i,i)
+		for i in range(1,7)])),'srch_index'),
+	setting('CSP',layout('name limit_l limit_h step modulation attenuation delay - hold '
+		'lockout cch - - quick_key start_key - number_tag agc_analog agc_digital p25waiting'),
+		'srch_index'),
+	command('SSP',layout('- delay attenuation hold lockout quick_key start_key - number_tag '
+		'agc_analog agc_digital p25waiting'),layout('delay attenuation hold lockout quick_key '
+		'start_key - number_tag agc_analog agc_digital p25waiting'),'srch_index'),
+	command('GLF',layout('frq')),
+
+# Reception
+
+	command('PWR',layout('rssi frq')),
+	command('GLG',layout('frq_tgid mod att ctcss_dcs name1 name2 name3 sql mute sys_tag '
+		'chan_tag p25nac')),
+	command('QSH',(),layout('frq - mod att dly - code_srch bsc rep - agc_analog agc_digital '
+		'p25waiting')),
+	command('QSC',layout('rssi frq sql'),layout('frq - mod att dly - code_srch bsc rep - '
+		'agc_analog agc_digital p25waiting')),
+]
+
+schema=dict([(c.name,c) for c in commands])
+
+# Field types for decode_typed(), fields not listed are strings.
+# frq is scanner 8 digit frequency in 100 Hz units, decoded to Hz.
+field_types={'frq':'frq', 'limit_l':'frq', 'limit_h':'frq', 'frequency':'frq',
+	'rev_index':'int', 'fwd_index':'int', 'sys_index':'int', 'grp_index':'int',
+	'chn_head':'int', 'chn_tail':'int', 'chn_grp_head':'int', 'chn_grp_tail':'int',
+	'tgid_grp_head':'int', 'tgid_grp_tail':'int', 'id_lout_grp_head':'int',
+	'id_lout_grp_tail':'int', 'seq_no':'int', 'rssi':'int', 'sql':'int', 'lout':'int',
+	'pri':'int', 'att':'int', 'dcs':'int', 'vol_offset':'int'}
+
+converters={'int':int, 'frq':lambda f: int(f)*100}
+
+def compile_function(name, args, body):
+
+	"""Returns function compiled from list of body lines."""
+
+	src='def %s(%s):\n%s\n' % (name,args,''.join(['\t%s\n' % l for l in body]))
+	ns={}
+	exec compile(src,'<protocol %s>' % name,'exec') in ns
+
+	return ns[name]
+
+class Codec:
+
+	"""Encoders and decoders compiled from command schema.
+	Responses may carry more trailing fields than schema knows, they are ignored.
+	Responses with fewer fields raise ValueError."""
+
+	def __init__(self, schema=schema):
+
+		self.logger = logging.getLogger('uniden_api.Codec')
+
+		self.schema=schema
+		self.decoders={}
+		self.dict_decoders={}
+		self.into_decoders={}
+		self.encoders={}
+		self.dict_encoders={}
+		self.templates={}
+
+		for c in schema.values():
+			self.decoders[c.name]=self.compile_decode(c)
+			self.dict_decoders[c.name]=self.compile_dict(c)
+			self.into_decoders[c.name]=self.compile_into(c)
+			if c.set is not None:
+				self.templates[c.name]=self.template(c)
+				self.encoders[c.name]=self.compile_encode(c)
+				self.dict_encoders[c.name]=self.compile_encode_dict(c)
+
+	def split_lines(self, c):
+
+		"""Returns code splitting response to list l of command name and fields,
+		extra trailing fields dropped."""
+
+		n=len(c.get)+1
+
+		return ['l=res.split(",")',
+			'if len(l) <> %d:' % n,
+			'\tif len(l) < %d: raise ValueError("%s: %%d fields, %d expected" %% (len(l)-1))' % (n,c.name,n-1),
+			'\tdel l[%d:]' % n]
+
+	def compile_decode(self, c):
+
+		return compile_function('decode_%s' % c.name,'res',
+			self.split_lines(c)+['return l[1:]'])
+
+	def compile_dict(self, c):
+
+		items=['"%s":l[%d]' % (f,i+1) for (i,f) in enumerate(c.get) if f]
+
+		return compile_function('dict_%s' % c.name,'res',
+			self.split_lines(c)+['return {%s}' % ', '.join(items)])
+
+	def compile_into(self, c):
+
+		targets=['_']+['obj.%s' % f if f else '_' for f in c.get]
+
+		return compile_function('into_%s' % c.name,'obj, res',
+			self.split_lines(c)+['(%s)=l' % ', '.join(targets)])
+
+	def template(self, c):
+
+		"""Returns set command format string, index and set fields are %s."""
+
+		return c.name+(',%s' if c.index else '')+''.join([',%s' if f else ',' for f in c.set])
+
+	def compile_encode(self, c):
+
+		values=['obj.%s' % f for f in [c.index]+list(c.set) if f]
+
+		return compile_function('encode_%s' % c.name,'obj',
+			['return "%s" %% (%s,)' % (self.templates[c.name],', '.join(values))])
+
+	def compile_encode_dict(self, c):
+
+		values=['d["%s"]' % f for f in c.set if f]
+		if c.index: values.insert(0,'index')
+
+		return compile_function('encode_dict_%s' % c.name,'d, index=None',
+			['return "%s" %% (%s,)' % (self.templates[c.name],', '.join(values))])
+
+	def fields(self, cmd):
+
+		"""Returns response field names of command, None for reserved."""
+
+		return self.schema[cmd].get
+
+	def set_fields(self, cmd):
+
+		"""Returns names of set command fields, without index and reserved."""
+
+		return tuple([f for f in self.schema[cmd].set if f])
+
+	def decode(self, cmd, res):
+
+		"""Returns list of response field values, without command name."""
+
+		return self.decoders[cmd](res)
+
+	def decode_dict(self, cmd, res):
+
+		"""Returns dictionary of named response fields."""
+
+		return self.dict_decoders[cmd](res)
+
+	def decode_typed(self, cmd, res):
+
+		"""Returns dictionary of named response fields converted by field_types,
+		empty values are None."""
+
+		d=self.dict_decoders[cmd](res)
+
+		for (k,v) in d.items():
+			t=field_types.get(k)
+			if v == '': d[k]=None
+			elif t is not None:
+				try: d[k]=converters[t](v)
+				except ValueError: pass
+
+		return d
+
+	def decode_into(self, cmd, obj, res):
+
+		"""Sets named response fields as attributes of obj."""
+
+		self.into_decoders[cmd](obj,res)
+
+	def encode(self, cmd, obj):
+
+		"""Returns set command built from index and set fields attributes of obj."""
+
+		return self.encoders[cmd](obj)
+
+	def encode_dict(self, cmd, d, index=None):
+
+		"""Returns set command built from dictionary of set fields, index given
+		for indexed commands."""
+
+		return self.dict_encoders[cmd](d,index)
+
+	def encode_values(self, cmd, values, index=None):
+
+		"""Returns set command built from set field values in order, index given
+		for indexed commands."""
+
+		if index is not None: values=[index]+list(values)
+
+		return self.templates[cmd] % tuple(values)
+
+codec=Codec()
@@ -0,0 +1,368 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#
+# Uniden Scanner Python API
+# Copyright (C) 2014-2015 Anton Komarov
+#
+# This program is free software; you can redistribute it and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with this program;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import array
+import bisect
+import logging
+import argparse
+from uniden import *
+from table import *
+
+# create logger
+module_logger = logging.getLogger('uniden_api.query')
+
+# columns with hash index (value -> rows) and with sorted index (bisect ranges)
+hashed=('kind','mod','lout','pri','number_tag','sys_index','grp_index','name','tgid')
+ordered=('frq',)
+
+# indexed conditions with up to this many times the rows of the most selective
+# one are intersected, larger ones are tested on candidates
+intersect_ratio=8
+
+def mhz_to_hz(f):
+
+	"""Returns frequency in MHz (string, float or int) in Hz, Hz integers above
+	100000 are returned as is."""
+
+	if isinstance(f,(int,long)) and f > 100000: return f
+
+	return frq_to_units(f)*100
+
+def column_value(column, value):
+
+	"""Returns table column value of query value, modulation names are codes."""
+
+	if column == 'mod' and isinstance(value,basestring): return mod_values.index(value)
+	if column == 'kind' and isinstance(value,basestring): return {'channel':CHANNEL, 'tgid':TGID}[value]
+
+	return value
+
+class TableIndexes:
+
+	"""Secondary indexes of live ChannelTable rows, built per column on first use
+	and updated by the table with every added, changed or removed row."""
+
+	def __init__(self, table):
+
+		self.logger = logging.getLogger('uniden_api.TableIndexes')
+
+		self.table=table
+		self.hashes={}
+		self.sorts={}
+
+	def hash(self, column):
+
+		"""Returns dictionary of column value to array of rows."""
+
+		d=self.hashes.get(column)
+
+		if d is None:
+			d={}
+			alive=self.table.alive
+			for (i,v) in enumerate(getattr(self.table,column)):
+				if not alive[i]: continue
+				l=d.get(v)
+				if l is None: d[v]=l=array.array('l')
+				l.append(i)
+			self.hashes[column]=d
+
+		return d
+
+	def sorted(self, column):
+
+		"""Returns (sorted column values, rows in the same order) arrays."""
+
+		s=self.sorts.get(column)
+
+		if s is None:
+			col=getattr(self.table,column)
+			alive=self.table.alive
+			rows=sorted([i for i in xrange(0,len(col)) if alive[i]],key=col.__getitem__)
+			s=(array.array(col.typecode,[col[i] for i in rows]),array.array('l',rows))
+			self.sorts[column]=s
+
+		return s
+
+	def add_row(self, n):
+
+		"""Adds row n with its current values to built indexes."""
+
+		for (column,d) in self.hashes.items():
+			v=getattr(self.table,column)[n]
+			l=d.get(v)
+			if l is None: d[v]=l=array.array('l')
+			l.append(n)
+
+		for (column,(values,rows)) in self.sorts.items():
+			v=getattr(self.table,column)[n]
+			k=bisect.bisect_right(values,v)
+			values.insert(k,v)
+			rows.insert(k,n)
+
+	def remove_row(self, n):
+
+		"""Removes row n from built indexes, called before the row changes."""
+
+		for (column,d) in self.hashes.items():
+			v=getattr(self.table,column)[n]
+			l=d[v]
+			l.remove(n)
+			if not l: del d[v]
+
+		for (column,(values,rows)) in self.sorts.items():
+			v=getattr(self.table,column)[n]
+			k=bisect.bisect_left(values,v)
+			while rows[k] <> n: k+=1
+			del values[k]
+			del rows[k]
+
+	# Lookups return (number of rows, function returning the rows), so a query
+	# can pick the most selective one before any rows are copied.
+
+	def eq(self, column, value):
+
+		rows=self.hash(column).get(value,())
+
+		return (len(rows),lambda: rows)
+
+	def isin(self, column, values):
+
+		d=self.hash(column)
+		l=[d.get(v,()) for v in set(values)]
+
+		return (sum([len(rows) for rows in l]),lambda: [i for rows in l for i in rows])
+
+	def between(self, column, lo, hi):
+
+		"""Rows with lo <= value <= hi."""
+
+		(values,rows)=self.sorted(column)
+		(a,b)=(bisect.bisect_left(values,lo),bisect.bisect_right(values,hi))
+
+		return (max(b-a,0),lambda: rows[a:b])
+
+def indexes_of(table):
+
+	"""Returns TableIndexes of table, kept with the table."""
+
+	if table.indexes is None: table.indexes=TableIndexes(table)
+
+	return table.indexes
+
+class Query:
+
+	"""Query over ChannelTable rows. Conditions are combined with AND, the most
+	selective indexed one (hashed and ordered columns) selects candidate rows,
+	the others are tested on candidates only. Methods adding conditions return
+	the query, so they can be chained:
+
+	q=Query(table).where(kind='channel',lout=0,mod='NFM').frequency(450,470)
+	for o in q.order_by('frq').records(): print o.name
+
+	Query(table).where(kind='tgid',pri=1,sys_index=5).count()
+	Query(table).where(kind='channel').duplicates('frq',across='grp_index')"""
+
+	def __init__(self, table):
+
+		self.logger = logging.getLogger('uniden_api.Query')
+
+		self.table=table
+		self.indexes=indexes_of(table)
+		self.lookups=[]
+		self.tests=[]
+		self.order=()
+		self.max_rows=None
+
+	# conditions
+
+	def where(self, **conditions):
+
+		"""Adds column == value conditions, value list or tuple is any of values."""
+
+		for (column,value) in conditions.items():
+			if isinstance(value,(list,tuple,set)): self.isin(column,value)
+			else:
+				value=column_value(column,value)
+				test=lambda i,col=getattr(self.table,column),v=value: col[i] == v
+				if column in hashed: self.lookups.append((lambda c=column,v=value: self.indexes.eq(c,v),test))
+				else: self.tests.append(test)
+
+		return self
+
+	def isin(self, column, values):
+
+		values=set([column_value(column,v) for v in values])
+		test=lambda i,col=getattr(self.table,column): col[i] in values
+
+		if column in hashed: self.lookups.append((lambda: self.indexes.isin(column,values),test))
+		else: self.tests.append(test)
+
+		return self
+
+	def between(self, column, lo, hi):
+
+		"""Adds lo <= column <= hi condition."""
+
+		test=lambda i,col=getattr(self.table,column): lo <= col[i] <= hi
+
+		if column in ordered: self.lookups.append((lambda: self.indexes.between(column,lo,hi),test))
+		else: self.tests.append(test)
+
+		return self
+
+	def frequency(self, lo, hi):
+
+		"""Adds frequency range condition, lo and hi in MHz or Hz, TGIDs never match."""
+
+		return self.between('frq',max(mhz_to_hz(lo),1),mhz_to_hz(hi))
+
+	def filter(self, func):
+
+		"""Adds condition of func(record) being true."""
+
+		objects=self.table.objects
+		self.tests.append(lambda i: func(objects[i]))
+
+		return self
+
+	def order_by(self, *columns):
+
+		"""Orders rows by columns, -column is descending."""
+
+		self.order=columns
+
+		return self
+
+	def limit(self, n):
+
+		self.max_rows=n
+
+		return self
+
+	# results
+
+	def plan(self):
+
+		"""Returns candidate rows and tests of the conditions still to check.
+		Candidates are rows of the most selective indexed condition, intersected
+		with indexed conditions of comparable size (set intersection is cheaper
+		than testing each candidate), larger ones are tested on candidates."""
+
+		if not self.lookups: return (xrange(0,len(self.table.alive)),self.tests)
+
+		sized=sorted([(lookup(),test) for (lookup,test) in self.lookups],key=lambda l: l[0][0])
+		((n,rows),test)=sized[0]
+		rows=rows()
+		tests=list(self.tests)
+
+		for ((size,other),test) in sized[1:]:
+			if not rows: break
+			if size > intersect_ratio*n: tests.append(test)
+			else:
+				if not isinstance(rows,set): rows=set(rows)
+				rows.intersection_update(other())
+
+		return (rows,tests)
+
+	def rows(self):
+
+		"""Returns row numbers matching all conditions, ordered and limited."""
+
+		alive=self.table.alive
+		(rows,tests)=self.plan()
+
+		l=[i for i in rows if alive[i] and all(t(i) for t in tests)]
+		l.sort()
+
+		# stable sorts, last column first
+		for column in reversed(self.order):
+			col=getattr(self.table,column.lstrip('-'))
+			l.sort(key=col.__getitem__,reverse=column.startswith('-'))
+
+		if self.max_rows is not None: l=l[:self.max_rows]
+
+		return l
+
+	def count(self):
+
+		return len(self.rows())
+
+	def records(self):
+
+		objects=self.table.objects
+
+		return [objects[i] for i in self.rows()]
+
+	def values(self, column):
+
+		col=getattr(self.table,column)
+
+		return [col[i] for i in self.rows()]
+
+	def group_by(self, column):
+
+		"""Returns dictionary of column value to matching rows."""
+
+		col=getattr(self.table,column)
+		d={}
+		for i in self.rows(): d.setdefault(col[i],[]).append(i)
+
+		return d
+
+	def distinct(self, column):
+
+		"""Returns sorted distinct column values of matching rows."""
+
+		return sorted(set(self.values(column)))
+
+	def duplicates(self, column='frq', across=None):
+
+		"""Returns dictionary of column value shared by more than one matching row
+		to rows. With across (e.g. grp_index) rows must also differ in that column."""
+
+		d=self.group_by(column)
+		if across is None: return dict([(v,l) for (v,l) in d.items() if len(l) > 1])
+
+		col=getattr(self.table,across)
+
+		return dict([(v,l) for (v,l) in d.items() if len(set([col[i] for i in l])) > 1])
+
+if __name__ == "__main__":
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--dev', type=str, default='/dev/ttyUSB0')
+	parser.add_argument('--speed', type=str, default='115200')
+	parser.add_argument('--frq', type=float, nargs=2, metavar=('LO','HI'), help='MHz range')
+	parser.add_argument('--mod', type=str, help='modulation')
+	parser.add_argument('--unlocked', action='store_true')
+	parser.add_argument('--duplicates', action='store_true', help='frequencies in more than one group')
+	args=parser.parse_args()
+
+	s=UnidenScanner(args.dev,args.speed)
+	if not s.get_scan_settings(): print "get_scan_settings() returned 0"
+
+	t=ChannelTable(s.systems)
+	q=Query(t).where(kind='channel')
+	if args.frq: q.frequency(args.frq[0],args.frq[1])
+	if args.mod: q.where(mod=args.mod.upper())
+	if args.unlocked: q.where(lout=0)
+
+	if args.duplicates:
+		for (f,rows) in sorted(q.duplicates('frq',across='grp_index').items()):
+			print '%s\t%s' % (units_to_frq(f/100),', '.join([t.name[i] for i in rows]))
+	else:
+		for i in q.order_by('frq').rows():
+			print '%s\t%s\t%s' % (units_to_frq(t.frq[i]/100),mod_values[t.mod[i]],t.name[i])
@@ -0,0 +1,403 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#
+# Uniden Scanner Python API
+# Copyright (C) 2014-2015 Anton Komarov
+#
+# This program is free software; you can redistribute it and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with this program;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import sys
+import time
+import array
+import struct
+import logging
+import argparse
+from uniden import *
+
+# create logger
+module_logger = logging.getLogger('uniden_api.sweep')
+
+# .npy dtype of array typecodes used here
+npy_descr={'B':'|u1', 'H':'<u2', 'l':'<i%d' % array.array('l').itemsize, 'd':'<f8'}
+
+def frequencies(ranges):
+
+	"""Returns array of frequencies in 100 Hz units of (start, stop, step) ranges in
+	MHz, stop included. Overlapping frequencies of adjacent ranges are kept once.
+	Integer math in 10 Hz units, so steps like 6.25 kHz do not drift."""
+
+	frqs=array.array('l')
+	seen=set()
+
+	for (start,stop,step) in ranges:
+		(start,stop)=(frq_to_units(start)*10,frq_to_units(stop)*10)
+		step=int(round(float(step)*100000))
+		if step <= 0: raise ValueError('step must be positive')
+		for i in range(0,(stop-start)/step+1):
+			f=(start+i*step+5)/10
+			if f not in seen:
+				frqs.append(f)
+				seen.add(f)
+
+	return frqs
+
+def band_steps(scanner):
+
+	"""Returns sorted search steps (MHz) of scanner default band coverage (DBC),
+	empty tuple if it cannot be read."""
+
+	if not scanner.default_band_coverage and not scanner.get_default_band_coverage(): return ()
+
+	# DBC step is in 10 Hz units
+	return tuple(sorted(set([int(b['step'])/100000.0 for b in scanner.default_band_coverage[1:]])))
+
+def legal_step(step, steps):
+
+	"""Returns step (MHz) of steps nearest to given one, step itself if steps is empty."""
+
+	if not steps: return float(step)
+
+	return min(steps,key=lambda s: abs(s-float(step)))
+
+def median(l):
+
+	l=sorted(l)
+	if not l: return 0
+
+	return l[len(l)/2]
+
+def write_npy(f, typecode, shape, data):
+
+	"""Writes array data as .npy format version 1.0 file, no numpy needed."""
+
+	header="{'descr': '%s', 'fortran_order': False, 'shape': %s, }" % (npy_descr[typecode],
+		str(tuple([int(n) for n in shape])))
+	# magic, version and header length take 10 bytes, header is padded with spaces
+	# and ends with newline so that data starts at multiple of 16
+	header=header+' '*(15-(10+len(header))%16)+'\n'
+
+	f.write('\x93NUMPY\x01\x00')
+	f.write(struct.pack('<H',len(header)))
+	f.write(header)
+
+	if sys.byteorder <> 'little' and data.itemsize > 1:
+		data=array.array(data.typecode,data)
+		data.byteswap()
+
+	data.tofile(f)
+
+class Sweep:
+
+	"""RSSI sweep of frequency ranges by QSC.
+	QSC commands are built once, a sweep sends them pipelined by raw_batch() with
+	window > 1. Results of last sweep are in rssi and sql arrays, parallel to frqs
+	(100 Hz units). Every sweep is also stored as a row of waterfall ring buffer
+	of depth rows and added to peak hold and average.
+	frqs (100 Hz units) can be given instead of ranges."""
+
+	def __init__(self, scanner, ranges, mod='AUTO', att=0, dly=0, window=None, depth=64, frqs=None):
+
+		self.logger = logging.getLogger('uniden_api.Sweep')
+
+		if mod not in mod_values: raise ModulationError
+
+		self.scanner=scanner
+		self.window=window
+		if frqs is None: self.frqs=frequencies(ranges)
+		else: self.frqs=array.array('l',frqs)
+
+		# code search, broadcast screen, repeater find and AGC off, P25 waiting 200 ms
+		tail=[mod,att,dly,0,'0'*16,0,0,0,200]
+		self.cmds=[codec.encode_values('QSC',[str(f).rjust(8,'0')]+tail) for f in self.frqs]
+
+		n=len(self.frqs)
+		self.depth=depth
+		self.rssi=array.array('H',[0])*n
+		self.sql=array.array('B',[0])*n
+		self.peak=array.array('H',[0])*n
+		self.total=array.array('d',[0.0])*n
+		self.waterfall=array.array('H',[0])*(n*depth)
+		self.row_times=array.array('d',[0.0])*depth
+		self.sweeps=0
+		self.sweep_time=0.0
+
+	def __len__(self):
+
+		return len(self.frqs)
+
+	def run(self):
+
+		"""Makes one sweep, returns 1 or 0 if any QSC failed."""
+
+		n=len(self.frqs)
+		start=time.time()
+
+		try:
+			if self.window is None or self.window > 1:
+				res=self.scanner.raw_batch(self.cmds,self.window)
+			else:
+				res=[self.scanner.raw(cmd) for cmd in self.cmds]
+
+		except CommandError, e:
+			self.logger.error('run(): %s' % str(e))
+			return 0
+
+		rssi=self.rssi
+		sql=self.sql
+		decode=codec.decoders['QSC']
+		for i in range(0,n):
+			(r,frq,s)=decode(res[i])
+			rssi[i]=int(r)
+			sql[i]=s == '1'
+
+		self.add(rssi,start)
+		self.sweep_time=time.time()-start
+
+		return 1
+
+	def add(self, rssi, t):
+
+		"""Adds sweep result to waterfall, peak hold and average."""
+
+		n=len(rssi)
+		row=self.sweeps%self.depth
+		self.waterfall[row*n:(row+1)*n]=rssi
+		self.row_times[row]=t
+
+		peak=self.peak
+		total=self.total
+		for i in range(0,n):
+			if rssi[i] > peak[i]: peak[i]=rssi[i]
+			total[i]+=rssi[i]
+
+		self.sweeps+=1
+
+	def run_many(self, count=None, interval=0.0):
+
+		"""Generator making count sweeps (forever with None), yields sweep number."""
+
+		k=0
+
+		while count is None or k < count:
+			start=time.time()
+			if not self.run(): return
+			yield self.sweeps
+			k+=1
+			delay=interval-(time.time()-start)
+			if delay > 0: time.sleep(delay)
+
+	def average(self):
+
+		"""Returns average RSSI of all sweeps."""
+
+		if not self.sweeps: return array.array('d',self.total)
+
+		k=float(self.sweeps)
+
+		return array.array('d',[v/k for v in self.total])
+
+	def reset(self):
+
+		"""Drops waterfall, peak hold and average."""
+
+		n=len(self.frqs)
+		self.peak=array.array('H',[0])*n
+		self.total=array.array('d',[0.0])*n
+		self.waterfall=array.array('H',[0])*(n*self.depth)
+		self.row_times=array.array('d',[0.0])*self.depth
+		self.sweeps=0
+
+	def rows(self):
+
+		"""Returns waterfall rows in time order, oldest first, as one array."""
+
+		n=len(self.frqs)
+		k=min(self.sweeps,self.depth)
+		first=(self.sweeps-k)%self.depth
+		w=self.waterfall
+
+		if first+k <= self.depth: return w[first*n:(first+k)*n]
+
+		return w[first*n:]+w[:(first+k-self.depth)*n]
+
+	def save_npy(self, fname, what='waterfall'):
+
+		"""Saves waterfall (rows x frequencies), peak, average, rssi, sql or frqs
+		as .npy file."""
+
+		n=len(self.frqs)
+
+		if what == 'waterfall':
+			data=self.rows()
+			shape=(len(data)/n if n else 0,n)
+		elif what == 'average':
+			data=self.average()
+			shape=(n,)
+		else:
+			data=getattr(self,what)
+			shape=(n,)
+
+		f=open(fname,'wb')
+		try: write_npy(f,data.typecode,shape,data)
+		finally: f.close()
+
+		return 1
+
+	def save_csv(self, fname):
+
+		"""Saves frequency (MHz), last RSSI and squelch, peak and average as CSV file."""
+
+		avg=self.average()
+
+		f=open(fname,'w')
+		try:
+			f.write('frq,rssi,sql,peak,average\n')
+			for i in range(0,len(self.frqs)):
+				f.write('%s,%d,%d,%d,%.1f\n' % (units_to_frq(self.frqs[i]),self.rssi[i],
+					self.sql[i],self.peak[i],avg[i]))
+
+		finally: f.close()
+
+		return 1
+
+class AdaptiveSweep:
+
+	"""Coarse pass then refine around RSSI peaks.
+	Ranges are (start, stop) in MHz. Coarse pass uses factor times the fine step,
+	noise floor is median of coarse RSSI, coarse points at least threshold above
+	it (or with squelch open) are candidates. Neighbourhood of a candidate, one
+	coarse step each side, is swept again at the fine step. Fine step is snapped
+	to nearest step of scanner default band coverage (DBC)."""
+
+	def __init__(self, scanner, ranges, fine_step=0.00625, factor=4, threshold=40,
+			mod='AUTO', att=0, dly=0, window=None, steps=None):
+
+		self.logger = logging.getLogger('uniden_api.AdaptiveSweep')
+
+		if steps is None: steps=band_steps(scanner)
+
+		self.scanner=scanner
+		self.fine_step=legal_step(fine_step,steps)
+		self.coarse_step=self.fine_step*factor
+		self.threshold=threshold
+		self.window=window
+		self.args=(mod,att,dly,window)
+		self.ranges=[(start,stop) for (start,stop) in ranges]
+		self.coarse=Sweep(scanner,[(a,b,self.coarse_step) for (a,b) in self.ranges],mod,att,dly,window,1)
+		self.fine=None
+		self.noise_floor=0
+		self.peaks=[]
+		self.report={}
+
+	def neighbourhoods(self, candidates):
+
+		"""Returns merged (start, stop) fine sweep ranges in 100 Hz units around candidates,
+		clipped to sweep ranges."""
+
+		c=frq_to_units(self.coarse_step)
+		bounds=[(frq_to_units(a),frq_to_units(b)) for (a,b) in self.ranges]
+		l=[]
+
+		for f in sorted(candidates):
+			(lo,hi)=(f-c,f+c)
+			for (a,b) in bounds:
+				if a <= f <= b: (lo,hi)=(max(lo,a),min(hi,b))
+			if l and lo <= l[-1][1]: l[-1][1]=max(l[-1][1],hi)
+			else: l.append([lo,hi])
+
+		return l
+
+	def run(self):
+
+		"""Makes coarse and fine pass, sets peaks to list of (frequency in MHz, RSSI)
+		of strongest fine frequency of each neighbourhood. Returns 1 or 0 on error."""
+
+		start=time.time()
+
+		if not self.coarse.run(): return 0
+		coarse_time=time.time()-start
+
+		c=self.coarse
+		self.noise_floor=median(c.rssi)
+		level=self.noise_floor+self.threshold
+		candidates=[c.frqs[i] for i in range(0,len(c)) if c.rssi[i] >= level or c.sql[i]]
+
+		fine_step=self.fine_step
+		frqs=[]
+		areas=[]
+		for (lo,hi) in self.neighbourhoods(candidates):
+			l=frequencies([(units_to_frq(lo),units_to_frq(hi),fine_step)])
+			areas.append((len(frqs),len(frqs)+len(l)))
+			frqs.extend(l)
+
+		(mod,att,dly,window)=self.args
+		self.fine=Sweep(self.scanner,(),mod,att,dly,window,1,frqs)
+		if frqs and not self.fine.run(): return 0
+
+		f=self.fine
+		self.peaks=[]
+		for (a,b) in areas:
+			i=max(range(a,b),key=lambda i: f.rssi[i])
+			self.peaks.append((units_to_frq(f.frqs[i]),f.rssi[i]))
+
+		elapsed=time.time()-start
+
+		# full fine sweep time estimated from average QSC round trip of this run
+		sent=len(c)+len(f)
+		full=len(frequencies([(a,b,fine_step) for (a,b) in self.ranges]))
+		full_time=full*elapsed/sent
+
+		self.report={'coarse':len(c), 'fine':len(f), 'commands':sent, 'full':full,
+			'coarse_time':coarse_time, 'time':elapsed, 'full_time':full_time,
+			'saved':full_time-elapsed, 'noise_floor':self.noise_floor,
+			'candidates':len(candidates), 'peaks':len(self.peaks)}
+
+		return 1
+
+if __name__ == "__main__":
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--dev', type=str, default='/dev/ttyUSB0')
+	parser.add_argument('--speed', type=str, default='115200')
+	parser.add_argument('--range', type=str, action='append', required=True,
+		help='start:stop:step in MHz, may repeat, step is fine step with --adaptive')
+	parser.add_argument('--adaptive', action='store_true', help='coarse pass, then refine peaks')
+	parser.add_argument('--factor', type=int, default=4, help='coarse step in fine steps')
+	parser.add_argument('--threshold', type=int, default=40, help='RSSI above noise floor')
+	parser.add_argument('--mod', type=str, default='AUTO')
+	parser.add_argument('--count', type=int, default=1, help='number of sweeps')
+	parser.add_argument('--window', type=int, default=None, help='pipeline window')
+	parser.add_argument('--depth', type=int, default=64, help='waterfall rows')
+	parser.add_argument('--npy', type=str, help='save waterfall as .npy')
+	parser.add_argument('--csv', type=str, help='save last sweep, peak and average as CSV')
+	args=parser.parse_args()
+
+	s=UnidenScanner(args.dev,args.speed)
+	ranges=[r.split(':') for r in args.range]
+
+	if args.adaptive:
+		a=AdaptiveSweep(s,[r[:2] for r in ranges],float(ranges[0][2]),args.factor,
+			args.threshold,args.mod,window=args.window)
+		if not a.run(): sys.exit(1)
+		for (frq,rssi) in a.peaks: print ('%s\t%d') % (frq,rssi)
+		r=a.report
+		print ('Noise floor:\t%d') % r['noise_floor']
+		print ('Commands:\t%d coarse, %d fine, %d full sweep') % (r['coarse'],r['fine'],r['full'])
+		print ('Time:\t\t%.3f s, full sweep %.3f s, saved %.3f s') % (r['time'],r['full_time'],r['saved'])
+		sys.exit(0)
+
+	w=Sweep(s,ranges,args.mod,window=args.window,depth=args.depth)
+
+	for k in w.run_many(args.count):
+		print ('Sweep %d:\t%d frequencies in %.3f s') % (k,len(w),w.sweep_time)
+
+	if args.npy: w.save_npy(args.npy)
+	if args.csv: w.save_csv(args.csv)
@@ -0,0 +1,336 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#
+# Uniden Scanner Python API
+# Copyright (C) 2014-2015 Anton Komarov
+#
+# This program is free software; you can redistribute it and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with this program;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import array
+import bisect
+import logging
+import operator
+import argparse
+from uniden import *
+
+# create logger
+module_logger = logging.getLogger('uniden_api.table')
+
+# row kinds
+CHANNEL=0
+TGID=1
+
+# numeric columns and their array typecodes
+columns=(('kind','B'), ('frq','l'), ('mod','B'), ('dcs','H'), ('lout','B'), ('pri','B'),
+	('sys_index','l'), ('grp_index','l'), ('chn_index','l'), ('number_tag','h'))
+
+def to_int(value, none=-1):
+
+	"""Returns integer of scanner field, none if empty, NONE or not a number."""
+
+	try: return int(value)
+	except (TypeError, ValueError): return none
+
+def row_values(o):
+
+	"""Returns column values of Channel or TalkGroupID as tuple in columns order."""
+
+	if isinstance(o,Channel):
+		(kind,frq,mod,dcs)=(CHANNEL,frq_to_hz(o.frq) if o.frq else 0,mod_values.index(o.mod)
+			if o.mod in mod_values else 0,to_int(o.dcs,0))
+	else:
+		(kind,frq,mod,dcs)=(TGID,0,0,0)
+
+	return (kind,frq,mod,dcs,to_int(o.lout,0),to_int(o.pri,0),to_int(o.sys_index),
+		to_int(o.grp_index),to_int(o.chn_index),to_int(o.number_tag))
+
+class ChannelTable:
+
+	"""Columnar view of all channels and TGIDs of scanner objects.
+	Every row is one record, numeric columns are arrays (frq in Hz, mod as index
+	of mod_values, CTCSS/DCS code, lockout, priority, indexes and number tag,
+	-1 for none), names and TGIDs are lists. Filters return bytearray masks with
+	one byte per row, combined by and_(), or_() and not_(). Deleted rows stay
+	in place and are cleared in alive mask, which every filter applies.
+	With scanner, table is built of its systems and attaches itself to scanner,
+	rows are then kept up to date like ScanIndex (see index.py).
+
+	t=ChannelTable(scanner.systems)
+	m=t.and_(t.eq('lout',1),t.between('frq',150000000,174000000))
+	for o in t.records(m): print o.name"""
+
+	def __init__(self, systems=None, scanner=None):
+
+		self.logger = logging.getLogger('uniden_api.ChannelTable')
+
+		for (name,typecode) in columns: setattr(self,name,array.array(typecode))
+		self.name=[]
+		self.tgid=[]
+		self.objects=[]
+		self.alive=bytearray()
+		self.rows={}
+		self.chn_rows={}
+		# TableIndexes of query.py, updated with every row change
+		self.indexes=None
+		self.scanner=None
+
+		if scanner is not None:
+			self.scanner=scanner
+			scanner.table=self
+			if systems is None: systems=scanner.systems
+
+		if systems is not None: self.build(systems)
+
+	def detach(self):
+
+		if getattr(self.scanner,'table',None) is self: self.scanner.table=None
+
+	def __len__(self):
+
+		return len(self.objects)
+
+	def build(self, systems):
+
+		"""Adds rows of all channels and TGIDs of systems (dictionary or list).
+		Lazily read systems and groups are fetched."""
+
+		if isinstance(systems,dict): systems=systems.values()
+
+		for s in systems:
+			for g in s.groups.values():
+				for o in g.channels.values(): self.add(o)
+				for o in g.tgids.values(): self.add(o)
+
+		return len(self)
+
+	def add(self, o):
+
+		"""Appends row of record, returns row number. Record already in table is
+		refreshed, row of other record with the same memory index (record read
+		again) is removed."""
+
+		if id(o) in self.rows: return self.refresh(o)
+
+		n=self.chn_rows.get(o.chn_index)
+		if n is not None: self.remove(self.objects[n])
+
+		n=len(self.objects)
+		for ((name,typecode),v) in zip(columns,row_values(o)): getattr(self,name).append(v)
+		self.name.append(o.name)
+		self.tgid.append(getattr(o,'tgid',''))
+		self.objects.append(o)
+		self.alive.append(1)
+		self.rows[id(o)]=n
+		self.chn_rows[o.chn_index]=n
+		if self.indexes is not None: self.indexes.add_row(n)
+
+		return n
+
+	def refresh(self, o):
+
+		"""Updates row of changed record, adds it if not in table yet."""
+
+		n=self.rows.get(id(o))
+		if n is None: return self.add(o)
+
+		if self.indexes is not None: self.indexes.remove_row(n)
+		for ((name,typecode),v) in zip(columns,row_values(o)): getattr(self,name)[n]=v
+		self.name[n]=o.name
+		self.tgid[n]=getattr(o,'tgid','')
+		if self.indexes is not None: self.indexes.add_row(n)
+
+		return n
+
+	def remove(self, o):
+
+		"""Clears row of deleted record in alive mask."""
+
+		n=self.rows.pop(id(o),None)
+		if n is None: return 0
+
+		if self.chn_rows.get(o.chn_index) == n: del self.chn_rows[o.chn_index]
+		if self.indexes is not None: self.indexes.remove_row(n)
+		self.alive[n]=0
+		self.objects[n]=None
+
+		return 1
+
+	def remove_rows(self, column, value):
+
+		"""Removes live rows with column equal to value, returns their number."""
+
+		col=getattr(self,column)
+		l=[self.objects[i] for i in xrange(0,len(col)) if col[i] == value and self.alive[i]]
+		for o in l: self.remove(o)
+
+		return len(l)
+
+	# scanner maintenance, called like ScanIndex methods
+
+	def remove_group(self, g):
+
+		self.remove_rows('grp_index',to_int(g.grp_index))
+
+	def remove_system(self, s):
+
+		self.remove_rows('sys_index',to_int(s.sys_index))
+
+	def add_system(self, s):
+
+		"""Systems have no rows, nothing to update."""
+
+		pass
+
+	# masks
+
+	def mask(self, values):
+
+		"""Returns mask of iterable of truth values, dead rows cleared."""
+
+		return self.and_(bytearray([1 if v else 0 for v in values]),self.alive)
+
+	def and_(self, a, *masks):
+
+		for b in masks: a=bytearray(map(operator.and_,a,b))
+
+		return a
+
+	def or_(self, a, *masks):
+
+		for b in masks: a=bytearray(map(operator.or_,a,b))
+
+		return self.and_(a,self.alive)
+
+	def not_(self, a):
+
+		return self.and_(bytearray([1-v for v in a]),self.alive)
+
+	def eq(self, column, value):
+
+		"""Returns mask of rows with column equal to value."""
+
+		return self.mask([v == value for v in getattr(self,column)])
+
+	def isin(self, column, values):
+
+		"""Returns mask of rows with column value in values."""
+
+		values=set(values)
+
+		return self.mask([v in values for v in getattr(self,column)])
+
+	def between(self, column, lo, hi):
+
+		"""Returns mask of rows with lo <= column value <= hi."""
+
+		return self.mask([lo <= v <= hi for v in getattr(self,column)])
+
+	def where(self, func, column):
+
+		"""Returns mask of rows for which func(column value) is true."""
+
+		return self.mask([func(v) for v in getattr(self,column)])
+
+	# results
+
+	def select(self, mask=None):
+
+		"""Returns row numbers set in mask, all live rows without it."""
+
+		if mask is None: mask=self.alive
+
+		return [i for i in xrange(0,len(mask)) if mask[i]]
+
+	def count(self, mask=None):
+
+		if mask is None: mask=self.alive
+
+		return mask.count('\x01')
+
+	def records(self, mask=None):
+
+		"""Returns records of rows set in mask."""
+
+		return [self.objects[i] for i in self.select(mask)]
+
+	def frequencies(self, mask=None):
+
+		"""Returns MHz strings of frequencies of rows set in mask, empty for TGIDs."""
+
+		frq=self.frq
+		rows=self.select(mask)
+		l=frqs_from_scanner([frq[i]/100 for i in rows])
+
+		return [l[k] if frq[rows[k]] else '' for k in range(0,len(rows))]
+
+	def group_by(self, column, mask=None):
+
+		"""Returns dictionary of column value to list of row numbers."""
+
+		col=getattr(self,column)
+		d={}
+
+		for i in self.select(mask): d.setdefault(col[i],[]).append(i)
+
+		return d
+
+	def counts(self, column, mask=None):
+
+		"""Returns dictionary of column value to number of rows."""
+
+		col=getattr(self,column)
+		d={}
+
+		for i in self.select(mask): d[col[i]]=d.get(col[i],0)+1
+
+		return d
+
+	def histogram(self, column, edges, mask=None):
+
+		"""Returns row counts of column value between sorted edges, count i is for
+		edges[i] <= value < edges[i+1], values outside edges are not counted."""
+
+		col=getattr(self,column)
+		h=[0]*(len(edges)-1)
+
+		for i in self.select(mask):
+			k=bisect.bisect_right(edges,col[i])-1
+			if 0 <= k < len(h): h[k]+=1
+
+		return h
+
+	def overlaps(self, mask=None):
+
+		"""Returns dictionary of channel frequency (Hz) programmed more than once to
+		row numbers."""
+
+		if mask is None: mask=self.eq('kind',CHANNEL)
+		else: mask=self.and_(mask,self.eq('kind',CHANNEL))
+
+		return dict([(f,l) for (f,l) in self.group_by('frq',mask).items() if len(l) > 1])
+
+if __name__ == "__main__":
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--dev', type=str, default='/dev/ttyUSB0')
+	parser.add_argument('--speed', type=str, default='115200')
+	args=parser.parse_args()
+
+	s=UnidenScanner(args.dev,args.speed)
+	if not s.get_scan_settings(): print "get_scan_settings() returned 0"
+
+	t=ChannelTable(s.systems)
+	print ('Rows:\t\t\t%d (%d channels, %d TGIDs)') % (len(t),t.count(t.eq('kind',CHANNEL)),
+		t.count(t.eq('kind',TGID)))
+	print ('Locked out:\t\t%d') % t.count(t.eq('lout',1))
+	print ('Duplicate frequencies:\t%d') % len(t.overlaps())
+	for (mod,n) in sorted(t.counts('mod',t.eq('kind',CHANNEL)).items()):
+		print ('%s:\t\t\t%d') % (mod_values[mod],n)
@@ -14,11 +14,15 @@
 # You should have received a copy of the GNU General Public License along with this program; 
 # if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
 
-import yaml
 import time
+import array
+import collections
 import serial
 import logging
 from constants import *
+from metrics import CommandMetrics
+from protocol import codec
+import formats
 
 # create logger
 module_logger = logging.getLogger('uniden_api')
@@ -41,37 +45,236 @@ def zero_to_tail(t):
 		
 	return tuple(l)
 
+def frq_to_units(f):
+
+	"""Returns frequency in MHz as integer in scanner 100 Hz units.
+	Strings are converted exactly ('154.415' is 1544150), digits beyond 100 Hz are
+	rounded half up, integers are whole MHz, floats are rounded to 100 Hz first."""
+
+	if isinstance(f,(int,long)): return f*10000
+	if isinstance(f,float): f='%.4f' % f
+
+	(l,dot,r)=str(f).strip().partition('.')
+	r=r.ljust(4,'0')
+	n=int(l or '0')*10000+int(r[:4])
+	if r[4:5] >= '5': n+=1
+
+	return n
+
+def units_to_frq(n):
+
+	"""Returns frequency in scanner 100 Hz units as MHz string with 4 decimals."""
+
+	return '%d.%04d' % divmod(int(n),10000)
+
 def frq_to_scanner(f):
 
-	module_logger.debug('frq_to_scanner(): f=%s' % f)
+	"""Returns frequency in MHz as scanner 8 digit string, empty value as is."""
+
 	if f=='' or f==0: return f
 
-	l,r=str(f).split('.')
-	l=l.rjust(4,'0')
-	r=r.ljust(4,'0')
-	module_logger.debug('frq_to_scanner(): l=%s,r=%s' % (l,r))
-	
-	return ''.join([l,r])
+	return '%08d' % frq_to_units(f)
 
 def frq_from_scanner(f):
 
-	f=str(float(f)/10000)
-	l,r=f.split('.')
-	r=r.ljust(4,'0')
+	"""Returns scanner 8 digit frequency as MHz string with 4 decimals."""
 
-	return '.'.join([l,r])
-	
+	if isinstance(f,str) and len(f) == 8: return '%d.%s' % (int(f[:4]),f[4:])
+
+	return '%d.%04d' % divmod(int(f),10000)
+
+def frq_to_hz(f):
+
+	"""Returns scanner 8 digit frequency in Hz."""
+
+	return int(f)*100
+
+def hz_to_scanner(hz):
+
+	"""Returns frequency in Hz as scanner 8 digit string, rounded to 100 Hz."""
+
+	return '%08d' % ((int(hz)+50)/100)
+
+def frqs_from_scanner(frqs):
+
+	"""Returns list of MHz strings of scanner frequencies (strings or 100 Hz units),
+	bulk frq_from_scanner()."""
+
+	return ['%d.%s' % (int(f[:4]),f[4:]) if isinstance(f,str) and len(f) == 8
+		else '%d.%04d' % divmod(int(f),10000) for f in frqs]
+
+def frqs_to_hz(frqs):
+
+	"""Returns array of Hz of scanner frequencies, bulk frq_to_hz()."""
+
+	return array.array('l',[int(f)*100 for f in frqs])
+
+def parse_rssi_power(res):
+
+	"""Parses PWR response to dictionary."""
+
+	return codec.decode_dict('PWR',res)
+
+def parse_reception_status(res):
+
+	"""Parses GLG response to dictionary.
+	Scanner idle response may be shorter (GLG,,,,,,,,,), missing fields are empty."""
+
+	missing=len(codec.fields('GLG'))-res.count(',')
+	if missing > 0: res=res+','*missing
+
+	return codec.decode_dict('GLG',res)
+
+def parse_current_status(res):
+
+	"""Parses STS response to dictionary."""
+
+	l=res.split(",")
+	n=len(l[1])
+
+	cm=l[2:n*2+1]
+	while (len(cm)<17): cm.append('')
+
+	dict={'dsp_form':l[0], 'char': tuple(cm[0::2]), 'mode': tuple(cm[1::2]), 
+		'sql':l[-9], 'mut':l[-8], 'bat':l[-7], 'wat':l[-6], 'rsv1':l[-5],
+		'rsv2':l[-4], 'sig_lvl':l[-3], 'bk_color':l[-2], 'bk_dimmer':l[-1]}
+
+	return dict
+
+# names of __slots__ of record classes and their bases, by class
+record_slots={}
+
+def slot_names(cls):
+
+	"""Returns names of __slots__ of class and its bases."""
+
+	names=record_slots.get(cls)
+
+	if names is None:
+		names=[]
+		for c in cls.__mro__:
+			for n in c.__dict__.get('__slots__',()):
+				if n not in names: names.append(n)
+		record_slots[cls]=names
+
+	return names
+
+class Record(object):
+
+	"""Base of objects holding scanner data.
+	Pickled without scanner and logger, scanner is None after unpickling
+	and must be set again by the caller. Leaf records use __slots__ and class
+	logger, the others keep instance __dict__ and logger."""
+
+	__slots__=()
+
+	def __getstate__(self):
+
+		d={}
+		if hasattr(self,'__dict__'): d.update(self.__dict__)
+		for n in slot_names(self.__class__):
+			if hasattr(self,n): d[n]=getattr(self,n)
+		d.pop('scanner',None)
+		d.pop('logger',None)
+
+		return d
+
+	def __setstate__(self, d):
+
+		for (k,v) in d.items(): setattr(self,k,v)
+		self.scanner=None
+		if hasattr(self,'__dict__'):
+			self.logger=logging.getLogger('uniden_api.%s' % self.__class__.__name__)
+
+def lazy_property(name):
+
+	"""Returns property of attribute fetched from scanner by fetch() on first access,
+	while object unfetched flag is set. Value is kept in _name attribute.
+	Raises FetchError if fetch fails, object stays unfetched and next access
+	tries again."""
+
+	attr='_'+name
+
+	def check(self):
+		if self.unfetched and not self.fetch():
+			raise FetchError('%s %s: fetch failed' % (self.__class__.__name__,name))
+
+	def get(self):
+		check(self)
+		return getattr(self,attr)
+
+	def set(self, value):
+		check(self)
+		setattr(self,attr,value)
+
+	return property(get,set)
+
+class SyncedRecord(Record):
+
+	"""Dirty tracking for objects mirroring scanner memory records.
+	Subclasses return their own set commands from set_cmds(). Snapshot of those
+	commands is taken whenever the object is read from or written to the scanner,
+	a record whose command differs from the snapshot is dirty. New objects have
+	empty snapshot, so all their records are dirty."""
+
+	__slots__=()
+
+	synced=()
+
+	def set_cmds(self):
+
+		"""Returns tuple of set commands of the object own records."""
+
+		return ()
+
+	def dirty_cmds(self):
+
+		"""Returns list of set commands changed since last sync."""
+
+		return [c for c in self.set_cmds() if c not in self.synced]
+
+	def is_dirty(self):
+
+		"""Returns True if any own record changed since last sync."""
+
+		return len(self.dirty_cmds()) > 0
 
-class UnidenScanner:
+	def mark_synced(self):
+
+		"""Marks current object data as equal to scanner memory."""
+
+		self.synced=self.set_cmds()
+
+	def indexed(self, method):
+
+		"""Calls method of scanner index (see index.py) and channel table
+		(see table.py) with the object, if they are attached to scanner."""
+
+		for name in ('index','table'):
+			index=getattr(self.scanner,name,None)
+			if index is not None: getattr(index,method)(self)
+
+class UnidenScanner(SyncedRecord):
 
 	err_list=('NG','ORER','FER','ERR','')
 
-	def __init__(self, port, speed="115200"):
+	# commands which change scanner mode or memory layout, never pipelined.
+	# LOI and ULI only change lockout lists, GLI and SLI walking them are barriers.
+	order_sensitive=('PRG','EPG','CSY','DSY','AGC','AGT','ACC','ACT','AST',
+			'DGR','DCH','COM','KEY','GLI','SLI','GLF','LOF','ULF')
+
+	def __init__(self, port, speed="115200", timeout=1.0, window=1):
 
 		self.logger = logging.getLogger('uniden_api.UnidenScanner')
 		self.logger.info('initialiazing with port=%(port)s and speed=%(speed)s' % locals())		
 
 		self.serial=None
+		self.timeout=timeout
+		self.pipeline_window=window
+		self.rx_buffer=''
+		self.metrics=None
+		self.index=None
+		self.table=None
 		self.model=None
 		self.version=None
 		self.isProgramMode=False
@@ -92,10 +295,13 @@ class UnidenScanner:
 
 	def open(self, port, speed):
 
-		"""Open scanner method, accepts port and speed, timeout is set for 100ms"""
+		"""Open scanner method, accepts port and speed.
+		Port read timeout is set for 100ms, it only bounds a single wait for the next
+		byte, response deadline is handled by read_response()."""
 		
 		try:
 			self.serial=serial.Serial(port,speed,timeout=0.1)
+			self.rx_buffer=''
 
 		except serial.SerialException:
 			self.logger.error('Error opening serial port %s!' % port)
@@ -110,17 +316,113 @@ class UnidenScanner:
 		self.close()
 
 
-	def raw(self, cmd):
+	def read_response(self, timeout=None):
 
-		"""Wrapper for raw scanner command"""
+		"""Reads one response frame from scanner.
+		Returns as soon as the \\r terminator arrives, '' if the deadline (scanner
+		timeout by default) expires first. Bytes of an unterminated frame are kept
+		in rx_buffer, resync() discards them."""
 
-		f2='OK'
+		if timeout is None: timeout=self.timeout
+
+		deadline=time.time()+timeout
+		buf=self.rx_buffer
+
+		while '\r' not in buf:
+			if time.time() >= deadline:
+				self.rx_buffer=buf
+				return ''
+			buf=''.join([buf,self.serial.read(self.serial.inWaiting() or 1)])
+
+		(res,sep,self.rx_buffer) = buf.partition('\r')
+
+		return res
+
+	def read_reply(self, cmd, timeout=None):
+
+		"""Reads response to cmd. Responses not echoing cmd mnemonic (late replies
+		to timed out commands) are discarded. Returns '' on timeout."""
+
+		name=cmd.split(',',1)[0]
+
+		while True:
+			res=self.read_response(timeout)
+			if not res or res in self.err_list or res.split(',',1)[0] == name: return res
+			self.logger.warning('read_reply(): cmd %s discarding res %s' % (cmd,res))
+
+	def resync(self, quiet=None):
+
+		"""Discards received data until nothing arrives for quiet seconds (scanner
+		timeout by default), so late replies are not taken as responses to next
+		commands."""
+
+		if quiet is None: quiet=self.timeout
+
+		self.rx_buffer=''
+		deadline=time.time()+quiet
+
+		while time.time() < deadline:
+			n=self.serial.inWaiting()
+			if n:
+				self.serial.read(n)
+				deadline=time.time()+quiet
+			else:
+				time.sleep(0.01)
+
+	def raw(self, cmd, timeout=None):
+
+		"""Wrapper for raw scanner command"""
 
 		self.logger.debug('raw(): cmd %s' % cmd)
+
+		if self.metrics is not None: start=time.time()
+
 		self.serial.write("".join([cmd,'\r']))
 
-		res = (self.serial.readall()).strip('\r')
+		res = self.read_reply(cmd,timeout)
 		self.logger.debug('raw(): res %s' % res)
+		if not res: self.resync(timeout)
+
+		if self.metrics is not None: self.record_metrics(cmd,res,start)
+
+		return self.check_response(res)
+
+	def attach_metrics(self, collector=None):
+
+		"""Attaches metrics collector to scanner, every raw command is recorded to it.
+		Creates CommandMetrics collector if none given, returns attached collector.
+		Use detach_metrics() to remove it."""
+
+		if collector is None: collector=CommandMetrics()
+		self.metrics=collector
+
+		return collector
+
+	def detach_metrics(self):
+
+		"""Detaches metrics collector, returns detached collector."""
+
+		(collector,self.metrics)=(self.metrics,None)
+
+		return collector
+
+	def record_metrics(self, cmd, res, start):
+
+		"""Records command round trip to attached metrics collector."""
+
+		error=False
+		try:
+			self.check_response(res)
+		except CommandError:
+			error=True
+
+		self.metrics.record(cmd.split(',',1)[0],time.time()-start,len(cmd)+1,len(res)+1,error)
+
+	def check_response(self, res):
+
+		"""Raises CommandError if response is an error, returns response otherwise."""
+
+		f2='OK'
 
 		if res.count(',') == 1: 
 			f2=res.split(',')[1]
@@ -132,6 +434,61 @@ class UnidenScanner:
 		else:
 			return res
 
+	def raw_batch(self, cmds, window=None, timeout=None):
+
+		"""Sends list of raw commands keeping up to window commands in flight.
+		Responses are matched to commands in FIFO order and returned as list.
+		Window falls back to 1 for order sensitive commands (see order_sensitive).
+		Default window is scanner pipeline_window, window=1 is plain raw() loop.
+		All responses are read even if some command fails, then CommandError
+		is raised for the first failed command. Responses echoing other mnemonic
+		are discarded. After a timeout responses of commands still in flight can
+		not be told apart from the late reply, they fail and input is resynced."""
+
+		if window is None: window=self.pipeline_window
+
+		results=[]
+		failed=[]
+		inflight=collections.deque()
+
+		def drain(n):
+
+			while len(inflight) > n:
+				(cmd,start)=inflight.popleft()
+				res=self.read_reply(cmd,timeout)
+				self.logger.debug('raw_batch(): cmd %s res %s' % (cmd,res))
+				if self.metrics is not None: self.record_metrics(cmd,res,start)
+				try:
+					results.append(self.check_response(res))
+				except CommandError:
+					failed.append(cmd)
+					results.append(None)
+
+				if not res:
+					while inflight:
+						failed.append(inflight.popleft()[0])
+						results.append(None)
+					self.resync(timeout)
+
+		for cmd in cmds:
+
+			barrier = cmd.split(',',1)[0] in self.order_sensitive
+
+			if barrier: drain(0)
+			else: drain(max(window,1)-1)
+
+			self.serial.write("".join([cmd,'\r']))
+			inflight.append((cmd,time.time()))
+
+			if barrier: drain(0)
+
+		drain(0)
+
+		if failed:
+			raise CommandError(failed[0])
+
+		return results
+
 	def get_model(self):
 
 		"""Returns Model Information."""
@@ -176,8 +533,7 @@ class UnidenScanner:
 			self.logger.error('get_rssi_power()')
 			return 0
 
-		(cmd,rssi,frq)=res.split(",")
-		dict={'rssi':rssi, 'frq':frq}
+		dict=parse_rssi_power(res)
 
 		return dict
 
@@ -207,13 +563,7 @@ class UnidenScanner:
 			self.logger.error('get_reception_status()')
 			return 0
 
-		(cmd,frq_tgid,mod,att,ctcss_dcs,name1,name2,name3,
-	 	sql,mut,sys_tag,chan_tag,p25nac)=res.split(",")
-
-		dict={'frq_tgid':frq_tgid, 'mod':mod, 'att':att,
-			'ctcss_dcs':ctcss_dcs, 'name1':name1, 'name2':name2, 
-			'name3':name3, 'sql':sql, 'mute':mut, 'sys_tag':sys_tag,
-			'chan_tag':chan_tag, 'p25nac':p25nac}
+		dict=parse_reception_status(res)
 			
 		return dict
 
@@ -240,15 +590,7 @@ class UnidenScanner:
 			self.logger.error('get_current_status()')
 			return 0
 
-		l=res.split(",")
-		n=len(l[1])
-
-		cm=l[2:n*2+1]
-		while (len(cm)<17): cm.append('')
-
-		dict={'dsp_form':l[0], 'char': tuple(cm[0::2]), 'mode': tuple(cm[1::2]), 
-			'sql':l[-9], 'mut':l[-8], 'bat':l[-7], 'wat':l[-6], 'rsv1':l[-5],
-			'rsv2':l[-4], 'sig_lvl':l[-3], 'bk_color':l[-2], 'bk_dimmer':l[-1]}
+		dict=parse_current_status(res)
 
 		return dict
 
@@ -339,10 +681,7 @@ class UnidenScanner:
 		AGC_DIGITAL	AGC Setting for Digital Audio (0:OFF / 1:ON)
 		P25WAITING	P25 Waiting time (0,100,200,300, .... , 900,1000) ms"""
 
-		rsv=''
-
-		frq=''.join([frq.split('.')[0].rjust(4,'0'),
-			 frq.split('.')[1].ljust(4,'0')])
+		frq=frq_to_scanner(frq)
 
 		if mod not in mod_values:
 			raise ModulationError
@@ -350,8 +689,8 @@ class UnidenScanner:
 		if (len(bsc)<>16 or len(bsc.replace('0','').replace('1',''))):
 			raise BScreenError
 
-		cmd=",".join(['QSH',frq,rsv,mod,str(att),str(dly),rsv,str(code_srch),bsc,str(rep),
-					rsv,str(agc_analog),str(agc_digital),str(p25waiting)])
+		cmd=codec.encode_values('QSH',[frq,mod,att,dly,code_srch,bsc,rep,agc_analog,agc_digital,
+					p25waiting])
 
 		try:
 			res = self.raw(cmd)
@@ -370,10 +709,7 @@ class UnidenScanner:
 		"""Set current frequency and get reception status.
 		see set_quick_search_hold() for vars value descriptions."""
 
-		rsv=''
-
-		frq=''.join([frq.split('.')[0].rjust(4,'0'),
-			 frq.split('.')[1].ljust(4,'0')])
+		frq=frq_to_scanner(frq)
 
 		if mod not in mod_values:
 			raise ModulationError
@@ -381,8 +717,8 @@ class UnidenScanner:
 		if (len(bsc)<>16 or len(bsc.replace('0','').replace('1',''))):
 			raise BScreenError
 
-		cmd=",".join(['QSC',frq,rsv,mod,str(att),str(dly),rsv,str(code_srch),bsc,str(rep),
-					rsv,str(agc_analog),str(agc_digital),str(p25waiting)])
+		cmd=codec.encode_values('QSC',[frq,mod,att,dly,code_srch,bsc,rep,agc_analog,agc_digital,
+					p25waiting])
 
 		try:
 			res = self.raw(cmd)
@@ -391,9 +727,7 @@ class UnidenScanner:
 			self.logger.error('set_curfrq_reception_status(): %s' % cmd)
 			return 0
 
-		(cmd,rssi,frq,sql) = res.split(",")
-
-		return (rssi,frq,sql)
+		return tuple(codec.decode('QSC',res))
 
 	def get_volume(self):
 
@@ -589,6 +923,19 @@ class UnidenScanner:
 
 		return 1
 
+	def program_mode_call(self, func, *args):
+
+		"""Calls func in program mode. Enters and exits program mode only
+		if scanner is not in program mode yet. Returns func result."""
+
+		if self.isProgramMode: return func(*args)
+
+		self.enter_program_mode()
+		try: res=func(*args)
+		finally: self.exit_program_mode()
+
+		return res
+
 	def get_free_memory_blocks(self):
 
 		"""Returns the number of idle(free) memory block.
@@ -668,9 +1015,11 @@ class UnidenScanner:
 
 		return 1
 
-	def get_scan_settings(self):
+	def get_scan_settings(self, lazy=False):
 
-		"""Enters program mode and gets scanner scan settings data recursively.""" 
+		"""Enters program mode and gets scanner scan settings data recursively.
+		With lazy only system headers are read, groups and sites of a system and
+		channels or TGIDs of a group are read on first access.""" 
 
 		if not self.isProgramMode: self.enter_program_mode()
 
@@ -690,15 +1039,25 @@ class UnidenScanner:
 		while int(sys_index) <> -1:
 
 			s=System(self,sys_index)
-			s.get_data()
+			s.get_data(lazy)
 			self.systems[sys_index]=s
 			sys_index=s.fwd_index
 
+		if not self.get_quick_lockout(): return 0
+
+		if not self.exit_program_mode(): return 0
+
+		return 1
+
+	def get_quick_lockout(self):
+
+		"""Gets quick system lockout list, scanner must be in program mode."""
+
 		try:
 			res = self.raw('QSL')
 
 		except CommandError:
-			self.logger.error('get_scan_settings(): failed to get quick system lockout list.')
+			self.logger.error('get_quick_lockout(): failed to get quick system lockout list.')
 			return 0
 
 		(qsl,p0,p1,p2,p3,p4,p5,p6,p7,p8,p9) = res.split(',')
@@ -708,74 +1067,102 @@ class UnidenScanner:
 		   tuple(p8),tuple(p9)]
 
 		self.quick_lockout=tuple(map(zero_to_head,l))
-
-		if not self.exit_program_mode(): return 0
+		self.mark_synced()
 
 		return 1
 
-	def set_scan_settings(self):
-
-		"""Enters program mode and sets scan settigns to scanner recursively."""
+	def qsl_cmd(self):
 
-		if not self.isProgramMode: self.enter_program_mode()
+		"""Returns QSL command setting quick system lockout list."""
 
 		l=list(self.quick_lockout)
 		l=(map(zero_to_tail,l))
 		l=[''.join(t) for t in l]
 		pages=','.join(l)
-		cmd=','.join(['QSL',pages])
-	
-		try:
-			res = self.raw(cmd)
 
-		except CommandError:
-			self.logger.error('set_scan_settings(): failed to set quick system lockout list.')
-			return 0
+		return ','.join(['QSL',pages])
+
+	def set_cmds(self):
 
-		for system in self.systems.values(): system.set_data()
+		return (self.qsl_cmd(),)
+
+	def set_scan_settings(self, force=False):
+
+		"""Enters program mode and sets scan settigns to scanner recursively.
+		Only records changed since they were read or last set are sent,
+		force sends all records."""
+
+		if not self.isProgramMode: self.enter_program_mode()
+
+		cmd=self.qsl_cmd()
+
+		if force or self.is_dirty():
+			try:
+				res = self.raw(cmd)
+
+			except CommandError:
+				self.logger.error('set_scan_settings(): failed to set quick system lockout list.')
+				return 0
+
+			self.mark_synced()
+
+		for system in self.systems.values(): system.set_data(force)
 
 		if not self.exit_program_mode(): return 0
 
 		return 1
 
-	def dump_system_settings(self):
+	def dump_system_settings(self, fname=None):
+
+		"""Returns YAML formatted text of scanner settings.
+		With fname writes it to file instead, format by extension (see formats.py)."""
 
-		"""Returns YAML formatted text of scanner settings."""
+		if fname is None: return formats.dumps(self.settings.dump())
 
-		return yaml.dump(self.settings.dump())
+		formats.dump(self.settings.dump(),fname)
+
+		return 1
 
 	def load_system_settings(self,fname):
 
-		"""Load YAML formatted text to memory.
+		"""Load YAML (or JSON, MessagePack by extension) formatted text to memory.
 		It is up to user to set data into scanner.
 		See sample YAML file in examples."""
 
-		settings=yaml.load(file(fname, 'r'))
+		settings=formats.load(fname)
 
 		self.settings.load(**settings)
 
 		return 1
 
-	def dump_scan_settings(self):
+	def dump_scan_settings(self, fname=None):
 
-		"""Returns YAML formatted text of scanner scan settings."""
+		"""Returns YAML formatted text of scanner scan settings.
+		With fname writes it to file instead, format by extension (see formats.py)."""
 
 		systems=[]
 		for i in self.systems: systems.append(self.systems[i].dump())
 
-		s=yaml.dump(systems)
+		if fname is None: return formats.dumps(systems)
 
-		return s
+		formats.dump(systems,fname)
+
+		return 1
 
 	def load_scan_settings(self,fname):
 
-		"""Load YAML formatted text to memory.
+		"""Load YAML (or JSON, MessagePack by extension) formatted text to memory.
 		It is up to user to set data into scanner.
 		See sample YAML file in examples."""
 
-		stream = file(fname, 'r')
-		systems=yaml.load(stream)
-	
+		return self.load_systems(formats.load(fname))
+
+	def load_systems(self, systems):
+
+		"""Loads list of system dictionaries, as read by formats.load() or made by
+		System.dump(), to memory. Dictionaries are not changed, so one parsed file
+		can be loaded to many scanners."""
+
 		for sys in systems:
 
 			try:
@@ -783,13 +1170,104 @@ class UnidenScanner:
 				protected = scanner_onoff[sys['protected']]
 
 			except KeyError:
-				self.logger.error('load_scan_settings(): type or protect flag are missing.')
+				self.logger.error('load_systems(): type or protect flag are missing.')
 				continue
 
 			i=self.create_system(sys_type,protected)
 			if i==0: continue
 			self.systems[i].load(**sys)		
 		
+	def export_scan_settings(self, f, fmt='yaml'):
+
+		"""Writes scan settings to file object f record by record, as YAML documents
+		or JSON Lines (fmt json). Every system, group, site, channel, TGID and trunk
+		frequency is one record, its kind in 'record' key, children follow their parent.
+		Only one record dictionary is built at a time. Returns number of records."""
+
+		write=formats.record_writer(f,fmt)
+		n=0
+
+		for i in self.systems:
+			for r in self.systems[i].records():
+				write(r)
+				n+=1
+
+		return n
+
+	def import_scan_settings(self, f, fmt='yaml', apply=False):
+
+		"""Loads scan settings written by export_scan_settings() from file object f,
+		creating systems and appending groups, sites, channels, TGIDs and trunk
+		frequencies one record at a time. Records of a system that cannot be created
+		are skipped. With apply every system is set to scanner (scanner must be in
+		program mode) as soon as its last record is read. Returns number of systems."""
+
+		# record kind to (parent class, append method, parent dictionary)
+		children={'channel':(Group,'append_channel','channels'),
+			'tgid':(Group,'append_tgid','tgids'),
+			'trunk_frq':(Site,'append_trunk_frq','trunk_frqs')}
+
+		system=None
+		parent=None
+		n=0
+
+		for r in formats.read_records(f,fmt):
+
+			kind=r.pop('record',None)
+
+			if kind == 'system':
+
+				if apply and system is not None: system.set_data()
+				system=None
+				parent=None
+
+				try:
+					sys_type = scanner_sys_type[r['type']]
+					protected = scanner_onoff[r['protected']]
+
+				except KeyError:
+					self.logger.error('import_scan_settings(): type or protect flag are missing.')
+					continue
+
+				i=self.create_system(sys_type,protected)
+				if i==0: continue
+				system=self.systems[i]
+				system.load(**r)
+				n+=1
+
+			elif system is None:
+				continue
+
+			elif kind == 'group':
+				i=system.append_group(r.get('type','C'))
+				if i==0: parent=None
+				else:
+					parent=system.groups[i]
+					parent.load(**r)
+
+			elif kind == 'site':
+				i=system.append_site()
+				if i==0: parent=None
+				else:
+					parent=system.sites[i]
+					parent.load(**r)
+
+			elif kind in children:
+				(cls,append,records)=children[kind]
+				if not isinstance(parent,cls):
+					self.logger.error('import_scan_settings(): %s out of place' % kind)
+					continue
+				i=getattr(parent,append)()
+				if i==0: continue
+				getattr(parent,records)[i].load(**r)
+
+			else:
+				self.logger.error('import_scan_settings(): unknown record %s' % kind)
+
+		if apply and system is not None: system.set_data()
+
+		return n
+
 	def create_system(self, sys_type='CNV', protect=0):
 
 		"""Creates system instance in scanner memory and returns system index."""
@@ -823,7 +1301,7 @@ class UnidenScanner:
 			self.logger.error('delete_system(): %s' % cmd)
 			return 0
 
-		self.systems.pop(sys_index)
+		self.systems.pop(sys_index).indexed('remove_system')
 
 		return 1
 
@@ -851,19 +1329,24 @@ class UnidenScanner:
 
 		return 1
 
-	def dump_search_settings(self):
+	def dump_search_settings(self, fname=None):
 
-                """Returns YAML formatted text of scanner settings."""
+                """Returns YAML formatted text of scanner settings.
+                With fname writes it to file instead, format by extension (see formats.py)."""
 
-                return yaml.dump(self.searches.dump())
+                if fname is None: return formats.dumps(self.searches.dump())
+
+                formats.dump(self.searches.dump(),fname)
+
+                return 1
 
 	def load_search_settings(self, fname):
 
-                """Load YAML formatted text to memory.
+                """Load YAML (or JSON, MessagePack by extension) formatted text to memory.
                 It is up to user to set data into scanner.
                 See sample YAML file in examples."""
 
-                searches=yaml.load(file(fname, 'r'))
+                searches=formats.load(fname)
 
                 self.searches.load(**searches)
 
@@ -878,11 +1361,13 @@ class UnidenScannerError(Exception): pass
 
 class CommandError(UnidenScannerError): pass
 
+class FetchError(UnidenScannerError): pass
+
 class ModulationError(UnidenScannerError): pass
 
 class BScreenError(UnidenScannerError): pass
 
-class Settings:
+class Settings(Record):
 
 	"""Scanner Settings class."""
 
@@ -935,47 +1420,23 @@ class Settings:
 		                        DISP_UID Display Unit ID ( 0: OFF / 1: ON )"""
 
 		try:
-			blt = self.scanner.raw('BLT')
-			bsv = self.scanner.raw('BSV')
-			com = self.scanner.raw('COM')
-			kbp = self.scanner.raw('KBP')
-			oms = self.scanner.raw('OMS')
-			pri = self.scanner.raw('PRI')
-			agv = self.scanner.raw('AGV')
-			sct = self.scanner.raw('SCT')
-			cnt = self.scanner.raw('CNT')
-			scn = self.scanner.raw('SCN')
+			(blt,bsv,com,kbp,oms,pri,agv,sct,cnt,scn) = self.scanner.raw_batch(['BLT',
+				'BSV','COM','KBP','OMS','PRI','AGV','SCT','CNT','SCN'])
 
 		except CommandError:
 			self.logger.error('get_data()')
 			return 0
 
-		(blt,event,color,dimmer) = blt.split(',')
-		self.backlight = {'event':event, 'color':color, 
-							'dimmer':dimmer}
-		(bsv,bat_save,charge_time) = bsv.split(',')
-		self.battery_info = {'bat_save':bat_save, 
-						'charge_time':charge_time}
-		(com,baudrate,csv) = com.split(',')
-		self.com_port = {'baudrate':baudrate}
-		(kbp,level,lock,safe) = kbp.split(',')
-		self.key_beep = {'level':level, 'lock':lock, 'safe':safe}
-		(oms,l1_char,l2_char,l3_char,l4_char) = oms.split(',')
-		self.opening_message = [0, l1_char, l2_char, l3_char, l4_char]
-		(pri,pri_mode,max_chan,interval) = pri.split(',')
-		self.priority_mode = {'pri_mode':pri_mode, 'max_chan':max_chan, 
-								'interval':interval}
-		(agv,rsv1,rsv2,a_res,a_ref,a_gain,d_res,d_gain) = agv.split(',')
-		self.auto_gain_control={'a_res':a_res, 'a_ref':a_ref, 'a_gain':a_gain,
-								'd_res':d_res, 'd_gain':d_gain}
-		(sct,n) = sct.split(',')
-		self.system_count={'n':n}
-		(cnt,contrast) = cnt.split(',')
-		self.lcd_contrast={'contrast':contrast}
-		(scn,disp_mode,rsv1,ch_log,g_att,rsv2,p25_lpf,disp_uid,rsv3,rsv4,rsv5,
-			rsv6,rsv7,rsv8,rsv9,rsv10,rsv11,rsv12,rsv13,rsv14,rsv15,rsv16) = scn.split(',')
-		self.scanner_option={'disp_mode':disp_mode, 'ch_log':ch_log, 
-						'g_att':g_att, 'p25_lpf':p25_lpf, 'disp_uid':disp_uid}
+		self.backlight = codec.decode_dict('BLT',blt)
+		self.battery_info = codec.decode_dict('BSV',bsv)
+		self.com_port = codec.decode_dict('COM',com)
+		self.key_beep = codec.decode_dict('KBP',kbp)
+		self.opening_message = [0]+codec.decode('OMS',oms)
+		self.priority_mode = codec.decode_dict('PRI',pri)
+		self.auto_gain_control = codec.decode_dict('AGV',agv)
+		self.system_count = codec.decode_dict('SCT',sct)
+		self.lcd_contrast = codec.decode_dict('CNT',cnt)
+		self.scanner_option = codec.decode_dict('SCN',scn)
 
 		return 1
 
@@ -983,39 +1444,21 @@ class Settings:
 
 		"""Set scanner settings data to device."""
 
-		rsv = ''
-		if self.backlight: blt = ','.join(['BLT',str(self.backlight['event']),self.backlight['color'],
-				str(self.backlight['dimmer'])])
-		if self.battery_info: bsv = ','.join(['BSV',str(self.battery_info['bat_save']), 
-				str(self.battery_info['charge_time'])])
-		if self.com_port: com = ','.join(['COM',self.com_port['baudrate'],rsv])
-		if self.key_beep: kbp = ','.join(['KBP',str(self.key_beep['level']),str(self.key_beep['lock']),
-						str(self.key_beep['safe'])])
-		if self.opening_message: oms = ','.join(['OMS',self.opening_message[1],self.opening_message[2],
-						self.opening_message[3],self.opening_message[4]])
-		if self.priority_mode: pri = ','.join(['PRI',str(self.priority_mode['pri_mode']), 
-						str(self.priority_mode['max_chan']),
-						str(self.priority_mode['interval'])])
-		if self.auto_gain_control: agv = ','.join(['AGV',rsv,rsv,str(self.auto_gain_control['a_res']),
-							str(self.auto_gain_control['a_ref']),
-							str(self.auto_gain_control['a_gain']),
-							str(self.auto_gain_control['d_res']),
-							str(self.auto_gain_control['d_gain'])])
-		if self.lcd_contrast: cnt = ','.join(['CNT', str(self.lcd_contrast['contrast'])])
-		if self.scanner_option: scn = ','.join(['SCN', str(self.scanner_option['disp_mode']),rsv,
-				str(self.scanner_option['ch_log']),str(self.scanner_option['g_att']),
-				rsv,str(self.scanner_option['p25_lpf']),str(self.scanner_option['disp_uid']),
-				rsv,rsv,rsv,rsv,rsv,rsv,rsv,rsv,rsv,rsv,rsv,rsv,rsv,rsv])
+		cmds=[]
+		if self.backlight: cmds.append(codec.encode_dict('BLT',self.backlight))
+		if self.battery_info: cmds.append(codec.encode_dict('BSV',self.battery_info))
+		if self.key_beep: cmds.append(codec.encode_dict('KBP',self.key_beep))
+		if self.opening_message: cmds.append(codec.encode_values('OMS',self.opening_message[1:5]))
+		if self.priority_mode: cmds.append(codec.encode_dict('PRI',self.priority_mode))
+		if self.auto_gain_control: cmds.append(codec.encode_dict('AGV',self.auto_gain_control))
+		if self.lcd_contrast: cmds.append(codec.encode_dict('CNT',self.lcd_contrast))
+		if self.scanner_option: cmds.append(codec.encode_dict('SCN',self.scanner_option))
+
+		# COM changes baud rate, sent last and on its own
+		if self.com_port: com = codec.encode_dict('COM',self.com_port)
 
 		try:
-			if self.backlight: blt = self.scanner.raw(blt)
-			if self.battery_info: bsv = self.scanner.raw(bsv)
-			if self.key_beep: kbp = self.scanner.raw(kbp)
-			if self.opening_message: oms = self.scanner.raw(oms)
-			if self.priority_mode: pri = self.scanner.raw(pri)
-			if self.auto_gain_control: agv = self.scanner.raw(agv)
-			if self.lcd_contrast: cnt = self.scanner.raw(cnt)
-			if self.scanner_option: scn = self.scanner.raw(scn)
+			self.scanner.raw_batch(cmds)
 			if self.com_port: 
 				com = self.scanner.raw(com)
 				time.sleep(3)
@@ -1090,10 +1533,19 @@ class Settings:
 
 		return 1
 
-class System:
+class System(SyncedRecord):
 
 	"""Scanner System class."""
 
+	unfetched=False
+	lazy=False
+
+	groups=lazy_property('groups')
+	sites=lazy_property('sites')
+	quick_lockout=lazy_property('quick_lockout')
+	lout_tgids=lazy_property('lout_tgids')
+	srch_lout_tgids=lazy_property('srch_lout_tgids')
+
 	def __init__(self, scanner, sys_index):
 
 		self.logger = logging.getLogger('uniden_api.System')
@@ -1144,9 +1596,11 @@ class System:
 		self.lout_tgids=()
 		self.srch_lout_tgids=()
 
-	def get_data(self):
+	def get_data(self, lazy=False):
 
 		"""Get System Information.
+		With lazy only SIN and TRN headers are read, groups, sites, group quick lockout
+		and locked out TGIDs are read by fetch() on first access, groups lazily too.
 		When the system protect bit is ON, except [SYS_TYPE], [NAME], [REV_INDEX],
 		[FWD_INDEX], [CHN_GRP_HEAD], [CHN_GRP_TAIL], other parameters will be send as a
 		reserve parameter in the Radio -> Controller command.
@@ -1223,11 +1677,76 @@ class System:
 			self.logger.error('get_data(): cmd %s' % cmd)
 			return 0
 
-		(sin,self.sys_type,self.name,self.quick_key,self.hld,self.lout,
-			self.dly,rsv1,rsv2,rsv3,rsv4,rsv5,self.rev_index,self.fwd_index,
-			self.chn_grp_head,self.chn_grp_tail,self.seq_no,self.start_key,
-			rsv6,rsv7,rsv8,rsv9,rsv10,self.number_tag,self.agc_analog,
-			self.agc_digital,self.p25waiting,self.protect,rsv11) = res.split(',')
+		self.parse_data(res)
+
+		if self.sys_type <> 'CNV':
+
+			cmd = ','.join(['TRN',self.sys_index])
+
+        	        try:
+				res = self.scanner.raw(cmd)
+
+			except CommandError:
+				self.logger.error('get_data(): cmd %s' % cmd)
+				return 0
+
+			self.parse_trn(res)
+
+		self.lazy=lazy
+		self.unfetched=True
+		self.mark_synced()
+		self.indexed('add_system')
+
+		if lazy: return 1
+
+		return self.fetch()
+
+	def parse_data(self, res):
+
+		"""Parses SIN response to system data."""
+
+		codec.decode_into('SIN',self,res)
+
+	def parse_trn(self, res):
+
+		"""Parses TRN response to trunked system data."""
+
+		codec.decode_into('TRN',self,res)
+
+	def fetch(self):
+
+		"""Gets groups, sites, group quick lockout and locked out TGIDs of the system.
+		Called on first access to them when system was read lazily. If reading fails
+		part-way, children read so far are dropped and system stays unfetched."""
+
+		# cleared first, so get_children() can use the properties
+		self.unfetched=False
+
+		try:
+			if self.scanner.program_mode_call(self.get_children): return 1
+
+		except CommandError, e:
+			self.logger.error('fetch(): %s' % str(e))
+
+		self.clear_children()
+		self.unfetched=True
+
+		return 0
+
+	def clear_children(self):
+
+		for g in self.groups.values(): g.indexed('remove_group')
+
+		self.groups={}
+		self.sites={}
+		self.quick_lockout=()
+		self.lout_tgids=()
+		self.srch_lout_tgids=()
+
+	def get_children(self):
+
+		"""Gets groups, sites, group quick lockout and locked out TGIDs,
+		scanner must be in program mode."""
 
 		grp_index = self.chn_grp_head
 
@@ -1235,40 +1754,24 @@ class System:
 
 			if self.sys_type == 'CNV':
 				g=Group(self.scanner,grp_index,self.sys_type)
-				g.get_data()
 				self.groups[grp_index]=g
+				if not g.get_data(self.lazy): return 0
 				grp_index=g.fwd_index
 			else:
 				s=Site(self.scanner,grp_index)
-				s.get_data()
+				if not s.get_data(): return 0
 				self.sites[grp_index]=s
 				grp_index=s.fwd_index
 
 		if self.sys_type <> 'CNV':
 
-			cmd = ','.join(['TRN',self.sys_index])
-
-        	        try:
-				res = self.scanner.raw(cmd)
-
-			except CommandError:
-				self.logger.error('get_data(): cmd %s' % cmd)
-				return 0
-
-			(trn,self.id_search,self.s_bit,self.end_code,self.afs,rsv1,rsv2,
-				self.emg,self.emgl,self.fmap,self.ctm_fmap,rsv3,rsv4,rsv5,
-				rsv6,rsv7,rsv8,rsv9,rsv10,rsv11,rsv12,self.tgid_grp_head,
-				self.tgid_grp_tail,self.id_lout_grp_head,self.id_lout_grp_tail,
-				self.mot_id,self.emg_color,self.emg_pattern,self.p25nac,
-				self.pri_id_scan) = res.split(',')
-			
 			tgid_grp_index = self.tgid_grp_head
 
 			while int(tgid_grp_index) <> -1:
 
 				g=Group(self.scanner,tgid_grp_index,self.sys_type)
-				g.get_data()
 				self.groups[tgid_grp_index]=g
+				if not g.get_data(self.lazy): return 0
 				tgid_grp_index=g.fwd_index
 
 		cmd = ','.join(['QGL',self.sys_index])
@@ -1277,66 +1780,92 @@ class System:
 			res = self.scanner.raw(cmd)
 
 		except CommandError:
-			self.logger.error('get_data(): cmd %s' % cmd)
+			self.logger.error('get_children(): cmd %s' % cmd)
 			return 0
 		
 		(qgl,s) = res.split(',')
 		self.quick_lockout=zero_to_head(tuple(s))
+		self.synced=self.synced+(self.qgl_cmd(),)
 
-		self.get_lockout_tgids()
+		return self.get_lockout_tgids()
 
-		return 1
+	def sin_cmd(self):
 
-	def set_data(self):
+		"""Returns SIN command setting system data."""
+
+		return codec.encode('SIN',self)
+
+	def trn_cmd(self):
+
+		"""Returns TRN command setting trunked system data."""
+
+		return codec.encode('TRN',self)
 
-                """Set scanner system data to device."""
+	def qgl_cmd(self):
+
+		"""Returns QGL command setting group quick lockout."""
+
+		t=zero_to_tail(self.quick_lockout)
+		s=''.join(t)
+		return ','.join(['QGL',self.sys_index,s])
+
+	def set_cmds(self):
+
+		l=[self.sin_cmd()]
+		if self.sys_type <> 'CNV': l.append(self.trn_cmd())
+		# group quick lockout is not known until fetched
+		if not self.unfetched: l.append(self.qgl_cmd())
+
+		return tuple(l)
+
+	def set_data(self, force=False):
+
+                """Set scanner system data to device.
+		Only records changed since last sync are sent, force sends all records.
+		Groups and sites are set the same way, nothing below the system
+		is set if it was not fetched yet."""
+
+		dirty=self.dirty_cmds()
+		if force: dirty=self.set_cmds()
+
+		cmd=self.sin_cmd()
+
+		if cmd in dirty:
+			try:
+				res = self.scanner.raw(cmd)
+
+			except CommandError:
+				self.logger.error('set_data(): cmd %s' % cmd)
+				return 0
 
-		rsv = ''
-		res = ''
-		cmd = ','.join(['SIN',str(self.sys_index),self.name,str(self.quick_key),
-				str(self.hld),str(self.lout),str(self.dly),rsv,rsv,
-				rsv,rsv,rsv,str(self.start_key),rsv,rsv,rsv,rsv,rsv,
-				rsv,str(self.number_tag),str(self.agc_analog),
-				str(self.agc_digital),str(self.p25waiting)])
+		if not self.unfetched:
+			for g in self.groups.values(): g.set_data(force)
 
-                try:
-			res = self.scanner.raw(cmd)
+		if self.sys_type <> 'CNV':
 
-		except CommandError:
-			self.logger.error('set_data(): cmd %s' % cmd)
-			return 0
+			cmd=self.trn_cmd()
 
-		for g in self.groups.values(): g.set_data()
+			if cmd in dirty:
+				try:
+					res = self.scanner.raw(cmd)
 
-		if self.sys_type <> 'CNV':
+				except CommandError:
+					self.logger.error('set_data(): cmd %s' % cmd)
+					return 0
 
-			rsv = ''
-			cmd = ','.join(['TRN',str(self.sys_index),str(self.id_search),
-					str(self.s_bit),str(self.end_code),str(self.afs),
-					rsv,rsv,str(self.emg),str(self.emgl),str(self.fmap),
-					self.ctm_fmap,rsv,rsv,rsv,rsv,rsv,rsv,rsv,rsv,rsv,rsv,
-					str(self.mot_id),self.emg_color,str(self.emg_pattern),
-					self.p25nac,str(self.pri_id_scan)])
+			if not self.unfetched:
+				for s in self.sites.values(): s.set_data(force)
 
-        	        try:
+		if not self.unfetched and self.qgl_cmd() in dirty:
+			cmd=self.qgl_cmd()
+			try:
 				res = self.scanner.raw(cmd)
 
 			except CommandError:
 				self.logger.error('set_data(): cmd %s' % cmd)
 				return 0
 
-			for s in self.sites.values(): s.set_data() 
-
-		t=zero_to_tail(self.quick_lockout)
-		s=''.join(t)
-		cmd = ','.join(['QGL',self.sys_index,s])
-
-                try:
-			res = self.scanner.raw(cmd)
-
-		except CommandError:
-			self.logger.error('set_data(): cmd %s' % cmd)
-			return 0
+		self.mark_synced()
 
 		return 1
 
@@ -1394,9 +1923,9 @@ class System:
 		for i in sorted(self.sites): self.sites[i].show_brief()
 
 
-	def dump(self):
+	def dump(self, children=True):
 
-		"""Dumps system data to dictionary."""
+		"""Dumps system data to dictionary, without groups and sites unless children."""
 
 		lout='unlock'
 		level='auto'
@@ -1431,26 +1960,39 @@ class System:
 		lt=list(self.lout_tgids)
 		slt=list(self.srch_lout_tgids)
 
-		groups=[]
-		sites=[]
-
-		for i in sorted(self.groups): groups.append(self.groups[i].dump())
-		for i in sorted(self.sites): sites.append(self.sites[i].dump())
-
 		d={'type':stype, 'name':self.name, 'quick_key':qk, 'hold':self.hld, 'delay':self.dly, 'lockout':lout,
 			'start_key':sk, 'tag':tag, 'agc_analog':agca, 'agc_digital':agcd, 'p25_waiting':pw,
-			'protected':pr, 'groups':groups, 'grp_lockout':ql}
+			'protected':pr, 'grp_lockout':ql}
 
 		if self.sys_type <> 'CNV':
 			d1={'id_mode':ids, 'status':sb, 'end_code':ec, 'edacs_format':afs, 'alert':self.emg, 
 				'alert_lvl':level, 'grp_lockout':ql, 'fleet_map':self.fmap, 
 				'custom_fmap':self.ctm_fmap, 'id_format':mi, 'alert_color':self.emg_color, 
-				'pattern':ep, 'nac':self.p25nac, 'priority':pis, 'sites':sites,
+				'pattern':ep, 'nac':self.p25nac, 'priority':pis,
 				'tgids_lockout':lt, 'search_lockout':slt}
 			d.update(d1)	
 
+		if children:
+			d['groups']=[self.groups[i].dump() for i in sorted(self.groups)]
+			if self.sys_type <> 'CNV': d['sites']=[self.sites[i].dump() for i in sorted(self.sites)]
+
 		return d
 
+	def records(self):
+
+		"""Yields export records of system, its groups and sites, one dictionary
+		at a time, see UnidenScanner.export_scan_settings()."""
+
+		d=self.dump(False)
+		d['record']='system'
+		yield d
+
+		for i in sorted(self.groups):
+			for r in self.groups[i].records(): yield r
+
+		for i in sorted(self.sites):
+			for r in self.sites[i].records(): yield r
+
 	def load(self, type='conventional', name='NONAME', quick_key='.', hold='0', lockout='unlock', delay='0',
 			start_key='.', tag='NONE', agc_analog='off', agc_digital='off', p25_waiting='200',
 			protected='off', id_mode='scan', status='ignore', end_code='ignore', 
@@ -1494,6 +2036,8 @@ class System:
 			self.logger.error('load(): keyerror %s' % str(e))
 			return 0
 
+		self.indexed('add_system')
+
 		for grp in groups:
 			# append grp
 			i=self.append_group(grp['type'])
@@ -1568,6 +2112,7 @@ class System:
 		(ag,grp_index) = res.split(',')
 		if grp_index == -1: return 0
 		g=Group(self.scanner,grp_index,self.sys_type)
+		g.sys_index=self.sys_index
 		self.groups[grp_index]=g
 
 		return grp_index
@@ -1585,7 +2130,7 @@ class System:
 			self.logger.error('delete_group(): cmd %s' % cmd)
 			return 0
 
-		self.groups.pop(grp_index)
+		self.groups.pop(grp_index).indexed('remove_group')
 
 		return 1
 
@@ -1629,46 +2174,85 @@ class System:
 
 		return 1
 
-	def unlock_tgid(self, tgid):
-
-		"""Unlock TGID."""
+	def set_tgid_lockouts(self, lock=(), unlock=(), verify=False):
 
-		cmd = ','.join(['ULI',self.sys_index,str(tgid)])
+		"""Locks out and unlocks TGIDs in bulk. Only TGIDs whose state differs from
+		lout_tgids are sent, LOI and ULI commands as one pipelined batch, then
+		lout_tgids and srch_lout_tgids are updated without re-reading them.
+		With verify GLI and SLI lists are read back and compared. If a command
+		fails, lists are read back to learn the actual state and 0 is returned."""
 
-		try:
-			res = self.scanner.raw(cmd)
+		lock=[str(t) for t in lock]
+		unlock=[str(t) for t in unlock]
 
-		except CommandError:
-			self.logger.error('unlock_tgid(): cmd %s' % cmd)
+		both=set(lock) & set(unlock)
+		if both:
+			self.logger.error('set_tgid_lockouts(): TGIDs both locked and unlocked %s' % ', '.join(sorted(both)))
 			return 0
 
-		self.srch_lout_tgids=()
-		self.get_lockout_tgids()
-
-		return 1
+		lt=[t for t in self.lout_tgids if t <> '-1']
+		slt=[t for t in self.srch_lout_tgids if t <> '-1']
 
-	def lockout_tgid(self, tgid):
+		# delta against local lists, duplicates dropped
+		locked=set(lt)
+		unlocked=set(lt+slt)
+		(locks,unlocks)=([],[])
+		for t in lock:
+			if t in locked: continue
+			locked.add(t)
+			locks.append(t)
+		for t in unlock:
+			if t not in unlocked: continue
+			unlocked.remove(t)
+			unlocks.append(t)
 
-		"""Lock out TGID."""
+		if not locks and not unlocks: return 1
 
-		cmd = ','.join(['LOI',self.sys_index,str(tgid)])
+		cmds=[','.join(['LOI',self.sys_index,t]) for t in locks]+[','.join(['ULI',self.sys_index,t]) for t in unlocks]
 
 		try:
-			res = self.scanner.raw(cmd)
+			self.scanner.raw_batch(cmds)
 
-		except CommandError:
-			self.logger.error('lockout_tgid(): cmd %s' % cmd)
+		except CommandError, e:
+			self.logger.error('set_tgid_lockouts(): %s' % str(e))
+			self.get_lockout_tgids()
 			return 0
 
-		self.srch_lout_tgids=()
-		self.get_lockout_tgids()
+		# lists as get_lockout_tgids() reads them, -1 terminated
+		unlocks=set(unlocks)
+		self.lout_tgids=tuple([t for t in lt if t not in unlocks]+locks+['-1'])
+		self.srch_lout_tgids=tuple([t for t in slt if t not in unlocks]+['-1'])
+
+		if verify:
+			expected=(self.lout_tgids,self.srch_lout_tgids)
+			if not self.get_lockout_tgids(): return 0
+			if map(sorted,expected) <> map(sorted,(self.lout_tgids,self.srch_lout_tgids)):
+				self.logger.error('set_tgid_lockouts(): locked out TGIDs differ from scanner')
+				return 0
 
 		return 1
 
-class Group:
+	def unlock_tgid(self, tgid):
+
+		"""Unlock TGID."""
+
+		return self.set_tgid_lockouts(unlock=[tgid])
+
+	def lockout_tgid(self, tgid):
+
+		"""Lock out TGID."""
+
+		return self.set_tgid_lockouts(lock=[tgid])
+
+class Group(SyncedRecord):
 
         """Scanner Group class."""
 
+	unfetched=False
+
+	channels=lazy_property('channels')
+	tgids=lazy_property('tgids')
+
 	def __init__(self, scanner, grp_index, sys_type):
 
 		self.logger = logging.getLogger('uniden_api.Group')
@@ -1694,9 +2278,10 @@ class Group:
 		self.channels={}
 		self.tgids={}
 
-	def get_data(self):
+	def get_data(self, lazy=False):
 
 		"""Get Group Information.
+		With lazy only GIN is read, channels or TGIDs are read by fetch() on first access.
 		In set command, only "," parameters are not changed.
 		The set command is aborted if any format error is detected.
 		When the system protect bit is ON, except [NAME], [REV_INDEX], [FWD_INDEX],
@@ -1727,10 +2312,46 @@ class Group:
 			self.logger.error('get_data(): %s' % cmd)
 			return 0
 		
-		(gin,self.grp_type,self.name,self.quick_key,self.lout,
-			self.rev_index,self.fwd_index,self.sys_index,self.chn_head,
-			self.chn_tail,self.seq_no,self.latitude,self.longitude,
-			self.grp_range,self.gps_enable) = res.split(',')
+		self.parse_data(res)
+
+		self.unfetched=True
+
+		if lazy: return 1
+
+		return self.fetch()
+
+	def parse_data(self, res):
+
+		"""Parses GIN response to group data."""
+
+		codec.decode_into('GIN',self,res)
+		self.mark_synced()
+
+	def fetch(self):
+
+		"""Gets channels or TGIDs of the group.
+		Called on first access to them when group was read lazily. If reading fails
+		part-way, children read so far are dropped and group stays unfetched."""
+
+		# cleared first, so get_children() can use the properties
+		self.unfetched=False
+
+		try:
+			if self.scanner.program_mode_call(self.get_children): return 1
+
+		except CommandError, e:
+			self.logger.error('fetch(): %s' % str(e))
+
+		self.indexed('remove_group')
+		self.channels={}
+		self.tgids={}
+		self.unfetched=True
+
+		return 0
+
+	def get_children(self):
+
+		"""Gets channels or TGIDs of the group, scanner must be in program mode."""
 
 		chn_index = self.chn_head
 
@@ -1738,36 +2359,80 @@ class Group:
 
 			if self.sys_type == 'CNV':
 				c=Channel(self.scanner,chn_index)
-				c.get_data()
+				if not c.get_data(): return 0
 				self.channels[chn_index]=c
 				chn_index=c.fwd_index
 			else:
 				t=TalkGroupID(self.scanner,chn_index)
-				t.get_data()
+				if not t.get_data(): return 0
 				self.tgids[chn_index]=t
 				chn_index=t.fwd_index
 
 		return 1
 
-	def set_data(self):
+	def set_cmd(self):
 
-                """Set scanner group data to device."""
+		"""Returns GIN command setting group data."""
 
-		rsv = ''
-		cmd = ','.join(['GIN',str(self.grp_index),self.name,str(self.quick_key),
-				str(self.lout),str(self.latitude),str(self.longitude),
-				str(self.grp_range),str(self.gps_enable)])
+		return codec.encode('GIN',self)
 
-                try:
-			res = self.scanner.raw(cmd)
+	def set_cmds(self):
 
-		except CommandError:
-			self.logger.error('set_data(): %s' % cmd)
+		return (self.set_cmd(),)
+
+	def set_data(self, force=False):
+
+                """Set scanner group data to device.
+		Only group, channels and TGIDs changed since last sync are sent,
+		force sends all of them."""
+
+		cmd = self.set_cmd()
+
+		if force or self.is_dirty():
+			try:
+				res = self.scanner.raw(cmd)
+
+			except CommandError:
+				self.logger.error('set_data(): %s' % cmd)
+				return 0
+
+			self.mark_synced()
+
+		objs=[]
+		if not self.unfetched:
+			objs=[o for o in self.channels.values()+self.tgids.values() if force or o.is_dirty()]
+
+		try:
+			self.scanner.raw_batch([o.set_cmd() for o in objs])
+
+		except CommandError, e:
+			self.logger.error('set_data(): %s' % str(e))
 			return 0
 
-		for c in self.channels.values(): c.set_data()
+		for o in objs: o.mark_synced()
+
+		return 1
+
+	def refresh_data(self):
+
+		"""Re-reads already known channels or TGIDs of the group.
+		Indexes are known, so reads are sent as one pipelined batch."""
+
+		objs=self.channels.values()+self.tgids.values()
+
+		cmds=[]
+		for o in objs:
+			if isinstance(o,Channel): cmds.append(','.join(['CIN',o.chn_index]))
+			else: cmds.append(','.join(['TIN',o.chn_index]))
+
+		try:
+			res = self.scanner.raw_batch(cmds)
+
+		except CommandError, e:
+			self.logger.error('refresh_data(): %s' % str(e))
+			return 0
 
-		for t in self.tgids.values(): t.set_data()
+		for (o,r) in zip(objs,res): o.parse_data(r)
 
 		return 1
 
@@ -1799,9 +2464,9 @@ class Group:
 		for i in sorted(self.channels): self.channels[i].show_brief()
 		for i in sorted(self.tgids): self.tgids[i].show_brief()
 
-	def dump(self):
+	def dump(self, children=True):
 
-                """Dumps group data to dictionary."""
+                """Dumps group data to dictionary, without channels and TGIDs unless children."""
 
 		gt=self.grp_type
 		qk=self.quick_key
@@ -1811,20 +2476,35 @@ class Group:
 		gr=self.grp_range
 		gps=human_onoff[self.gps_enable]
 
-		channels=[]
-		for i in sorted(self.channels): channels.append(self.channels[i].dump())
-
-		tgids=[]
-		for i in sorted(self.tgids): tgids.append(self.tgids[i].dump())
-
 		d={'name':self.name,'quick_key':qk, 'lockout':lout, 'latitude':lat, 'longitude':lon, 
 				'range':gr, 'gps':gps, 'type':gt}
 
-		if gt == 'C': d['channels']=channels
-		if gt == 'T': d['tgids']=tgids
+		if children:
+			if gt == 'C': d['channels']=[self.channels[i].dump() for i in sorted(self.channels)]
+			if gt == 'T': d['tgids']=[self.tgids[i].dump() for i in sorted(self.tgids)]
 
 		return d
 
+	def records(self):
+
+		"""Yields export records of group and its channels or TGIDs."""
+
+		d=self.dump(False)
+		d['record']='group'
+		yield d
+
+		if self.grp_type == 'C':
+			for i in sorted(self.channels):
+				d=self.channels[i].dump()
+				d['record']='channel'
+				yield d
+
+		if self.grp_type == 'T':
+			for i in sorted(self.tgids):
+				d=self.tgids[i].dump()
+				d['record']='tgid'
+				yield d
+
 	def load(self, name='NONAME', quick_key='.', lockout='unlock', latitude='00000000N', type='C',
 			longitude='000000000W', range='0', gps='off', tgids=[], channels=[]):
 
@@ -1877,7 +2557,9 @@ class Group:
 		(acc,chn_index) = res.split(',')
 		if chn_index == -1: return 0
 		c=Channel(self.scanner,chn_index)
+		(c.sys_index,c.grp_index)=(self.sys_index,self.grp_index)
 		self.channels[chn_index]=c
+		c.indexed('add')
 
 		return chn_index 
 
@@ -1897,7 +2579,9 @@ class Group:
 		(act,chn_index) = res.split(',')
 		if chn_index == -1: return 0 
 		t=TalkGroupID(self.scanner,chn_index)
+		(t.sys_index,t.grp_index)=(self.sys_index,self.grp_index)
 		self.tgids[chn_index]=t
+		t.indexed('add')
 
 		return chn_index
 
@@ -1914,7 +2598,7 @@ class Group:
 			self.logger.error('delete_channel(): %s' % cmd)
 			return 0
 
-		self.channels.pop(chn_index)
+		self.channels.pop(chn_index).indexed('remove')
 
 		return 1
 
@@ -1931,11 +2615,11 @@ class Group:
 			self.logger.error('delete_tgid(): %s' % cmd)
 			return 0
 
-		self.tgids.pop(chn_index)
+		self.tgids.pop(chn_index).indexed('remove')
 
 		return 1
 
-class Site:
+class Site(SyncedRecord):
 
         """Scanner Site class."""
 
@@ -2014,12 +2698,7 @@ class Site:
                         self.logger.error('get_data(): %s' % cmd)
 			return 0
 
-		(sif,rsv1,self.name,self.quick_key,self.hld,self.lout,
-			self.mod,self.att,self.c_ch,rsv2,rsv3,self.rev_index,
-			self.fwd_index,self.sys_index,self.chn_head,self.chn_tail,
-			self.seq_no,self.start_key,self.latitude,self.longitude,
-			self.sit_range,self.gps_enable,rsv4,self.mot_type,
-			self.edacs_type,self.p25waiting,rsv5) = res.split(',')
+		self.parse_data(res)
 
 		chn_index = self.chn_head
 
@@ -2038,14 +2717,7 @@ class Site:
                         self.logger.error('get_data(): %s' % cmd)
 			return 0
 
-		(mcp,lower1,upper1,step1,offset1,lower2,upper2,step2,offset2,
-			lower3,upper3,step3,offset3,lower4,upper4,step4,offset4,
-			lower5,upper5,step5,offset5,lower6,upper6,step6,offset6) = res.split(',')
-
-		self.motorola_custom_band_plan={'lower': (0,lower1,lower2,lower3,lower4,lower5,lower6),
-						'upper': (0,upper1,upper2,upper3,upper4,upper5,upper6),
-						'step': (0,step1,step2,step3,step4,step5,step6),
-						'offset': (0,offset1,offset2,offset3,offset4,offset5,offset6)}
+		self.parse_mcp(res)
 
 		cmd = ','.join(['ABP',self.sit_index])
 
@@ -2056,36 +2728,74 @@ class Site:
                         self.logger.error('get_data(): %s' % cmd)
 			return 0
 
-		(abp,bf_0,sf_0,bf_1,sf_1,bf_2,sf_2,bf_3,sf_3,bf_4,sf_4,bf_5,sf_5,
-			bf_6,sf_6,bf_7,sf_7,bf_8,sf_8,bf_9,sf_9,bf_A,sf_A,bf_B,sf_B,
-			bf_C,sf_C,bf_D,sf_D,bf_E,sf_E,bf_F,sf_F) = res.split(',')
-
-		self.p25_band_plan = {'base_freq': [bf_0,bf_1,bf_2,bf_3,bf_4,bf_5,
-					bf_6,bf_7,bf_8,bf_9,bf_A,bf_B,bf_C,bf_D,bf_E,bf_F],
-				'spacing_freq': [sf_0,sf_1,sf_2,sf_3,sf_4,sf_5,
-					sf_6,sf_7,sf_8,sf_9,sf_A,sf_B,sf_C,sf_D,sf_E,sf_F]}
+		self.parse_abp(res)
 
 		return 1
 
-	def set_data(self):
+	def parse_data(self, res):
 
-                """Set scanner site data to device."""
+		"""Parses SIF response to site data."""
 
-		rsv = ''
-		cmd = ','.join(['SIF',str(self.sit_index),self.name,str(self.quick_key),
-				str(self.hld),str(self.lout),self.mod,str(self.att),str(self.c_ch),
-				rsv,rsv,str(self.start_key),str(self.latitude),str(self.longitude),
-				str(self.sit_range),str(self.gps_enable),rsv,self.mot_type,
-				self.edacs_type,str(self.p25waiting),rsv])
+		codec.decode_into('SIF',self,res)
+		self.mark_synced()
 
-                try:
-			res = self.scanner.raw(cmd)
+	def parse_mcp(self, res):
 
-		except CommandError:
-                        self.logger.error('set_data(): %s' % cmd)
+		"""Parses MCP response to Motorola custom band plan."""
+
+		l=codec.decode('MCP',res)
+
+		self.motorola_custom_band_plan={'lower': tuple([0]+l[0::4]),
+						'upper': tuple([0]+l[1::4]),
+						'step': tuple([0]+l[2::4]),
+						'offset': tuple([0]+l[3::4])}
+
+	def parse_abp(self, res):
+
+		"""Parses ABP response to P25 band plan."""
+
+		l=codec.decode('ABP',res)
+
+		self.p25_band_plan = {'base_freq': l[0::2], 'spacing_freq': l[1::2]}
+
+	def set_cmd(self):
+
+		"""Returns SIF command setting site data."""
+
+		return codec.encode('SIF',self)
+
+	def set_cmds(self):
+
+		return (self.set_cmd(),)
+
+	def set_data(self, force=False):
+
+                """Set scanner site data to device.
+		Only site and trunk frequencies changed since last sync are sent,
+		force sends all of them."""
+
+		cmd = self.set_cmd()
+
+		if force or self.is_dirty():
+			try:
+				res = self.scanner.raw(cmd)
+
+			except CommandError:
+				self.logger.error('set_data(): %s' % cmd)
+				return 0
+
+			self.mark_synced()
+
+		tfqs=[t for t in self.trunk_frqs.values() if force or t.is_dirty()]
+
+		try:
+			self.scanner.raw_batch([t.set_cmd() for t in tfqs])
+
+		except CommandError, e:
+			self.logger.error('set_data(): %s' % str(e))
 			return 0
 
-		for t in self.trunk_frqs.values(): t.set_data()
+		for t in tfqs: t.mark_synced()
 
 		# TODO implement MCP/ABP set
 
@@ -2164,9 +2874,9 @@ class Site:
 
 		return 1
 
-	def dump(self):
+	def dump(self, children=True):
 
-		"""Dumps group data to dictionary."""
+		"""Dumps site data to dictionary, without trunk frequencies unless children."""
 
 		cch='on'
 		qk=self.quick_key
@@ -2185,16 +2895,28 @@ class Site:
 		for key in mbp.keys(): mbp[key]=list(mbp[key])
 		pbp=self.p25_band_plan
 
-		tfqs=[]
-		for i in sorted(self.trunk_frqs): tfqs.append(self.trunk_frqs[i].dump())
-
 		d={'name':self.name, 'quick_key':qk, 'hold':self.hld, 'lockout':lout, 'modulation':self.mod,
 			'attenuation':att, 'start_key':sk, 'latitude':self.latitude, 'longitude':self.longitude,
-			'range':sr, 'gps':gps, 'band_type':mt, 'edacs':et, 'p25_waiting':pw, 'trunk_frqs':tfqs,
+			'range':sr, 'gps':gps, 'band_type':mt, 'edacs':et, 'p25_waiting':pw,
 			'motorola_bp':mbp, 'p25_bp':pbp, 'cch':cch}
+
+		if children: d['trunk_frqs']=[self.trunk_frqs[i].dump() for i in sorted(self.trunk_frqs)]
 		
 		return d
 
+	def records(self):
+
+		"""Yields export records of site and its trunk frequencies."""
+
+		d=self.dump(False)
+		d['record']='site'
+		yield d
+
+		for i in sorted(self.trunk_frqs):
+			d=self.trunk_frqs[i].dump()
+			d['record']='trunk_frq'
+			yield d
+
 	def load(self, name='NONAME', quick_key='.', hold='0', lockout='unlock', modulation='', attenuation='off',
 			start_key='.', latitude='00000000N', longitude='000000000W', range='0', gps='off', cch='on', 
 			band_type='', edacs='', p25_waiting='', trunk_frqs=[], motorola_bp={}, p25_bp={}):
@@ -2222,7 +2944,7 @@ class Site:
 			self.att=scanner_onoff[attenuation]
 			self.gps_enable=scanner_onoff[gps]
 
-		except KeyError:
+		except KeyError, e:
 			self.logger.error('load(): keyerror %s' % str(e))
 			return 0
 
@@ -2235,16 +2957,24 @@ class Site:
 
 		return 1
 
-class Channel:
+class Channel(SyncedRecord):
 
 	"""Scanner Channel class."""
 
+	__slots__=('scanner','chn_index','name','frq','mod','dcs','tlock','lout','pri','att',
+		'alt','altl','rev_index','fwd_index','sys_index','grp_index','audio_type',
+		'p25nac','number_tag','alt_color','alt_pattern','vol_offset','synced')
+
+	logger = logging.getLogger('uniden_api.Channel')
+
+	# fields repeated across channels, interned by parse_data()
+	interned=('mod','sys_index','grp_index','p25nac','number_tag','alt_color')
+
 	def __init__(self, scanner, chn_index):
 
-		self.logger = logging.getLogger('uniden_api.Channel')
-		
 		self.scanner = scanner
 		self.chn_index = chn_index
+		self.synced=()
 		self.name='NONAME'
 		self.frq='00000000'
 		self.mod='AM'
@@ -2306,25 +3036,37 @@ class Channel:
 			self.logger.error('get_data(): %s' % cmd)
 			return 0
 
-		(cin,self.name,self.frq,self.mod,self.dcs,self.tlock,
-			self.lout,self.pri,self.att,self.alt,self.altl,
-			self.rev_index,self.fwd_index,self.sys_index,
-			self.grp_index,rsv1,self.audio_type,self.p25nac,
-			self.number_tag,self.alt_color,self.alt_pattern,
-			self.vol_offset) = res.split(',')
+		self.parse_data(res)
 
 		return 1
 
-	def set_data(self):
+	def parse_data(self, res):
+
+		"""Parses CIN response to channel data."""
+
+		codec.decode_into('CIN',self,res)
+		for n in self.interned: setattr(self,n,intern(getattr(self,n)))
+		self.mark_synced()
+		self.indexed('add')
+
+	def set_cmd(self):
+
+		"""Returns CIN command setting channel data."""
 
-		"""Set scanner channel data to device."""
+		return codec.encode('CIN',self)
 
-		rsv = ''
-		cmd = ','.join(['CIN',self.chn_index,self.name,self.frq,self.mod,
-				str(self.dcs),str(self.tlock),str(self.lout),str(self.pri),
-				str(self.att),str(self.alt),str(self.altl),rsv,str(self.audio_type),
-				self.p25nac,str(self.number_tag),self.alt_color,str(self.alt_pattern),
-				str(self.vol_offset)])
+	def set_cmds(self):
+
+		return (self.set_cmd(),)
+
+	def set_data(self, force=False):
+
+		"""Set scanner channel data to device.
+		Nothing is sent if data not changed since last sync, unless force is True."""
+
+		if not (force or self.is_dirty()): return 1
+
+		cmd = self.set_cmd()
 
                 try:
 			res = self.scanner.raw(cmd)
@@ -2333,6 +3075,8 @@ class Channel:
 			self.logger.error('set_data(): %s' % cmd)
 			return 0
 
+		self.mark_synced()
+
 		return 1
 
 	def show(self):
@@ -2422,18 +3166,27 @@ class Channel:
 			self.logger.error('load(): keyerror %s' % str(e))
 			return 0
 
+		self.indexed('add')
+
 		return 1
 
-class TrunkFrequency():
+class TrunkFrequency(SyncedRecord):
 
 	"""Scanner Trunk Frequency class."""
 
-	def __init__(self, scanner, chn_index):
+	__slots__=('scanner','chn_index','frq','lcn','lout','rev_index','fwd_index','sys_index',
+		'grp_index','number_tag','vol_offset','synced')
 
-		self.logger = logging.getLogger('uniden_api.TrunkFrequency')
+	logger = logging.getLogger('uniden_api.TrunkFrequency')
+
+	# fields repeated across trunk frequencies, interned by parse_data()
+	interned=('sys_index','grp_index','number_tag')
+
+	def __init__(self, scanner, chn_index):
 
 		self.scanner = scanner
 		self.chn_index = chn_index
+		self.synced=()
 		self.frq='00000000'
 		self.lcn=''
 		self.lout='0'
@@ -2474,20 +3227,37 @@ class TrunkFrequency():
 			self.logger.error('get_data(): %s' % cmd)
 			return 0
 
-		(tfq,self.frq,self.lcn,self.lout,self.rev_index,self.fwd_index,
-			self.sys_index,self.grp_index,rsv1,self.number_tag,
-			self.vol_offset,rsv2) = res.split(',')
+		self.parse_data(res)
 
 		return 1
 
-	def set_data(self):
+	def parse_data(self, res):
+
+		"""Parses TFQ response to trunk frequency data."""
+
+		codec.decode_into('TFQ',self,res)
+		for n in self.interned: setattr(self,n,intern(getattr(self,n)))
+		self.mark_synced()
+
+	def set_cmd(self):
+
+		"""Returns TFQ command setting trunk frequency data."""
 
-		"""Set scanner trunk frequency data to device."""
+		return codec.encode('TFQ',self)
+
+	def set_cmds(self):
+
+		return (self.set_cmd(),)
+
+	def set_data(self, force=False):
+
+		"""Set scanner trunk frequency data to device.
+		Nothing is sent if data not changed since last sync, unless force is True."""
+
+		if not (force or self.is_dirty()): return 1
+
+		cmd = self.set_cmd()
 
-		rsv = ''
-		cmd = ','.join(['TFQ',self.chn_index,self.frq,str(self.lcn),
-				str(self.lout),rsv,str(self.number_tag),
-				str(self.vol_offset),rsv])
                 try:
 			res = self.scanner.raw(cmd)
 
@@ -2495,6 +3265,8 @@ class TrunkFrequency():
 			self.logger.error('set_data(): %s' % cmd)
 			return 0
 
+		self.mark_synced()
+
 		return 1
 
 	def show(self):
@@ -2536,28 +3308,37 @@ class TrunkFrequency():
 		"""Loads dictionary to group class."""
 
 		self.frq=frq_to_scanner(frequency)
+		self.lcn=str(lcn)
 		self.number_tag=str(tag)
 		self.vol_offset=str(vol_offset)
 
 		try:
 			self.lout=scanner_lout[lockout]
 
-		except KeyError:
+		except KeyError, e:
 			self.logger.error('load(): keyerror %s' % str(e))
 			return 0
 
 		return 1
 
-class TalkGroupID():
+class TalkGroupID(SyncedRecord):
 
 	"""Scanner TalkGroupID class."""
 
-	def __init__(self, scanner, chn_index):
+	__slots__=('scanner','chn_index','name','tgid','lout','pri','alt','altl','rev_index',
+		'fwd_index','sys_index','grp_index','audio_type','number_tag','alt_color',
+		'alt_pattern','vol_offset','synced')
+
+	logger = logging.getLogger('uniden_api.TalkGroupID')
+
+	# fields repeated across TGIDs, interned by parse_data()
+	interned=('sys_index','grp_index','number_tag','alt_color')
 
-		self.logger = logging.getLogger('uniden_api.TalkGroupID')
+	def __init__(self, scanner, chn_index):
 
 		self.scanner = scanner
 		self.chn_index = chn_index
+		self.synced=()
 		self.name='NONAME'
 		self.tgid='0'
 		self.lout='0'
@@ -2609,22 +3390,37 @@ class TalkGroupID():
 			self.logger.error('get_data(): %s' % cmd)
 			return 0
 
-		(tin,self.name,self.tgid,self.lout,self.pri,self.alt,self.altl,
-			self.rev_index,self.fwd_index,self.sys_index,self.grp_index,
-			rsv1,self.audio_type,self.number_tag,self.alt_color,
-			self.alt_pattern,self.vol_offset) = res.split(',')
+		self.parse_data(res)
 
 		return 1
 
-	def set_data(self):
+	def parse_data(self, res):
+
+		"""Parses TIN response to TGID data."""
+
+		codec.decode_into('TIN',self,res)
+		for n in self.interned: setattr(self,n,intern(getattr(self,n)))
+		self.mark_synced()
+		self.indexed('add')
 
-		"""Set scanner TGID data to device."""
+	def set_cmd(self):
 
-		rsv = ''
-		cmd = ','.join(['TIN',self.chn_index,self.name,str(self.tgid),str(self.lout),
-				str(self.pri),str(self.alt),str(self.altl),rsv,str(self.audio_type),
-				str(self.number_tag),self.alt_color,str(self.alt_pattern),
-				str(self.vol_offset)])
+		"""Returns TIN command setting TGID data."""
+
+		return codec.encode('TIN',self)
+
+	def set_cmds(self):
+
+		return (self.set_cmd(),)
+
+	def set_data(self, force=False):
+
+		"""Set scanner TGID data to device.
+		Nothing is sent if data not changed since last sync, unless force is True."""
+
+		if not (force or self.is_dirty()): return 1
+
+		cmd = self.set_cmd()
 
                 try:
 			res = self.scanner.raw(cmd)
@@ -2633,6 +3429,8 @@ class TalkGroupID():
 			self.logger.error('set_data(): %s' % cmd)
 			return 0
 
+		self.mark_synced()
+
 		return 1
 
 	def show(self):
@@ -2673,9 +3471,11 @@ class TalkGroupID():
 		pri=human_onoff[self.pri]
 		altp=human_altp[self.alt_pattern]
 		vol=self.vol_offset
+		level=human_alert_tlevels[self.altl]
+		tone=human_alert_tones[self.alt]
 
-		d={'name':self.name, 'tgid':self.tgid, 'lockout':lout, 'priority':pri, 'alert_tone':self.alt,
-			'alert_level':self.altl, 'audio_type':audiot, 'tag':self.number_tag, 
+		d={'name':self.name, 'tgid':self.tgid, 'lockout':lout, 'priority':pri, 'alert_tone':tone,
+			'alert_level':level, 'audio_type':audiot, 'tag':self.number_tag, 
 			'alert_color':self.alt_color, 'pattern':altp, 'vol_offset':vol}
 
 		return d
@@ -2700,13 +3500,15 @@ class TalkGroupID():
 			self.audio_type=scanner_audiot[audio_type]
 			self.alt_pattern=scanner_altp[pattern]
 
-		except KeyError:
+		except KeyError, e:
 			self.logger.error('load(): keyerror %s' % str(e))
 			return 0
 
+		self.indexed('add')
+
 		return 1
 
-class Search:
+class Search(Record):
 
 	"""Scanner Search class."""
 
@@ -2866,76 +3668,49 @@ class Search:
 		P25WAITING 		P25 Waiting time (0,100,200,300, .... , 900,1000)"""
 
 		try:
-			sco = self.scanner.raw('SCO')
-			shk = self.scanner.raw('SHK')
-			clc = self.scanner.raw('CLC')
-			csg = self.scanner.raw('CSG')
-			bsp = self.scanner.raw('BSP')
+			(sco,shk,clc,csg,bsp) = self.scanner.raw_batch(['SCO','SHK','CLC','CSG','BSP'])
 			
-		except CommandError:
-			self.logger.error('get_data(): %s' % cmd)
+		except CommandError, e:
+			self.logger.error('get_data(): %s' % str(e))
 			return 0
 
-		(sco,rsv1,mod,att,dly,rsv2,code_srch,bsc,rep,rsv3,rsv4,
-			max_store,rsv5,agc_analog,agc_digital,p25waiting) = sco.split(',')
-		self.srch_close_call = {'modulation':mod, 'attenuate':att, 'delay':dly, 'code_srch':code_srch,
-				'bscreen':bsc, 'repeater':rep, 'max_store':max_store, 'agc_analog':agc_analog,
-				'agc_digital':agc_digital, 'p25waiting':p25waiting }
-
-		(shk,srch_key_1,srch_key_2,srch_key_3,rsv1,rsv2,rsv3) = shk.split(',')
-		self.search_key = (0,srch_key_1,srch_key_2,srch_key_3)
-		
-		(clc,cc_mode,cc_override,rsv1,altb,altl,altp,cc_band,
-			lout,hld,quick_key,number_tag,alt_color,alt_pattern) = clc.split(',')
-		self.close_call = {'mode':cc_mode, 'override':cc_override, 'beep':altb,
-				'level':altl, 'pause':altp, 'band':cc_band, 'lockout':lout,
-				'hold':hld, 'quick_key':quick_key, 'number_tag':number_tag,
-				'color':alt_color, 'pattern':alt_pattern}
-
-		(csg,n) = csg.split(',')
+		self.srch_close_call = codec.decode_dict('SCO',sco)
+		self.search_key = tuple([0]+codec.decode('SHK',shk)[:3])
+		self.close_call = codec.decode_dict('CLC',clc)
+		(n,) = codec.decode('CSG',csg)
 		self.custom_search_group = tuple(n)
-
-		(bsp,frq,stp,spn,max_hold) = bsp.split(',')
-		
-		self.band_scope_system = {'frequency':frq, 'step':stp, 'span':spn, 'max_hold':max_hold}		
+		self.band_scope_system = codec.decode_dict('BSP',bsp)
 
 		limits={}
 		band_plan={}
 		cust_srch={}
 
+		cmds=[]
 		for index in range(0,10):
+			cmds.extend([','.join(['BBS',str(index)]),','.join(['CBP',str(index)]),
+					','.join(['CSP',str(index)])])
 
-			try:
-				bbs = self.scanner.raw(','.join(['BBS',str(index)]))
-				cbp = self.scanner.raw(','.join(['CBP',str(index)]))
-				csp = self.scanner.raw(','.join(['CSP',str(index)]))
-			
-			except CommandError:
-				self.logger.error('get_data(): %s' % cmd)
-				return 0
+		try:
+			res = self.scanner.raw_batch(cmds)
+
+		except CommandError, e:
+			self.logger.error('get_data(): %s' % str(e))
+			return 0
+
+		for index in range(0,10):
+
+			(bbs,cbp,csp) = res[index*3:index*3+3]
+
+			limits[index]=codec.decode_dict('BBS',bbs)
 
-			(bbs,limit_l,limit_h) = bbs.split(',')
-			limits[index]={'limit_l':limit_l, 'limit_h':limit_h}
-
-			(cbp,mot_type,lower1,upper1,step1,offset1,
-				lower2,upper2,step2,offset2,lower3,upper3,step3,offset3,
-				lower4,upper4,step4,offset4,lower5,upper5,step5,offset5,
-				lower6,upper6,step6,offset6) = cbp.split(',')
-			band_plan[index]={'mot_type':mot_type, 
-				'lower': (0,lower1,lower2,lower3,lower4,lower5,lower6),
-				'upper': (0,upper1,upper2,upper3,upper4,upper5,upper6),
-				'step': (0,step1,step2,step3,step4,step5,step6),
-				'offset': (0,offset1,offset2,offset3,offset4,offset5,offset6)}
-
-			(csp,name,limit_l,limit_h,stp,mod,att,dly,rsv1,hld,lout,cch,
-				rsv2,rsv3,quick_key,start_key,rsv4,number_tag,agc_analog,
-				agc_digital,p25waiting) = csp.split(',')
-			cust_srch[index]={'name':name, 'limit_l':limit_l, 'limit_h':limit_h,
-					'step':stp, 'modulation':mod, 'attenuation':att, 'delay':dly, 'hold':hld,
-					'lockout':lout, 'cch':cch, 'quick_key':quick_key,
-					'start_key':start_key,'number_tag':number_tag,
-					'agc_analog':agc_analog, 'agc_digital':agc_digital,
-					'p25waiting':p25waiting}
+			l=codec.decode('CBP',cbp)
+			band_plan[index]={'mot_type':l[0],
+				'lower': tuple([0]+l[1::4]),
+				'upper': tuple([0]+l[2::4]),
+				'step': tuple([0]+l[3::4]),
+				'offset': tuple([0]+l[4::4])}
+
+			cust_srch[index]=codec.decode_dict('CSP',csp)
 
 		self.bcast_screen_band = limits
 		self.cch_custom_search_mot_band_plan = band_plan
@@ -2943,22 +3718,16 @@ class Search:
 
 		indexes = (1,2,3,4,5,6,7,8,9,11,12,15)
 
-		for index in indexes:
+		try:
+			res = self.scanner.raw_batch([','.join(['SSP',str(index)]) for index in indexes])
 
-			try:
-				ssp = self.scanner.raw(','.join(['SSP',str(index)]))
-			
-			except CommandError:
-				self.logger.error('get_data(): %s' % cmd)
-				return 0
+		except CommandError, e:
+			self.logger.error('get_data(): %s' % str(e))
+			return 0
 
-			(ssp,srch_index,dly,att,hld,lout,quick_key,start_key,rsv1,
-				number_tag,agc_analog,agc_digital,p25waiting) = ssp.split(',')
+		for (index,ssp) in zip(indexes,res):
 
-			self.service_search[index] = {'delay':dly, 'attenuation':att, 'hold':hld,
-					'lockout':lout, 'quick_key':quick_key, 'start_key':start_key,
-					'number_tag':number_tag, 'agc_analog':agc_analog,
-					'agc_digital':agc_digital, 'p25waiting':p25waiting}
+			self.service_search[index] = codec.decode_dict('SSP',ssp)
 
 		self.get_global_lockout_frqs()
 
@@ -2968,70 +3737,34 @@ class Search:
 
 		"""Set scanner search data to device."""
 
-		rsv = ''
-		sco = ','.join(['SCO',rsv,self.srch_close_call['modulation'],str(self.srch_close_call['attenuate']),
-				str(self.srch_close_call['delay']),rsv,str(self.srch_close_call['code_srch']),
-				self.srch_close_call['bscreen'],str(self.srch_close_call['repeater']),rsv,rsv,
-				str(self.srch_close_call['max_store']),rsv,str(self.srch_close_call['agc_analog']),
-				str(self.srch_close_call['agc_digital']),str(self.srch_close_call['p25waiting'])])
-		shk = ','.join(['SHK',self.search_key[1],self.search_key[2],self.search_key[3],rsv,rsv,rsv])
-		clc = ','.join(['CLC',str(self.close_call['mode']),str(self.close_call['override']),rsv,
-				str(self.close_call['beep']),str(self.close_call['level']),str(self.close_call['pause']),
-				self.close_call['band'],str(self.close_call['lockout']),str(self.close_call['hold']),
-				str(self.close_call['quick_key']),str(self.close_call['number_tag']),
-				self.close_call['color'],str(self.close_call['pattern'])])
-		csg = ','.join(['CSG',''.join(self.custom_search_group)])
-		bsp = ','.join(['BSP',self.band_scope_system['frequency'],self.band_scope_system['step'],
-					self.band_scope_system['span'],str(self.band_scope_system['max_hold'])])
-	
-		try:
-			sco = self.scanner.raw(sco)
-			shk = self.scanner.raw(shk)
-			clc = self.scanner.raw(clc)
-			csg = self.scanner.raw(csg)
-			bsp = self.scanner.raw(bsp)
-			
-		except CommandError:
-			self.logger.error('set_data(): some commands failed.')
+		cmds=[codec.encode_dict('SCO',self.srch_close_call),
+			codec.encode_values('SHK',self.search_key[1:4]),
+			codec.encode_dict('CLC',self.close_call),
+			codec.encode_values('CSG',[''.join(self.custom_search_group)]),
+			codec.encode_dict('BSP',self.band_scope_system)]
 
 		for index in range(0,10):
 
-			bbs = ','.join(['BBS',str(index),str(self.bcast_screen_band[index]['limit_l']),
-					str(self.bcast_screen_band[index]['limit_h'])])
-			cbp0 = self.cch_custom_search_mot_band_plan[index]
-			cbp = ','.join(['CBP',str(index),cbp0['mot_type']])
+			cbp=self.cch_custom_search_mot_band_plan[index]
+			values=[cbp['mot_type']]
 			for i in range(1,7):
-				cbp = ','.join([cbp,cbp0['lower'][i],cbp0['upper'][i],
-						str(cbp0['step'][i]),cbp0['offset'][i]])
-			csp0 = self.custom_search[index]
-			csp = ','.join(['CSP',str(index),csp0['name'],csp0['limit_l'],csp0['limit_h'],
-					str(csp0['step']),csp0['modulation'],str(csp0['attenuation']),str(csp0['delay']),
-					rsv,str(csp0['hold']),str(csp0['lockout']),str(csp0['cch']),rsv,rsv,
-					str(csp0['quick_key']),str(csp0['start_key']),rsv,
-					str(csp0['number_tag']),str(csp0['agc_analog']),
-					str(csp0['agc_digital']),str(csp0['p25waiting'])])
-			try:
-				bbs = self.scanner.raw(bbs)
-				cbp = self.scanner.raw(cbp)
-				csp = self.scanner.raw(csp)
-			
-			except CommandError:
-				self.logger.error('set_data(): some commands failed.')
+				values.extend([cbp['lower'][i],cbp['upper'][i],cbp['step'][i],cbp['offset'][i]])
+
+			cmds.extend([codec.encode_dict('BBS',self.bcast_screen_band[index],index),
+				codec.encode_values('CBP',values,index),
+				codec.encode_dict('CSP',self.custom_search[index],index)])
 
 		indexes = (1,2,3,4,5,6,7,8,9,11,12,15)
 
 		for index in indexes:
 
-			ssp0=self.service_search[index]
-			ssp = ','.join(['SSP',str(index),str(ssp0['delay']),str(ssp0['attenuation']),str(ssp0['hold']),
-					str(ssp0['lockout']),str(ssp0['quick_key']),str(ssp0['start_key']),rsv,
-					str(ssp0['number_tag']),str(ssp0['agc_analog']),
-					str(ssp0['agc_digital']),str(ssp0['p25waiting'])])
-			try:
-				ssp = self.scanner.raw(ssp)
-			
-			except CommandError:
-				self.logger.error('set_data(): some commands failed.')
+			cmds.append(codec.encode_dict('SSP',self.service_search[index],index))
+
+		try:
+			self.scanner.raw_batch(cmds)
+
+		except CommandError, e:
+			self.logger.error('set_data(): some commands failed, first %s' % str(e))
 
 		return 1
 
@@ -3055,7 +3788,7 @@ class Search:
 				self.logger.error('get_global_lockout_frqs()')
 				return 0
 
-			(glf,frq) = glf.split(',')
+			(frq,) = codec.decode('GLF',glf)
 			frqs.append(frq)
 
 		self.global_lout_frqs = tuple(frqs)